@@ -0,0 +1,68 @@
+"""
+Benchmark: recall@k and latency of NumpyVectorStore queries with the IVF
+index against the same store's exact scan, across n_probe settings. Goes
+through NumpyVectorStore.query, so the timings include the alive mask and
+scoring the store actually does. Uses synthetic clustered embeddings
+(text chunks from the same source tend to sit close together), since real
+namespaces are rarely large enough to make the difference show.
+
+Usage: python -m src.benchmarks.ann_recall [rows] [dim] [queries]
+"""
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from src.vector_stores.ivf_index import normalize_rows
+from src.vector_stores.numpy_store import NumpyVectorStore
+
+K = 10
+N_PROBES = [1, 2, 4, 8, 16, 32, 64]
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    noise = rng.standard_normal((rows, dim)).astype(np.float32) * 0.6
+    return normalize_rows(centers[labels] + noise)
+
+def timed_queries(store: NumpyVectorStore, queries: np.ndarray, **kwargs) -> Tuple[List[set], float]:
+    """Top-K ids for each query and the mean ms per query"""
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=K), **kwargs)
+        results.append(set(result.ids))
+    return results, (time.perf_counter() - start) * 1000 / len(queries)
+
+def run(rows: int = 50000, dim: int = 384, n_queries: int = 200) -> None:
+    embeddings = synthetic_embeddings(rows, dim, clusters=max(1, rows // 500))
+    queries = synthetic_embeddings(n_queries, dim, clusters=max(1, rows // 500), seed=1)
+    store = NumpyVectorStore()
+    store.add([TextNode(id_=str(row), text="", embedding=embedding.tolist())
+               for row, embedding in enumerate(embeddings)])
+
+    start = time.perf_counter()
+    store.build_ann()
+    n_lists = store._ivf.n_lists
+    print(f"{rows} rows x {dim} dims, {n_lists} lists, built in {time.perf_counter() - start:.1f}s")
+
+    store.ann = False
+    truth, exact_ms = timed_queries(store, queries)
+    store.ann = True
+    print(f"{'n_probe':>8}{f'recall@{K}':>12}{'ms/query':>11}{'speedup':>10}")
+    print(f"{'exact':>8}{1.0:>12.3f}{exact_ms:>11.2f}{1.0:>9.1f}x")
+
+    for n_probe in N_PROBES:
+        if n_probe > n_lists:
+            break
+        results, ann_ms = timed_queries(store, queries, n_probe=n_probe)
+        recall = np.mean([len(truth[i] & ids) / K for i, ids in enumerate(results)])
+        print(f"{n_probe:>8}{recall:>12.3f}{ann_ms:>11.2f}{exact_ms / ann_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    run(*args)
@@ -0,0 +1,152 @@
+"""
+Benchmark: embedding a batch of chunks through a local fake OpenAI
+embeddings endpoint that enforces requests/min and tokens/min limits
+(answering 429 with retry-after when exceeded) and whose latency grows
+with the tokens in a request. Compares llama_index's default
+OpenAIEmbedding batching with the ScheduledEmbedding set up by
+setup_llama_index, under roomy limits (latency-bound) and tight ones
+(rate-limit-bound), where the scheduler is also run at twice the server's
+limits so it has to adapt to the 429s.
+
+Usage: python -m src.benchmarks.embedding_scheduler [chunks] [latency_ms]
+"""
+import base64
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from llama_index.core.utils import get_tokenizer
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+from src.embeddings.scheduler import (
+    AdaptiveRateLimiter,
+    EmbeddingScheduler,
+    ScheduledEmbedding,
+    TokenBucket,
+    single_request_fn,
+)
+
+DIM = 64
+# (name, rpm, tpm) the fake server enforces
+SCENARIOS = [("roomy", 3000, 5000000), ("tight", 600, 600000)]
+# Roughly what the hosted endpoint adds per input token
+LATENCY_PER_TOKEN = 0.00002
+WORDS = "seller disclosure roof foundation plumbing electrical permit inspection hazard".split()
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    """POST /v1/embeddings with OpenAI's request/response shape and rpm/tpm throttling"""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float, rpm: int, tpm: int):
+        super().__init__(("127.0.0.1", 0), FakeEmbeddingHandler)
+        self.latency = latency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.tokenizer = get_tokenizer()
+        self.lock = threading.Lock()
+        self.served = 0
+        self.throttled = 0
+
+    def admit(self, tokens: int) -> bool:
+        """Take from both buckets without waiting; False means answer 429"""
+        with self.lock:
+            self.requests._refill()
+            self.tokens._refill()
+            if self.requests.tokens < 1 or self.tokens.tokens < min(tokens, self.tokens.capacity):
+                self.throttled += 1
+                return False
+            self.requests.tokens -= 1
+            self.tokens.tokens -= tokens
+            self.served += 1
+            return True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(len(self.server.tokenizer(text)) for text in texts)
+        if not self.server.admit(tokens):
+            self.reply(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                       {"retry-after-ms": "500"})
+            return
+
+        time.sleep(self.server.latency + tokens * LATENCY_PER_TOKEN)
+        data = []
+        for i, text in enumerate(texts):
+            vector = np.random.default_rng(abs(hash(text)) % 2 ** 32).standard_normal(DIM).astype(np.float32)
+            embedding = base64.b64encode(vector.tobytes()).decode() if body.get("encoding_format") == "base64" \
+                else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        self.reply(200, {"object": "list", "data": data, "model": body["model"],
+                         "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def reply(self, status, payload, headers=None):
+        encoded = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+def synthetic_chunks(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [f"chunk {i}: " + " ".join(rng.choice(WORDS, size=int(rng.integers(80, 240)))) for i in range(count)]
+
+def benchmark_scenario(chunks, total_tokens: int, latency: float, rpm: int, tpm: int):
+    server = FakeEmbeddingServer(latency, rpm, tpm)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def openai_model(**kwargs):
+        return OpenAIEmbedding(api_base=server.base_url, api_key="fake", **kwargs)
+
+    def scheduled(scale):
+        embed_model = openai_model(max_retries=0)
+        limiter = AdaptiveRateLimiter(requests_per_minute=rpm * scale, tokens_per_minute=tpm * scale)
+        return ScheduledEmbedding(embed_model, EmbeddingScheduler(single_request_fn(embed_model), limiter=limiter,
+                                                                  max_concurrency=8, max_batch_tokens=4000))
+
+    setups = [("default OpenAIEmbedding", openai_model()), ("scheduled at server limits", scheduled(1))]
+    if total_tokens > tpm / 60 * 5:
+        setups.append(("scheduled at 2x limits", scheduled(2)))
+    try:
+        for name, embed_model in setups:
+            # Start each run with full server buckets
+            time.sleep(3)
+            throttled, served = server.throttled, server.served
+            start = time.perf_counter()
+            embeddings = embed_model.get_text_embedding_batch(chunks)
+            elapsed = time.perf_counter() - start
+            assert len(embeddings) == len(chunks) and all(len(e) == DIM for e in embeddings)
+            print(f"  {name:<28}{elapsed:>9.1f}{len(chunks) / elapsed:>10.0f}{server.throttled - throttled:>6}"
+                  f"{server.served - served:>10}")
+    finally:
+        server.shutdown()
+
+def run(count: int = 1000, latency_ms: float = 150) -> None:
+    chunks = synthetic_chunks(count)
+    tokenizer = get_tokenizer()
+    total_tokens = sum(len(tokenizer(chunk)) for chunk in chunks)
+    print(f"{count} chunks, {total_tokens:,} tokens, {latency_ms:.0f}ms + {LATENCY_PER_TOKEN * 1000:.2f}ms/token per request")
+    for name, rpm, tpm in SCENARIOS:
+        print(f"\n{name}: server allows {rpm} rpm / {tpm:,} tpm (best case {total_tokens / tpm * 60:.1f}s)")
+        print(f"  {'setup':<28}{'seconds':>9}{'chunks/s':>10}{'429s':>6}{'requests':>10}")
+        benchmark_scenario(chunks, total_tokens, latency_ms / 1000, rpm, tpm)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(int(args[0]) if len(args) > 0 else 1000, float(args[1]) if len(args) > 1 else 150)
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: the single-pass parse_html against the old pipeline, which
+parsed each page three times (content, links, relevance prompt) and looked
+up every link's anchor text with its own soup.find.
+
+Usage: python -m src.benchmarks.html_parsing [iterations]
+"""
+import sys
+import timeit
+from pathlib import Path
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from src.scrapers import html_parsing
+from src.utils.files import resolve_path
+
+FIXTURE_DIR = "fixtures/html"
+BASE_URL = "https://help.docebo.com/hc/en-us/sections/4407577387026-Docebo-Flow"
+
+def legacy_parse(html: str, base_url: str) -> dict:
+    """The pre-parse_html pipeline, kept here only as a baseline"""
+    # extract_content
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(['nav', 'footer', 'header', 'style', 'meta']):
+        element.decompose()
+    body = soup.find('body')
+    for a_tag in body.find_all('a'):
+        href = a_tag.get('href', '')
+        if href and not href.startswith('#'):
+            href = f"https://{href}" if href.startswith('//') else href
+            a_tag.replace_with(f"[{a_tag.get_text()}]({href})")
+    text = body.get_text(separator=' ', strip=True)
+
+    # extract_links
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for a_tag in soup.find_all('a', href=True):
+        href = a_tag.get('href')
+        if href and not href.startswith(('#', 'mailto:', 'tel:')):
+            links.append(urljoin(base_url, href))
+
+    # analyze_page_relevance
+    soup = BeautifulSoup(html, 'html.parser')
+    soup.get_text(separator=' ', strip=True)
+    anchor_text = {}
+    for link in links:
+        link_tag = soup.find('a', href=lambda x: x and link.endswith(x))
+        anchor_text[link] = link_tag.get_text(strip=True) if link_tag else "No description"
+
+    return {"text": text, "links": links, "anchor_text": anchor_text}
+
+def run(iterations: int = 20) -> None:
+    fixtures = sorted(Path(resolve_path(FIXTURE_DIR)).glob("*.html"))
+    print(f"Parser backend: {html_parsing.HTML_PARSER}")
+    print(f"{'fixture':<28}{'links':>7}{'legacy ms':>12}{'single ms':>12}{'speedup':>10}")
+
+    for fixture in fixtures:
+        html = fixture.read_text()
+        links = len(html_parsing.parse_html(html, BASE_URL)["links"])
+        legacy = timeit.timeit(lambda: legacy_parse(html, BASE_URL), number=iterations) / iterations
+        single = timeit.timeit(lambda: html_parsing.parse_html(html, BASE_URL), number=iterations) / iterations
+        print(f"{fixture.name:<28}{links:>7}{legacy * 1000:>12.1f}{single * 1000:>12.1f}{legacy / single:>9.1f}x")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
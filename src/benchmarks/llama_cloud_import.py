@@ -0,0 +1,187 @@
+"""
+Benchmark: importing LlamaCloud job results from a local stand-in of the
+job result API, which streams each job's markdown in chunks after a
+time-to-first-byte delay, answers some requests with 503 and cuts some
+streams off part way. Compares one-at-a-time imports over one-off requests
+(the old get_job_results + load_job_as_query_engine path) with JobImporter,
+then compares peak memory for one very long job read whole vs streamed.
+Embeddings are mocked and vectors go to an in-memory index.
+
+Usage: python -m src.benchmarks.llama_cloud_import [jobs] [pages_per_job] [latency_ms]
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from llama_index.core import Document, Settings
+from llama_index.core.embeddings import MockEmbedding
+
+from src.parsing.llama_cloud_jobs import JobImporter, new_llama_cloud_session, stream_job_sections
+from src.parsing.parse_cache import PAGE_SEPARATOR
+from src.vector_stores.backends import MemoryBackend
+from src.vector_stores.memory_index import InMemoryPineconeIndex
+
+DIM = 256
+CHUNK_BYTES = 16 * 1024
+ERROR_RATE = 0.05
+CUTOFF_RATE = 0.05
+JOB_PATH = re.compile(r"/api/v1/parsing/job/([^/]+)/result/(raw/markdown|markdown)$")
+
+@lru_cache(maxsize=4)
+def job_markdown(job_id: str, pages: int) -> str:
+    rng = random.Random(job_id)
+    words = "seller disclosure roof foundation plumbing permit inspection hazard water heater".split()
+    return PAGE_SEPARATOR.join(
+        f"# Page {page}\n\n" + " ".join(rng.choice(words) for _ in range(300)) for page in range(pages)
+    )
+
+@lru_cache(maxsize=8)
+def job_body(job_id: str, pages: int, kind: str) -> bytes:
+    """Response body for the JSON ("markdown") or raw ("raw/markdown") result endpoint"""
+    markdown = job_markdown(job_id, pages)
+    return (json.dumps({"markdown": markdown}) if kind == "markdown" else markdown).encode()
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves generated markdown for any job ID, with latency and injected failures"""
+
+    daemon_threads = True
+
+    def __init__(self, pages: int, latency: float, error_rate: float = ERROR_RATE, cutoff_rate: float = CUTOFF_RATE):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.cutoff_rate = cutoff_rate
+        self.rng = random.Random(0)
+        self.lock = threading.Lock()
+        self.connections = 0
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.rng.random() < rate
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        match = JOB_PATH.match(self.path)
+        if not match:
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        if self.server.roll(self.server.error_rate):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = job_body(match.group(1), self.server.pages, match.group(2))
+        if match.group(2) == "markdown":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        cutoff = len(body) // 2 if self.server.roll(self.server.cutoff_rate) else None
+        self.send_response(200)
+        self.send_header("Content-Type", "text/markdown; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(body), CHUNK_BYTES):
+            if cutoff is not None and start >= cutoff:
+                self.close_connection = True
+                return  # Without the terminating chunk, so the client sees a broken stream
+            chunk = body[start:start + CHUNK_BYTES]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+def import_one_at_a_time(base_url: str, job_ids, backend) -> int:
+    """One-off request per job, whole body parsed and split in memory"""
+    nodes = 0
+    for job_id in job_ids:
+        for attempt in range(5):
+            response = requests.request("GET", f"{base_url}/api/v1/parsing/job/{job_id}/result/markdown")
+            if response.status_code == 200:
+                break
+        sections = response.json()["markdown"].split(PAGE_SEPARATOR)
+        documents = [Document(text=section.strip(), metadata={"file_hash": job_id}) for section in sections]
+        nodes += len(backend.insert_documents(documents))
+    return nodes
+
+def peak_memory_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+def run(jobs: int = 100, pages: int = 40, latency_ms: float = 200) -> None:
+    Settings.embed_model = MockEmbedding(embed_dim=DIM)
+    server = StandInServer(pages, latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["LLAMA_CLOUD_BASE_URL"] = server.base_url
+    job_ids = [f"job-{i:04d}" for i in range(jobs)]
+    print(f"{jobs} jobs x {pages} pages, {latency_ms:.0f}ms to first byte, "
+          f"{ERROR_RATE:.0%} 503s, {CUTOFF_RATE:.0%} broken streams")
+    print(f"{'import':<24}{'seconds':>9}{'jobs/s':>8}{'nodes':>8}{'connections':>13}{'restarts':>10}")
+
+    try:
+        server.connections = 0
+        backend = MemoryBackend("benchmark", InMemoryPineconeIndex())
+        start = time.perf_counter()
+        nodes = import_one_at_a_time(server.base_url, job_ids, backend)
+        elapsed = time.perf_counter() - start
+        print(f"{'one at a time':<24}{elapsed:>9.1f}{jobs / elapsed:>8.1f}{nodes:>8}{server.connections:>13}{'-':>10}")
+
+        for workers in (1, 8):
+            server.connections = 0
+            backend = MemoryBackend("benchmark", InMemoryPineconeIndex())
+            importer = JobImporter(backend, max_workers=workers,
+                                   session=new_llama_cloud_session(workers), backoff=0.05)
+            stats = importer.import_jobs([(job_id, None) for job_id in job_ids])
+            name = f"JobImporter, {workers} worker{'s' if workers > 1 else ''}"
+            print(f"{name:<24}{stats['seconds']:>9.1f}{jobs / stats['seconds']:>8.1f}{stats['nodes']:>8}"
+                  f"{server.connections:>13}{stats['retries']:>10}")
+
+        # Memory: one job 50x longer, with failures off so both reads complete. The server's copy
+        # is generated up front so only the client's allocations are measured
+        server.pages, server.error_rate, server.cutoff_rate = pages * 50, 0, 0
+        job_body("long", server.pages, "markdown")
+        job_body("long", server.pages, "raw/markdown")
+        whole = peak_memory_mb(lambda: requests.get(f"{server.base_url}/api/v1/parsing/job/long/result/markdown")
+                               .json()["markdown"].split(PAGE_SEPARATOR))
+        streamed = peak_memory_mb(lambda: sum(1 for _ in stream_job_sections("long", requests.Session())))
+        print(f"\nPeak memory reading a {pages * 50}-page job: {whole:.1f}MB whole, {streamed:.1f}MB streamed")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(
+        int(args[0]) if len(args) > 0 else 100,
+        int(args[1]) if len(args) > 1 else 40,
+        float(args[2]) if len(args) > 2 else 200,
+    )
@@ -0,0 +1,48 @@
+"""
+Benchmark: PineconeUpsertWriter throughput against InMemoryPineconeIndex
+with simulated per-request latency and throttling, across batch sizes and
+worker counts. The single-worker row is roughly what the sequential
+upsert inside VectorStoreIndex.from_documents gets.
+
+Usage: python -m src.benchmarks.pinecone_upsert [vectors] [latency_ms] [failure_rate]
+"""
+import sys
+import time
+
+import numpy as np
+
+from src.vector_stores.memory_index import InMemoryPineconeIndex
+from src.vector_stores.pinecone import PineconeUpsertWriter
+
+DIM = 1536
+SETTINGS = [(100, 1), (100, 4), (100, 8), (200, 8)]
+
+def synthetic_vectors(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"id": f"node-{i}", "values": rng.standard_normal(DIM).astype(np.float32).tolist(),
+         "metadata": {"file_hash": f"file-{i % 10}"}}
+        for i in range(count)
+    ]
+
+def run(count: int = 5000, latency_ms: float = 80, failure_rate: float = 0.05) -> None:
+    vectors = synthetic_vectors(count)
+    print(f"{count} x {DIM}-dim vectors, {latency_ms:.0f}ms per request, {failure_rate:.0%} simulated failures")
+    print(f"{'batch':>6}{'workers':>9}{'seconds':>9}{'vectors/s':>11}{'retries':>9}")
+    for batch_size, workers in SETTINGS:
+        index = InMemoryPineconeIndex(latency=latency_ms / 1000, failure_rate=failure_rate)
+        writer = PineconeUpsertWriter(index, namespace="benchmark", batch_size=batch_size,
+                                      max_workers=workers, backoff=0.05)
+        start = time.time()
+        writer.upsert(vectors)
+        elapsed = time.time() - start
+        assert index.describe_index_stats()["total_vector_count"] == count
+        print(f"{batch_size:>6}{workers:>9}{elapsed:>9.2f}{count / elapsed:>11.0f}{writer.retries:>9}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(
+        int(args[0]) if len(args) > 0 else 5000,
+        float(args[1]) if len(args) > 1 else 80,
+        float(args[2]) if len(args) > 2 else 0.05,
+    )
@@ -0,0 +1,77 @@
+"""
+Benchmark: ingestion and query latency of the vector backends on the same
+synthetic workload (pre-embedded nodes spread over several file hashes).
+Runs the memory and local backends; pass --pinecone to include the hosted
+index (writes to a throwaway "benchmark_backends" namespace and deletes it).
+
+Usage: python -m src.benchmarks.vector_backends [nodes] [--pinecone]
+"""
+import shutil
+import statistics
+import sys
+import time
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+
+from src.vector_stores.backends import LocalBackend, MemoryBackend, PineconeBackend
+from src.vector_stores.local_storage import get_storage_path
+from src.vector_stores.memory_index import InMemoryPineconeIndex
+
+NAMESPACE = "benchmark_backends"
+DIM = 1536
+FILE_COUNT = 20
+QUERIES = 50
+
+def synthetic_nodes(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(id_=f"node-{i}", text=f"chunk {i}", metadata={"file_hash": f"file-{i % FILE_COUNT}"},
+                 embedding=rng.standard_normal(DIM).astype(np.float32).tolist())
+        for i in range(count)
+    ]
+
+def median_ms(fn, repeats: int = QUERIES) -> float:
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def run(count: int = 5000, include_pinecone: bool = False) -> None:
+    # Nodes come pre-embedded; this only keeps VectorStoreIndex from resolving an OpenAI model
+    Settings.embed_model = MockEmbedding(embed_dim=DIM)
+    nodes = synthetic_nodes(count)
+    queries = [node.embedding for node in synthetic_nodes(QUERIES, seed=1)]
+
+    print(f"{count} nodes x {DIM} dims over {FILE_COUNT} files, median of {QUERIES} queries")
+    print(f"{'backend':<10}{'ingest s':>10}{'query ms':>10}{'filtered ms':>13}{'exists ms':>11}")
+    backends = [MemoryBackend(NAMESPACE, InMemoryPineconeIndex())]
+    try:
+        backends.append(LocalBackend(NAMESPACE))
+        if include_pinecone:
+            backends.append(PineconeBackend(NAMESPACE))
+        for backend in backends:
+            start = time.perf_counter()
+            backend.upsert_nodes(nodes)
+            backend.persist()
+            ingest = time.perf_counter() - start
+
+            query = median_ms(lambda i: backend.query(queries[i], top_k=5))
+            filtered = median_ms(lambda i: backend.query(queries[i], top_k=5,
+                                                         filter={"file_hash": {"$eq": f"file-{i % FILE_COUNT}"}}))
+            exists = median_ms(lambda i: backend.exists_by_hash(f"file-{i % FILE_COUNT}"))
+            print(f"{backend.name:<10}{ingest:>10.2f}{query:>10.2f}{filtered:>13.2f}{exists:>11.3f}")
+    finally:
+        shutil.rmtree(get_storage_path(NAMESPACE), ignore_errors=True)
+        if include_pinecone and backends[-1].name == "pinecone":
+            # The benchmark nodes are tagged with these file hashes, so this deletes all of them
+            for i in range(FILE_COUNT):
+                backends[-1].delete_by_hash(f"file-{i}")
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    run(int(args[0]) if args else 5000, "--pinecone" in sys.argv)
@@ -0,0 +1,213 @@
+"""
+Semantic cache of query engine answers. The same questions get asked of
+the same disclosures over and over ("who is the settlement agent?", "what
+are the roof issues?"), and each one costs a retrieval plus a GPT-4o
+synthesis. CachedQueryEngine embeds the question first and, if a question
+asked before in the same scope is within ANSWER_CACHE_THRESHOLD cosine
+similarity, returns that answer instead. On a miss the question's embedding
+is handed on to retrieval, so it isn't embedded twice.
+
+A scope is (file hash or namespace, LLM, embedding model, prompt version):
+bump ANSWER_PROMPT_VERSION when prompts or query engine settings change
+what an answer would be. Entries expire after ANSWER_CACHE_TTL_DAYS and
+the least recently used are evicted past ANSWER_CACHE_MAX_ENTRIES.
+ANSWER_CACHE=off turns the cache off; query(..., bypass=True) skips it for
+one question (and refreshes the stored answer).
+"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.response.schema import Response, StreamingResponse
+from llama_index.core.schema import QueryBundle
+
+from src.embeddings.cache import model_key
+from src.environment import is_disabled
+from src.utils.files import get_cache_dir
+from src.utils.metrics import increment
+
+METRICS_PREFIX = "answer_cache."
+ANSWER_PROMPT_VERSION = 1
+# Cosine similarity between question embeddings; high, since "down payment" and "monthly payment"
+# questions are close together but have different answers
+DEFAULT_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+DEFAULT_TTL_DAYS = float(os.getenv("ANSWER_CACHE_TTL_DAYS", "30"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    scope TEXT NOT NULL,
+    model TEXT NOT NULL,
+    embed_model TEXT NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope, model, embed_model, prompt_version)",
+    "CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)",
+]
+
+@dataclass(frozen=True)
+class AnswerScope:
+    """Which answers a question can be matched against"""
+    key: str
+    model: str
+    embed_model: str
+    prompt_version: int = ANSWER_PROMPT_VERSION
+
+    def params(self) -> tuple:
+        return (self.key, self.model, self.embed_model, self.prompt_version)
+
+def llm_name(llm) -> str:
+    return getattr(llm, "model", None) or llm.metadata.model_name
+
+def answer_scope(key: str, prompt_version: int = ANSWER_PROMPT_VERSION) -> AnswerScope:
+    """Scope for a file hash or namespace, with the current Settings models"""
+    return AnswerScope(key, llm_name(Settings.llm), model_key(Settings.embed_model), prompt_version)
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    similarity: float
+    created: float
+
+class AnswerCache:
+    """SQLite store of (question embedding, answer) pairs by scope"""
+
+    def __init__(self, path: Optional[str] = None, ttl_days: float = DEFAULT_TTL_DAYS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path or os.getenv("ANSWER_CACHE_PATH") or get_cache_dir("answers") / "answers.db")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_days * 24 * 60 * 60
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+            for index in INDEXES:
+                self._conn.execute(index)
+
+    def lookup(self, scope: AnswerScope, embedding: List[float], threshold: float = DEFAULT_THRESHOLD
+               ) -> Optional[CachedAnswer]:
+        """The closest unexpired answer in scope, if its question is at least threshold similar"""
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT rowid, question, embedding, answer, created FROM answers "
+                "WHERE scope = ? AND model = ? AND embed_model = ? AND prompt_version = ? AND created >= ?",
+                (*scope.params(), now - self.ttl),
+            ).fetchall()
+            if not rows:
+                return None
+            matrix = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            query = np.asarray(embedding, dtype=np.float32)
+            similarities = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            rowid, question, _, answer, created = rows[best]
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE rowid = ?", (now, rowid))
+        return CachedAnswer(question, answer, float(similarities[best]), created)
+
+    def put(self, scope: AnswerScope, question: str, embedding: List[float], answer: str) -> None:
+        """Store an answer, replacing any for the same question, then drop expired and excess entries"""
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM answers WHERE scope = ? AND model = ? AND embed_model = ? AND prompt_version = ? "
+                "AND question = ?", (*scope.params(), question))
+            self._conn.execute("INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (*scope.params(), question, blob, answer, now, now))
+            self._conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM answers WHERE rowid IN "
+                "(SELECT rowid FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear_scope(self, key: str) -> int:
+        """Forget every answer for a file hash or namespace (e.g. after it is re-indexed)"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM answers WHERE scope = ?", (key,)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache:
+    """Get the process-wide answer cache, opening it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
+
+class CachedQueryEngine:
+    """
+    Wraps a query engine with the answer cache. Hits come back as a plain
+    Response (metadata["answer_cache"] says which question they matched),
+    even from a streaming engine; streamed answers are stored once the
+    stream has been read to the end. Everything else passes through to the
+    wrapped engine.
+    """
+
+    def __init__(self, query_engine, scope: AnswerScope, cache: Optional[AnswerCache] = None,
+                 threshold: float = DEFAULT_THRESHOLD, embed_model=None):
+        self.query_engine = query_engine
+        self.scope = scope
+        self.cache = cache if cache is not None else get_answer_cache()
+        self.threshold = threshold
+        self.embed_model = embed_model or Settings.embed_model
+
+    def query(self, question: str, bypass: bool = False):
+        embedding = self.embed_model.get_query_embedding(question)
+        if not bypass:
+            hit = self.cache.lookup(self.scope, embedding, self.threshold)
+            if hit is not None:
+                increment(METRICS_PREFIX + "hits")
+                return Response(response=hit.answer, metadata={"answer_cache": {
+                    "question": hit.question, "similarity": hit.similarity, "created": hit.created}})
+            increment(METRICS_PREFIX + "misses")
+
+        response = self.query_engine.query(QueryBundle(question, embedding=embedding))
+        if isinstance(response, StreamingResponse):
+            return StreamingResponse(self._store_when_done(question, embedding, response.response_gen),
+                                     source_nodes=response.source_nodes, metadata=response.metadata)
+        self._store(question, embedding, response.response)
+        return response
+
+    def _store_when_done(self, question: str, embedding: List[float], tokens: Iterator[str]) -> Iterator[str]:
+        answer = []
+        for token in tokens:
+            answer.append(token)
+            yield token
+        self._store(question, embedding, "".join(answer))
+
+    def _store(self, question: str, embedding: List[float], answer: Optional[str]) -> None:
+        # Don't remember "Empty Response" from a retrieval that found nothing
+        if answer and answer.strip() and answer != "Empty Response":
+            self.cache.put(self.scope, question, embedding, answer)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.query_engine, name)
+
+def cached_query_engine(query_engine, key: str, **kwargs):
+    """query_engine behind the answer cache for a file hash or namespace, unless ANSWER_CACHE=off"""
+    if is_disabled("ANSWER_CACHE"):
+        return query_engine
+    return CachedQueryEngine(query_engine, answer_scope(key), **kwargs)
@@ -1,19 +1,69 @@
-from rich.console import Console                                                                                                 
-from rich.markdown import Markdown  
+import os
+import time
+from typing import Optional
+
+from llama_index.core.base.response.schema import StreamingResponse
+from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+
+from src.chat.answer_cache import CachedQueryEngine
 
 console = Console()
 
+# Build chat query engines with streaming=CHAT_STREAMING; set CHAT_STREAMING=off to wait for whole answers
+CHAT_STREAMING = os.getenv("CHAT_STREAMING", "on").lower() not in ("off", "false", "0")
+# Re-rendering the markdown on every token is wasted work past what the terminal can show
+REFRESH_PER_SECOND = 10
+# Start a question with this to skip the answer cache and get a fresh answer
+BYPASS_PREFIX = "!"
+
+def render_answer(response, start: float) -> Optional[float]:
+    """
+    Print a query response as markdown, progressively if it is streaming.
+    Returns the seconds from start to the first token (None if not streamed).
+    """
+    if not isinstance(response, StreamingResponse):
+        console.print(Markdown(response.response or ""))
+        return None
+
+    text, first_token, last_render = "", None, 0.0
+    with Live(Markdown(""), console=console, refresh_per_second=REFRESH_PER_SECOND,
+              vertical_overflow="visible") as live:
+        for token in response.response_gen:
+            now = time.perf_counter()
+            if first_token is None:
+                first_token = now - start
+            text += token
+            if now - last_render >= 1 / REFRESH_PER_SECOND:
+                live.update(Markdown(text))
+                last_render = now
+        live.update(Markdown(text))
+    return first_token
+
 def chat_loop(query_engine):
     """Run the interactive chat loop with the loaded document"""
     print("\nPDF loaded! You can now chat with your document.")
     print("Type 'quit' to exit the chat.")
-    
+    cached = isinstance(query_engine, CachedQueryEngine)
+    if cached:
+        print(f"Start a question with '{BYPASS_PREFIX}' to skip cached answers.")
+
     while True:
         question = input("\nYour question: ")
         if question.lower() in ['quit', 'exit', 'q']:
             break
-            
+
         print("\n=== Answer ===\n")
-        response = query_engine.query(question)
-        markdown = Markdown(response.response)                                                                                           
-        console.print(markdown) 
+        start = time.perf_counter()
+        if cached and question.startswith(BYPASS_PREFIX):
+            response = query_engine.query(question[len(BYPASS_PREFIX):].strip(), bypass=True)
+        else:
+            response = query_engine.query(question)
+        first_token = render_answer(response, start)
+        total = time.perf_counter() - start
+        timing = f"first token {first_token:.1f}s, " if first_token is not None else ""
+        hit = (response.metadata or {}).get("answer_cache")
+        if hit:
+            timing = f"cached answer to \"{hit['question']}\", {hit['similarity']:.2f} similar, "
+        console.print(f"\n[dim]({timing}total {total:.1f}s)[/dim]")
@@ -0,0 +1,244 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import Document
+from llama_index.core.utils import get_tokenizer
+
+from src.utils.files import get_cache_dir
+from src.utils.metrics import increment, snapshot
+
+METRICS_PREFIX = "embedding_cache."
+DEFAULT_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+# Evicting down to this fraction of the cap means eviction runs once per many inserts, not every one
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    tokens INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+)
+"""
+INDEX = "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+
+# Metadata that identifies the document or file rather than describing the chunk. llama_index
+# prefixes it to the text it embeds, so left in, the same boilerplate page in two documents
+# would never share a cache entry
+DOCUMENT_METADATA_KEYS = ["file_hash", "file_name", "file_path", "file_type", "file_size", "creation_date",
+                          "last_modified_date", "last_accessed_date", "job_id", "source"]
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace runs, so chunks differing only in layout share an entry"""
+    return re.sub(r"\s+", " ", text).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+def exclude_document_metadata(documents: Sequence[Document]) -> Sequence[Document]:
+    """Keep per-document metadata out of the text that is embedded (still stored, and shown to the LLM)"""
+    for document in documents:
+        document.excluded_embed_metadata_keys = list(dict.fromkeys(
+            [*document.excluded_embed_metadata_keys, *DOCUMENT_METADATA_KEYS]))
+    return documents
+
+def model_key(embed_model: BaseEmbedding) -> str:
+    """Everything about a model that changes its vectors: class, model name and output dimensions"""
+    # Look through wrappers like ScheduledEmbedding to the model that makes the vectors
+    while isinstance(getattr(embed_model, "embed_model", None), BaseEmbedding):
+        embed_model = embed_model.embed_model
+    key = f"{type(embed_model).__name__}:{embed_model.model_name}"
+    dimensions = getattr(embed_model, "dimensions", None)
+    return f"{key}:{dimensions}" if dimensions else key
+
+class EmbeddingCache:
+    """
+    Local SQLite store of text embeddings keyed by (model, hash of the
+    normalized text), capped at max_mb of vectors with least-recently-used
+    eviction. Vectors are stored as float32 blobs alongside the chunk's
+    token count, so a hit knows how many tokens it saved.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_mb: float = DEFAULT_MAX_MB):
+        self.path = Path(path or os.getenv("EMBEDDING_CACHE_PATH") or get_cache_dir("embeddings") / "embeddings.db")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+            self._conn.execute(INDEX)
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(embedding)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, tuple]:
+        """{text hash: (embedding, tokens)} for the hashes that are cached; marks them as used"""
+        found: Dict[str, tuple] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock, self._conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, embedding, tokens FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                ).fetchall()
+                for hash_, blob, tokens in rows:
+                    found[hash_] = (np.frombuffer(blob, dtype=np.float32).tolist(), tokens)
+            now = time.time()
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                                   [(now, model, hash_) for hash_ in found])
+        return found
+
+    def put_many(self, model: str, entries: Sequence[tuple]) -> None:
+        """Store (text hash, embedding, tokens) entries, evicting the least recently used if over the cap"""
+        now = time.time()
+        rows = [(model, hash_, np.asarray(embedding, dtype=np.float32).tobytes(), tokens, now)
+                for hash_, embedding, tokens in entries]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            self._bytes += sum(len(row[2]) for row in rows)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        target = self.max_bytes * EVICT_TO
+        freed, doomed = 0, []
+        for rowid, size in self._conn.execute("SELECT rowid, LENGTH(embedding) FROM embeddings ORDER BY last_used"):
+            if self._bytes - freed <= target:
+                break
+            doomed.append((rowid,))
+            freed += size
+        self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", doomed)
+        self._bytes -= freed
+        increment(METRICS_PREFIX + "evicted", len(doomed))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM embeddings")
+            self._bytes = 0
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache, opening it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model so document chunks seen before (by any ingest,
+    in any namespace) are served from the EmbeddingCache instead of being
+    sent to the API again. Repeated texts within a batch are embedded once.
+    Query embeddings pass straight through.
+    """
+
+    # The wrapped model does its own request batching, so hand it everything at once
+    embed_batch_size: int = 2048
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _model_key: str = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: Optional[EmbeddingCache] = None, **kwargs: Any):
+        super().__init__(model_name=embed_model.model_name, callback_manager=embed_model.callback_manager, **kwargs)
+        self._embed_model = embed_model
+        self._cache = cache if cache is not None else get_embedding_cache()
+        self._model_key = model_key(embed_model)
+        self._tokenizer = get_tokenizer()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def _lookup(self, texts: List[str]):
+        hashes = [text_hash(text) for text in texts]
+        cached = self._cache.get_many(self._model_key, hashes)
+        # One entry per distinct uncached text
+        missing = {hash_: text for hash_, text in zip(hashes, texts) if hash_ not in cached}
+        hits = len(texts) - sum(1 for hash_ in hashes if hash_ in missing)
+        increment(METRICS_PREFIX + "hits", hits)
+        increment(METRICS_PREFIX + "misses", len(texts) - hits)
+        increment(METRICS_PREFIX + "tokens_saved", sum(cached[hash_][1] for hash_ in hashes if hash_ in cached))
+        return hashes, cached, missing
+
+    def _store(self, missing: Dict[str, str], embeddings: List[Embedding]) -> Dict[str, Embedding]:
+        fresh = dict(zip(missing, embeddings))
+        self._cache.put_many(self._model_key, [
+            (hash_, embedding, len(self._tokenizer(missing[hash_]))) for hash_, embedding in fresh.items()
+        ])
+        return fresh
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        hashes, cached, missing = self._lookup(texts)
+        fresh = self._store(missing, self._embed_model.get_text_embedding_batch(list(missing.values()))) if missing else {}
+        return [fresh[hash_] if hash_ in fresh else cached[hash_][0] for hash_ in hashes]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        hashes, cached, missing = self._lookup(texts)
+        if missing:
+            fresh = self._store(missing, await self._embed_model.aget_text_embedding_batch(list(missing.values())))
+        else:
+            fresh = {}
+        return [fresh[hash_] if hash_ in fresh else cached[hash_][0] for hash_ in hashes]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._embed_model.aget_query_embedding(query)
+
+class EmbeddingCacheUsage:
+    """
+    Cache hits and tokens saved since this object was created, e.g.
+
+        usage = EmbeddingCacheUsage()
+        index_documents(...)
+        print(usage.summary())
+    """
+
+    def __init__(self):
+        self.before = snapshot(METRICS_PREFIX)
+
+    def counts(self) -> Dict[str, int]:
+        after = snapshot(METRICS_PREFIX)
+        return {name[len(METRICS_PREFIX):]: count - self.before.get(name, 0) for name, count in after.items()}
+
+    def summary(self) -> str:
+        counts = self.counts()
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        if not hits + misses:
+            return "Embedding cache: not used"
+        return (f"Embedding cache: {hits}/{hits + misses} chunks cached ({hits / (hits + misses):.0%} hit rate), "
+                f"~{counts.get('tokens_saved', 0):,} tokens saved")
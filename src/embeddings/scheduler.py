@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.utils import get_tokenizer
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+from src.utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "embedding_scheduler."
+# Defaults are OpenAI's tier 1 limits for the embedding models
+EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "3000"))
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "20000"))
+EMBEDDING_BATCH_SIZE = 512
+EMBEDDING_MAX_RETRIES = 8
+# Bucket capacity in seconds of rate, i.e. how big a burst is allowed after an idle spell
+BURST_SECONDS = 2.0
+# After a 429 the limits are cut by BACKOFF_FACTOR and grow back by RECOVERY_STEP per success
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.05
+MIN_SCALE = 0.05
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> float:
+        return self.rate_per_minute / 60 * BURST_SECONDS
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_minute / 60)
+        self.updated = now
+
+    def acquire(self, amount: float = 1) -> None:
+        """Wait until amount can be taken; a request bigger than the bucket waits for a full bucket"""
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                wait = (needed - self.tokens) / (self.rate_per_minute / 60)
+            time.sleep(wait)
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        with self._lock:
+            self._refill()
+            self.rate_per_minute = rate_per_minute
+            self.tokens = min(self.tokens, self.capacity)
+
+class AdaptiveRateLimiter:
+    """
+    Requests/min and tokens/min buckets that shrink on rate-limit errors
+    (and pause every worker for the server's Retry-After) and creep back up
+    to the configured limits as requests succeed.
+    """
+
+    def __init__(self, requests_per_minute: float = EMBEDDING_RPM, tokens_per_minute: float = EMBEDDING_TPM):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.scale = 1.0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+    def _rescale(self, scale: float) -> None:
+        self.scale = scale
+        self.requests.set_rate(self.requests_per_minute * scale)
+        self.tokens.set_rate(self.tokens_per_minute * scale)
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.scale < 1.0:
+                self._rescale(min(1.0, self.scale + RECOVERY_STEP))
+
+    def on_rate_limit(self, retry_after: Optional[float] = None) -> float:
+        """Back off after a 429; returns how long the caller should wait before retrying"""
+        with self._lock:
+            self._rescale(max(MIN_SCALE, self.scale * BACKOFF_FACTOR))
+            wait = retry_after if retry_after is not None else 1.0
+            self.paused_until = max(self.paused_until, time.monotonic() + wait)
+            return wait
+
+def is_rate_limit(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+def is_transient(error: Exception) -> bool:
+    """Server errors and dropped connections are worth retrying; other 4xx are not"""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:
+        return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+    return status >= 500
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a 429 response's retry-after-ms / retry-after header, if it has one"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+def single_request_fn(embed_model: BaseEmbedding) -> Callable[[List[str]], List[Embedding]]:
+    """
+    One embeddings request for a batch, with no retries of its own, so
+    rate limits reach the scheduler. OpenAIEmbedding's batch method retries
+    429s internally, so OpenAI models are called through their client.
+    """
+    if isinstance(embed_model, OpenAIEmbedding):
+        client = embed_model._get_client()
+
+        def request(texts: List[str]) -> List[Embedding]:
+            response = client.embeddings.create(input=[text.replace("\n", " ") for text in texts],
+                                                model=embed_model._text_engine, **embed_model.additional_kwargs)
+            return [item.embedding for item in response.data]
+        return request
+    return embed_model._get_text_embeddings
+
+class EmbeddingScheduler:
+    """
+    Packs texts into batches that fit a token budget, then sends up to
+    max_concurrency of them at once, each one waiting its turn in the
+    AdaptiveRateLimiter. Rate-limited and transient failures are retried
+    with backoff; results come back in input order.
+    """
+
+    def __init__(self, request_fn: Callable[[List[str]], List[Embedding]],
+                 limiter: Optional[AdaptiveRateLimiter] = None,
+                 max_concurrency: int = EMBEDDING_CONCURRENCY,
+                 max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+                 max_batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_retries: int = EMBEDDING_MAX_RETRIES):
+        self.request_fn = request_fn
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self._tokenizer = get_tokenizer()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed")
+
+    def pack(self, token_counts: List[int]) -> List[List[int]]:
+        """Group text indices into batches under both the token budget and the size limit"""
+        batches, current, current_tokens = [], [], 0
+        for i, tokens in enumerate(token_counts):
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) == self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _send(self, texts: List[str], tokens: int) -> List[Embedding]:
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            try:
+                embeddings = self.request_fn(texts)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries or not (is_rate_limit(e) or is_transient(e)):
+                    raise
+                if is_rate_limit(e):
+                    increment(METRICS_PREFIX + "rate_limited")
+                    wait = self.limiter.on_rate_limit(retry_after(e))
+                else:
+                    wait = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                increment(METRICS_PREFIX + "retries")
+                log = logger.info if is_rate_limit(e) else logger.warning
+                log(f"Embedding request failed ({e}); retry {attempt} in {wait:.1f}s")
+                time.sleep(wait)
+                continue
+            self.limiter.on_success()
+            increment(METRICS_PREFIX + "requests")
+            increment(METRICS_PREFIX + "tokens", tokens)
+            return embeddings
+
+    def embed(self, texts: List[str]) -> List[Embedding]:
+        token_counts = [len(self._tokenizer(text)) for text in texts]
+        batches = self.pack(token_counts)
+        futures = [
+            self._executor.submit(self._send, [texts[i] for i in batch], sum(token_counts[i] for i in batch))
+            for batch in batches
+        ]
+        results: List[Optional[Embedding]] = [None] * len(texts)
+        for batch, future in zip(batches, futures):
+            for i, embedding in zip(batch, future.result()):
+                results[i] = embedding
+        return results
+
+class ScheduledEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model so document batches go through an
+    EmbeddingScheduler (token-budget batches, concurrent requests, adaptive
+    rpm/tpm limits). Query embeddings pass straight through.
+    """
+
+    # The scheduler does the batching, so hand it everything at once
+    embed_batch_size: int = 2048
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _scheduler: EmbeddingScheduler = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, scheduler: Optional[EmbeddingScheduler] = None, **kwargs: Any):
+        super().__init__(model_name=embed_model.model_name, callback_manager=embed_model.callback_manager, **kwargs)
+        self._embed_model = embed_model
+        self._scheduler = scheduler or EmbeddingScheduler(single_request_fn(embed_model))
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ScheduledEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    @property
+    def scheduler(self) -> EmbeddingScheduler:
+        return self._scheduler
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._scheduler.embed(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._scheduler.embed, texts)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._scheduler.embed([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._embed_model.aget_query_embedding(query)
@@ -1,12 +1,23 @@
 import os
+import threading
+from typing import Dict, Optional
 from dotenv import load_dotenv
 from pinecone import Pinecone
 from llama_index.core import Settings
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
+from src.utils.metrics import CountedClient, increment
 
 load_dotenv()
 
+# Index methods that each cost one request to Pinecone
+PINECONE_DATA_METHODS = ["query", "upsert", "delete", "fetch", "update", "list", "list_paginated",
+                         "describe_index_stats"]
+
+_pinecone_client: Optional[Pinecone] = None
+_pinecone_indexes: Dict[str, CountedClient] = {}
+_pinecone_lock = threading.RLock()
+
 def init_environment():
     """Initialize environment variables and Pinecone connection"""
     load_dotenv()
@@ -20,15 +31,73 @@ def get_default_pdf_path():
 def setup_llama_index():
     """Setup Llama Index"""
     Settings.llm = get_open_ai_model()
-    Settings.embed_model = OpenAIEmbedding()
+    Settings.embed_model = get_embed_model()
+
+def get_embed_model():
+    """
+    OpenAI embeddings sent through the rate-limit-aware scheduler, behind the
+    local embedding cache. EMBEDDING_SCHEDULER=off / EMBEDDING_CACHE=off
+    turn either layer off.
+    """
+    # Imported here: the cache module depends on src.utils.files, which imports this module
+    from src.embeddings.cache import CachedEmbedding
+    from src.embeddings.scheduler import ScheduledEmbedding
+
+    if is_disabled("EMBEDDING_SCHEDULER"):
+        embed_model = OpenAIEmbedding()
+    else:
+        # The scheduler handles retries; the SDK's own would hide rate limits from it
+        embed_model = ScheduledEmbedding(OpenAIEmbedding(max_retries=0))
+    if is_disabled("EMBEDDING_CACHE"):
+        return embed_model
+    return CachedEmbedding(embed_model)
+
+def is_disabled(env_var):
+    return os.getenv(env_var, "on").lower() in ("off", "0", "false")
 
 def get_open_ai_model():
     """Get OpenAI instance"""
     return OpenAI(model="gpt-4o", temperature=0.2)
 
-def get_pinecone_index():
-    """Get Pinecone index"""
-    return Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(os.getenv("PINECONE_INDEX_NAME"))
+def get_pinecone_client():
+    """Get the process-wide Pinecone client, creating it on first use"""
+    global _pinecone_client
+    with _pinecone_lock:
+        if _pinecone_client is None:
+            _pinecone_client = Pinecone(
+                api_key=os.getenv("PINECONE_API_KEY"),
+                pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4")),
+            )
+        return _pinecone_client
+
+def get_pinecone_index(index_name=None):
+    """
+    Get the shared handle for a Pinecone index (default PINECONE_INDEX_NAME).
+    Handles are created once per index name and reuse their keep-alive
+    connection pool, so repeated calls cost no extra TLS handshakes. Calls
+    are counted in src.utils.metrics under "pinecone.<method>".
+    """
+    index_name = index_name or os.getenv("PINECONE_INDEX_NAME")
+    with _pinecone_lock:
+        if index_name not in _pinecone_indexes:
+            # Passing the host skips the control-plane lookup Index(name) otherwise makes
+            host = os.getenv("PINECONE_INDEX_HOST", "") if index_name == os.getenv("PINECONE_INDEX_NAME") else ""
+            if not host:
+                increment("pinecone.describe_index")
+            index = get_pinecone_client().Index(
+                name=index_name,
+                host=host,
+                connection_pool_maxsize=int(os.getenv("PINECONE_CONNECTION_POOL_SIZE", "16")),
+            )
+            _pinecone_indexes[index_name] = CountedClient(index, "pinecone", PINECONE_DATA_METHODS)
+        return _pinecone_indexes[index_name]
+
+def reset_pinecone_clients():
+    """Drop the shared client and index handles, e.g. after changing credentials"""
+    global _pinecone_client
+    with _pinecone_lock:
+        _pinecone_client = None
+        _pinecone_indexes.clear()
 
 def get_openai_env_vars():
     """Return the OpenAI environment variables"""
@@ -4,7 +4,8 @@ from ..parsing.llama_parse_pdf import load_pdf_as_query_engine
 from braintrust import Eval
 from autoevals import Factuality
 
-llm = load_pdf_as_query_engine("pdfs/disclosures.pdf")
+# Evals must score fresh answers, not ones remembered from earlier runs
+llm = load_pdf_as_query_engine("pdfs/disclosures.pdf", answer_cache=False)
 
 api_key, base_url = get_openai_env_vars()
 
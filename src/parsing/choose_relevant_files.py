@@ -1,8 +1,11 @@
-from typing import List, Tuple
+from pathlib import Path
+from typing import List, Optional, Tuple
+import re
 import sys
 
 from llama_index.core.prompts import PromptTemplate
 
+from src.parsing.file_classifier import AMBIGUOUS, IRRELEVANT, RELEVANT, DecisionCache, FileDecision, classify_files
 from src.utils.directory_info import get_directory_info
 from src.environment import get_open_ai_model
 from src.utils.files import resolve_path
@@ -14,18 +17,20 @@ def format_files_as_csv(file_info: List[Tuple[str, str, str, str]]) -> str:
         csv_lines.append(f"{file_id},{name},{ext},{size}")
     return "\n".join(csv_lines)
 
-def analyze_directory(directory_path: str) -> str:
+def analyze_directory(directory_path: str, file_info: Optional[List[Tuple[str, str, str, str]]] = None) -> str:
     """
     Analyze files in directory and return AI recommendations for relevant files.
     
     Args:
         directory_path (str): Path to directory containing files to analyze
+        file_info: get_directory_info output, if the caller already has it
         
     Returns:
         str: AI analysis results
     """
     # Get file information using directory_info utility
-    file_info = get_directory_info(directory_path)
+    if file_info is None:
+        file_info = get_directory_info(directory_path)
     
     # Convert file info to CSV string
     file_list_csv = format_files_as_csv(file_info)
@@ -47,6 +52,59 @@ def analyze_directory(directory_path: str) -> str:
     
     return response.text
 
+def parse_important_file_ids(response_text: str) -> Optional[List[str]]:
+    """File IDs listed in the <important_files> section of the model's response, or None if it has none"""
+    match = re.search(r"<important_files>(.*?)</important_files>", response_text, re.DOTALL)
+    if not match:
+        return None
+    ids = [line.strip().strip("-*[] ") for line in match.group(1).splitlines()]
+    return [file_id for file_id in ids if file_id]
+
+def choose_relevant_files(directory_path: str, recursive: bool = False,
+                          cache: Optional[DecisionCache] = None) -> List[Path]:
+    """
+    Pick the files in a directory worth parsing. Filename rules settle the
+    obvious ones locally and only the ambiguous rest go to the model; every
+    decision is cached by file ID.
+    
+    Args:
+        directory_path (str): Path to directory containing files to analyze
+        recursive (bool): Also look in nested folders
+        cache: Decision cache to use instead of the default one
+        
+    Returns:
+        List[Path]: The chosen files, in directory order
+    """
+    cache = cache or DecisionCache()
+    file_info = get_directory_info(directory_path, recursive)
+    decisions = classify_files(file_info, cache)
+
+    ambiguous = [row for row, decision in zip(file_info, decisions) if decision.decision == AMBIGUOUS]
+    if ambiguous:
+        print(f"Asking the model about {len(ambiguous)} of {len(file_info)} files")
+        chosen = parse_important_file_ids(analyze_directory(directory_path, ambiguous))
+        if chosen is None:
+            # Don't cache a reply we couldn't read, and don't drop files over it either
+            print(f"No <important_files> in the model's reply, keeping all {len(ambiguous)} ambiguous files")
+            model_decisions = {
+                file_id: FileDecision(file_id, name, RELEVANT, "model reply unreadable", source="llm")
+                for file_id, name, _, _ in ambiguous
+            }
+        else:
+            chosen = set(chosen)
+            model_decisions = {
+                file_id: FileDecision(file_id, name, RELEVANT if file_id in chosen else IRRELEVANT,
+                                      "chosen by the model" if file_id in chosen else "not chosen by the model",
+                                      source="llm")
+                for file_id, name, _, _ in ambiguous
+            }
+            cache.put(list(model_decisions.values()))
+        decisions = [model_decisions.get(decision.file_id, decision) for decision in decisions]
+    else:
+        print(f"Classified all {len(file_info)} files locally, no model call needed")
+
+    return [Path(directory_path) / decision.name for decision in decisions if decision.decision == RELEVANT]
+
 def main():
     if len(sys.argv) > 1:
         directory = sys.argv[1]
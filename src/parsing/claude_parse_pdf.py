@@ -1,7 +1,29 @@
 from anthropic import Anthropic
+import argparse
 import base64
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from pypdf import PdfReader, PdfWriter
 from ..chat.printer import pretty_print
-from src.utils.files import ask_user_for_file_path
+from src.utils.files import ask_user_for_file_path, get_file_hash, resolve_path
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+CLAUDE_BETAS = ["pdfs-2024-09-25", "prompt-caching-2024-07-31"]
+INSPECTION_PROMPT_PATH = "prompts/read_home_inspection.md"
+SUMMARIES_DIR = "summaries"
+PAGES_PER_SHARD = int(os.getenv("CLAUDE_PAGES_PER_SHARD", "20"))
+SHARD_WORKERS = int(os.getenv("CLAUDE_SHARD_WORKERS", "4"))
+SEVERITIES = ["critical_issues", "major_issues", "minor_issues"]
+AREA_PATTERN = re.compile(r'<area name="([^"]+)">(.*?)</area>', re.DOTALL)
+ITEM_PATTERN = re.compile(r"^\s*\d+\.\s*(.+?)\s*$", re.MULTILINE)
+
+class TruncatedResponseError(RuntimeError):
+    """Claude stopped at max_tokens, so the response is missing the end of the report"""
 
 def analyze_pdf_with_claude(pdf_path=None):
     """Analyze a PDF document using Claude's API"""
@@ -22,8 +44,8 @@ def analyze_pdf_with_claude(pdf_path=None):
     # Send the API request
     message = client.beta.messages.create(
         max_tokens=8192,
-        model="claude-3-5-sonnet-20241022",
-        betas=["pdfs-2024-09-25", "prompt-caching-2024-07-31"],
+        model=CLAUDE_MODEL,
+        betas=CLAUDE_BETAS,
         messages=[
             {
                 "role": "user",
@@ -47,9 +69,194 @@ def analyze_pdf_with_claude(pdf_path=None):
 
     return message.content
 
+def read_prompt(prompt_path=INSPECTION_PROMPT_PATH):
+    with open(resolve_path(prompt_path), 'r') as f:
+        return f.read()
+
+def prompt_hash(prompt_text):
+    return hashlib.sha256(prompt_text.encode()).hexdigest()[:12]
+
+def split_pdf(pdf_path, pages_per_shard=PAGES_PER_SHARD) -> List[Tuple[int, int, bytes]]:
+    """
+    Split a PDF (a path or file-like object) into (first page, last page, PDF bytes)
+    shards of up to pages_per_shard pages, 1-indexed
+    """
+    reader = PdfReader(pdf_path)
+    total = len(reader.pages)
+    shards = []
+    for start in range(0, total, pages_per_shard):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + pages_per_shard]:
+            writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        shards.append((start + 1, min(start + pages_per_shard, total), buffer.getvalue()))
+    return shards
+
+def analyze_shard(client, prompt_text, shard, total_pages):
+    """
+    Analyze one page range. The prompt is sent as a cached system prefix, so
+    every shard after the first reads it from the prompt cache.
+    """
+    first, last, pdf_bytes = shard
+    message = client.beta.messages.create(
+        max_tokens=8192,
+        model=CLAUDE_MODEL,
+        betas=CLAUDE_BETAS,
+        system=[{"type": "text", "text": prompt_text, "cache_control": {"type": "ephemeral"}}],
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "document",
+                        "source": {
+                            "type": "base64",
+                            "media_type": "application/pdf",
+                            "data": base64.b64encode(pdf_bytes).decode('utf-8')
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": f"The attached document is pages {first}-{last} of a {total_pages}-page "
+                                f"home inspection report. Report only the issues found on these pages, "
+                                f"in the format described above."
+                    }
+                ]
+            }
+        ],
+    )
+    if message.stop_reason == "max_tokens":
+        raise TruncatedResponseError(f"Response for pages {first}-{last} was cut off at max_tokens")
+    return "".join(block.text for block in message.content if block.type == "text")
+
+def analyze_shard_splitting(client, prompt_text, shard, total_pages) -> List[Tuple[Tuple[int, int, bytes], str]]:
+    """
+    analyze_shard, halving the page range and trying again while the response
+    is cut off at max_tokens; returns the (shard, response) pairs it ended up
+    with. A single page that still doesn't fit raises TruncatedResponseError.
+    """
+    try:
+        return [(shard, analyze_shard(client, prompt_text, shard, total_pages))]
+    except TruncatedResponseError:
+        first, last, pdf_bytes = shard
+        if first == last:
+            raise
+        print(f"Response for pages {first}-{last} was cut off; splitting them in two")
+        halves = split_pdf(io.BytesIO(pdf_bytes), (last - first) // 2 + 1)
+        results = []
+        for half_first, half_last, half_bytes in halves:
+            half = (first + half_first - 1, first + half_last - 1, half_bytes)
+            results.extend(analyze_shard_splitting(client, prompt_text, half, total_pages))
+        return results
+
+def merge_findings(responses: List[str]) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Combine the <area> blocks of several responses: areas with the same name
+    (ignoring case) are merged, and repeated issues are kept once. Areas
+    and issues keep the order they were first seen in.
+    """
+    merged: Dict[str, Dict[str, List[str]]] = {}
+    names: Dict[str, str] = {}
+    for response in responses:
+        for name, body in AREA_PATTERN.findall(response):
+            key = name.strip().lower()
+            names.setdefault(key, name.strip())
+            area = merged.setdefault(names[key], {severity: [] for severity in SEVERITIES})
+            for severity in SEVERITIES:
+                match = re.search(f"<{severity}>(.*?)</{severity}>", body, re.DOTALL)
+                if not match:
+                    continue
+                for issue in ITEM_PATTERN.findall(match.group(1)):
+                    if issue.lower() not in (existing.lower() for existing in area[severity]):
+                        area[severity].append(issue)
+    return merged
+
+def format_findings(merged: Dict[str, Dict[str, List[str]]]) -> str:
+    lines = ["<findings>"]
+    for name, area in merged.items():
+        lines.append(f'<area name="{name}">')
+        for severity in SEVERITIES:
+            if area[severity]:
+                lines.append(f"<{severity}>")
+                lines.extend(f"{i}. {issue}" for i, issue in enumerate(area[severity], 1))
+                lines.append(f"</{severity}>")
+        lines.append("</area>")
+        lines.append("")
+    lines.append("</findings>")
+    return "\n".join(lines)
+
+def section_text(response, tag):
+    match = re.search(f"<{tag}>(.*?)</{tag}>", response, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+def merge_shard_reports(shards, responses) -> str:
+    """One report from per-shard responses: merged findings, then followups and summaries by page range"""
+    followups, summaries = [], []
+    for (first, last, _), response in zip(shards, responses):
+        if section_text(response, "followups"):
+            followups.append(f"Pages {first}-{last}:\n{section_text(response, 'followups')}")
+        if section_text(response, "summary"):
+            summaries.append(f"Pages {first}-{last}: {section_text(response, 'summary')}")
+    return "\n\n".join([
+        format_findings(merge_findings(responses)),
+        "<followups>\n" + "\n\n".join(followups) + "\n</followups>",
+        "<summary>\n" + "\n\n".join(summaries) + "\n</summary>",
+    ])
+
+def analyze_pdf_sharded(pdf_path, pages_per_shard=PAGES_PER_SHARD, max_workers=SHARD_WORKERS, prompt_text=None):
+    """Analyze a PDF in page-range shards concurrently and merge the results into one report"""
+    prompt_text = prompt_text or read_prompt()
+    shards = split_pdf(pdf_path, pages_per_shard)
+    total_pages = shards[-1][1] if shards else 0
+    print(f"Analyzing {total_pages} pages in {len(shards)} shards of up to {pages_per_shard} pages")
+
+    client = Anthropic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = [pair for pairs in executor.map(
+            lambda shard: analyze_shard_splitting(client, prompt_text, shard, total_pages), shards) for pair in pairs]
+    return merge_shard_reports([shard for shard, _ in results], [response for _, response in results])
+
+def cached_report_path(file_hash, prompt_text) -> Optional[Path]:
+    """A report in summaries/ already generated for this file and prompt, if there is one"""
+    matches = sorted(Path(resolve_path(SUMMARIES_DIR)).glob(f"*.{file_hash}.{prompt_hash(prompt_text)}.md"))
+    return matches[0] if matches else None
+
+def analyze_inspection_report(pdf_path=None, pages_per_shard=PAGES_PER_SHARD, refresh=False):
+    """
+    Sharded analysis of an inspection report, cached in summaries/ by (file
+    hash, prompt hash) so an unchanged report is never sent twice. Nothing
+    is cached if a response was cut off (TruncatedResponseError).
+
+    Args:
+        pdf_path: Report to analyze; asks for one when not given
+        pages_per_shard: Pages sent to Claude per request
+        refresh: Regenerate even if a cached report exists
+
+    Returns:
+        str: The merged report (<findings>, <followups>, <summary>)
+    """
+    if pdf_path is None:
+        pdf_path = ask_user_for_file_path()
+
+    prompt_text = read_prompt()
+    file_hash = get_file_hash(pdf_path)
+    cached = None if refresh else cached_report_path(file_hash, prompt_text)
+    if cached:
+        print(f"Using cached analysis {cached}")
+        return cached.read_text()
+
+    report = analyze_pdf_sharded(pdf_path, pages_per_shard, prompt_text=prompt_text)
+    output_path = Path(resolve_path(SUMMARIES_DIR)) / f"{Path(pdf_path).stem}.{file_hash}.{prompt_hash(prompt_text)}.md"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(report)
+    print(f"Saved analysis to {output_path}")
+    return report
+
 if __name__ == "__main__":
-    # response = analyze_pdf_with_claude()
-    response = """
-I\'ll analyze this home inspection report carefully, using my inner monologue to identify and categorize issues.\n\nLet me review the report methodically...\n\nI notice this is a property at 678 Connie Avenue in San Mateo, CA. The inspection was conducted on 9/18/2024. Looking through the findings...\n\nI see several concerning patterns emerging. Let me organize these by area and severity:\n\n<findings>\n<area name="Electrical">\n<critical_issues>\n1. Federal Pacific Electric Company electrical panel identified - known for product defects and potential fire hazards\n2. Exposed and unprotected electrical wiring in kitchen island cabinets\n3. Worn insulation on electrical service entrance connections exposing live conductor connectors\n</critical_issues>\n<major_issues>\n1. Missing cover plate at 240-volt receptacle in garage near water heater\n2. No AFCI protection installed in building\n3. Unable to confirm presence of electrical grounding electrode\n</major_issues>\n<minor_issues>\n1. Damaged doorbell button\n2. Damaged cover latch at main electrical panel\n</minor_issues>\n</area>\n\n<area name="Exterior">\n<critical_issues>\n1. Damage/deterioration in plywood siding at left side, right side and rear\n2. Damage/deterioration in fascia boards at multiple locations\n</critical_issues>\n<major_issues>\n1. Deterioration in eave boards at multiple locations\n2. Poor drainage - downspouts discharge next to building, risking foundation issues\n3. Corrosion and evidence of past leakage at exterior main water shut-off valve\n</major_issues>\n<minor_issues>\n1. Weathered/peeling paint in various locations\n2. Small to moderate cracks in driveway, patio and walkways\n3. Trip hazards from lifted/settled right side patio\n</minor_issues>\n</area>\n\n<area name="Plumbing">\n<critical_issues>\n1. Corroded galvanized steel water supply lines nearing end of useful life\n</critical_issues>\n<major_issues>\n1. Water heater temperature/pressure relief valve discharge pipe improperly terminated\n2. No drain pan installed under water heater\n3. No gas valve shut-off wrench near meter\n</major_issues>\n<minor_issues>\n1. Missing back-flow prevention devices at hose bibs\n2. No T-pipe extension on water heater gas supply piping\n</minor_issues>\n</area>\n\n<area name="Roof">\n<major_issues>\n1. Evidence of past pooling water on roof surface\n2. Wear and tear to roofing surface with loose/damaged material at front\n3. Cracked/eroded mortar cap at chimney top\n</major_issues>\n<minor_issues>\n1. Unpainted ABS plastic plumbing vents above roofline\n2. Mastic flashings at rooftop penetrations showing wear\n3. Boiler condensate drain improperly discharging onto roof surface\n</minor_issues>\n</area>\n\n<area name="Interior">\n<major_issues>\n1. Left and middle bedroom windows too high for emergency egress (>44" from floor)\n2. Sloped floors in living room and master bedroom indicating possible settlement\n3. Older smoke alarms that may not be reliable\n</major_issues>\n<minor_issues>\n1. Missing center floor guide at left rear bedroom closet doors\n2. Worn/torn window screens\n3. Deteriorated mortar/bricks in fireplace\n</minor_issues>\n</area>\n\n</findings>\n\n<summary>\nThis 68-year-old home presents several significant concerns that warrant careful consideration. The most pressing issues are:\n\n1. The Federal Pacific Electric panel, which is a known safety hazard and should be considered for immediate replacement.\n2. Deteriorating exterior components (siding, fascia, eaves) that could lead to water intrusion and further damage.\n3. Aging plumbing system with corroded galvanized pipes that may need comprehensive replacement.\n4. Signs of structural settlement indicated by sloped floors and foundation concerns.\n5. Multiple electrical safety issues requiring professional attention.\n\nWhile many of the issues are typical for a home of this age, the combination of electrical, plumbing, and structural concerns suggests significant updating and repairs may be needed. A buyer should carefully consider these factors when evaluating this property, as several of the identified issues could require substantial investment to address properly.\n</summary>
- """
-    print(response)
+    parser = argparse.ArgumentParser(description="Analyze a home inspection report with Claude")
+    parser.add_argument("pdf_path", nargs="?")
+    parser.add_argument("--pages-per-shard", type=int, default=PAGES_PER_SHARD)
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached report in summaries/")
+    args = parser.parse_args()
+    pretty_print(analyze_inspection_report(args.pdf_path, args.pages_per_shard, args.refresh))
@@ -0,0 +1,211 @@
+"""
+Local first pass over a disclosure package's filenames. Keyword and
+synonym rules, plus fuzzy matching for misspellings and odd abbreviations,
+settle the obvious files (the report types prompts/choose_relevant_files.md
+asks for, and the standard forms it says to skip). Only the files the
+rules can't place are left for the LLM. Decisions are cached by
+generate_file_id, so a package is only ever classified once.
+
+Usage: python -m src.parsing.file_classifier <directory> [--recursive]
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.directory_info import get_directory_info
+from src.utils.files import get_cache_dir
+
+# Bump when the rules change, so cached rule decisions are recomputed (LLM decisions are kept)
+RULES_VERSION = 2
+
+RELEVANT = "relevant"
+IRRELEVANT = "irrelevant"
+AMBIGUOUS = "ambiguous"
+
+# Report types worth parsing and the names they go by, from prompts/choose_relevant_files.md
+DOCUMENT_TYPES: Dict[str, List[str]] = {
+    "home_inspection": ["home inspection", "property inspection", "house inspection", "building inspection",
+                        "general inspection", "buyer inspection", "seller inspection", "inspection report",
+                        "physical inspection"],
+    "pest_inspection": ["termite", "pest", "wood destroying", "wdo", "wdi", "organism", "section 1",
+                        "fumigation", "mold inspection"],
+    "natural_hazard": ["natural hazard", "nhd", "hazard report", "hazard disclosure", "jcp", "geologic",
+                       "environmental hazard", "disclosure source", "property id"],
+    "roof_inspection": ["roof"],
+    "foundation_inspection": ["foundation", "structural", "crawlspace", "crawl space"],
+}
+# Standard transaction paperwork the prompt says to skip
+SKIP_KEYWORDS = [
+    "disclosure", "tds", "spq", "avid", "sbsa", "advisory", "addendum", "agreement", "contract", "counter",
+    "purchase", "escrow", "preliminary title", "prelim", "title report", "cc r", "ccr", "bylaws", "hoa",
+    "receipt", "questionnaire", "statement", "lead based paint", "lead paint", "smoke", "carbon monoxide",
+    "water heater", "megan", "wire fraud", "disclaimer", "instructions", "checklist", "signature",
+    "listing", "mls", "marketing", "brochure", "flyer", "photo", "floor plan", "floorplan", "budget",
+    "financial", "minutes", "insurance", "invoice", "permit", "utility", "sewer lateral certificate",
+]
+# Sizes are listed to 0.1MB, so this catches the ones listed as 0.0MB
+MIN_RELEVANT_BYTES = 50 * 1024
+# SequenceMatcher ratios for a name fragment against a keyword
+FUZZY_MATCH = 0.85
+FUZZY_MAYBE = 0.75
+
+@dataclass
+class FileDecision:
+    file_id: str
+    name: str
+    decision: str
+    reason: str
+    document_type: Optional[str] = None
+    source: str = "rules"
+    rules_version: int = RULES_VERSION
+
+def normalize_name(name: str) -> str:
+    """'Inspections/HomeInspection_Report-v2.pdf' -> 'inspections home inspection report v2'"""
+    stem = os.path.splitext(name)[0]
+    stem = re.sub(r"([a-z])([A-Z])", r"\1 \2", stem)
+    return " ".join(re.findall(r"[a-z0-9]+", stem.lower()))
+
+@lru_cache(maxsize=None)
+def phrase_pattern(phrase: str):
+    return re.compile(rf"\b{re.escape(phrase)}s?\b")
+
+def contains_phrase(text: str, phrase: str) -> bool:
+    """Whole-word match, allowing a plural"""
+    return phrase_pattern(phrase).search(text) is not None
+
+@lru_cache(maxsize=65536)
+def word_similarity(word: str, target: str) -> float:
+    # Upper bounds on the ratio rule out most pairs without the full comparison:
+    # first from the lengths alone, then from the letters they share
+    if 2 * min(len(word), len(target)) / (len(word) + len(target)) < FUZZY_MAYBE:
+        return 0.0
+    matcher = SequenceMatcher(None, word, target, autojunk=False)
+    if matcher.quick_ratio() < FUZZY_MAYBE:
+        return 0.0
+    return matcher.ratio()
+
+def fuzzy_score(text: str, phrase: str) -> float:
+    """
+    How well every word of phrase is matched by some word of text (the
+    weakest word's best SequenceMatcher ratio), so 'hme inspction' scores
+    high against 'home inspection' but 'chimney inspection' doesn't.
+    """
+    words = set(text.split())
+    if not words:
+        return 0.0
+    return min(max(word_similarity(word, target) for word in words) for target in phrase.split())
+
+def size_in_bytes(size: str) -> float:
+    """Size column from get_directory_info, e.g. '2.4MB'"""
+    return float(size.rstrip("MB")) * 1024 * 1024
+
+def classify_file(file_id: str, name: str, extension: str, size: str) -> FileDecision:
+    """Decide from the filename alone; AMBIGUOUS when the rules can't tell"""
+    if extension.lower() != ".pdf":
+        return FileDecision(file_id, name, IRRELEVANT, f"not a PDF ({extension})")
+
+    text = normalize_name(name)
+    # Skip keywords only count outside the report names, so "Natural Hazard Disclosure" isn't a disclosure form
+    rest = list(text)
+    for keywords in DOCUMENT_TYPES.values():
+        for keyword in keywords:
+            for match in phrase_pattern(keyword).finditer(text):
+                rest[match.start():match.end()] = " " * (match.end() - match.start())
+    rest = "".join(rest)
+    skip_keyword = next((keyword for keyword in SKIP_KEYWORDS if contains_phrase(rest, keyword)), None)
+
+    for document_type, keywords in DOCUMENT_TYPES.items():
+        for keyword in keywords:
+            if contains_phrase(text, keyword):
+                # e.g. "Buyer Inspection Advisory" or "Pest Control Invoice": a form or receipt about a report
+                if skip_keyword is not None:
+                    return FileDecision(file_id, name, AMBIGUOUS, f"matches '{keyword}' and '{skip_keyword}'",
+                                        document_type)
+                # A report that is only a few KB is more likely a cover page or receipt
+                if size_in_bytes(size) < MIN_RELEVANT_BYTES:
+                    return FileDecision(file_id, name, AMBIGUOUS, f"matches '{keyword}' but only {size}",
+                                        document_type)
+                return FileDecision(file_id, name, RELEVANT, f"matches '{keyword}'", document_type)
+
+    if skip_keyword is not None:
+        return FileDecision(file_id, name, IRRELEVANT, f"standard form ('{skip_keyword}')")
+
+    best_score, best_keyword, best_type = 0.0, None, None
+    for document_type, keywords in DOCUMENT_TYPES.items():
+        for keyword in keywords:
+            # Fuzzy matching very short keywords (nhd, wdo...) mostly finds coincidences
+            if len(keyword) < 5:
+                continue
+            score = fuzzy_score(text, keyword)
+            if score > best_score:
+                best_score, best_keyword, best_type = score, keyword, document_type
+    if best_score >= FUZZY_MATCH:
+        return FileDecision(file_id, name, RELEVANT, f"close to '{best_keyword}' ({best_score:.2f})", best_type)
+    if best_score >= FUZZY_MAYBE:
+        return FileDecision(file_id, name, AMBIGUOUS, f"resembles '{best_keyword}' ({best_score:.2f})", best_type)
+    return FileDecision(file_id, name, AMBIGUOUS, "no rule matched")
+
+class DecisionCache:
+    """Relevance decisions by file ID (see generate_file_id), in one JSON file"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.path = Path(cache_dir or get_cache_dir("file_decisions")) / "decisions.json"
+        self._lock = threading.Lock()
+        self._decisions: Dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self._decisions = json.load(f)
+
+    def get(self, file_id: str) -> Optional[FileDecision]:
+        entry = self._decisions.get(file_id)
+        if entry is None or (entry["source"] == "rules" and entry["rules_version"] != RULES_VERSION):
+            return None
+        return FileDecision(**entry)
+
+    def put(self, decisions: List[FileDecision]) -> None:
+        with self._lock:
+            for decision in decisions:
+                self._decisions[decision.file_id] = asdict(decision)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(self._decisions, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+def classify_files(file_info: List[Tuple[str, str, str, str]],
+                   cache: Optional[DecisionCache] = None) -> List[FileDecision]:
+    """Decisions for get_directory_info rows, from the cache where possible"""
+    cache = cache or DecisionCache()
+    decisions, fresh = [], []
+    for row in file_info:
+        decision = cache.get(row[0])
+        if decision is None:
+            decision = classify_file(*row)
+            fresh.append(decision)
+        decisions.append(decision)
+    # Ambiguous files are cached once the LLM has decided them
+    settled = [decision for decision in fresh if decision.decision != AMBIGUOUS]
+    if settled:
+        cache.put(settled)
+    return decisions
+
+def print_decisions(decisions: List[FileDecision]) -> None:
+    for decision in decisions:
+        print(f"{decision.file_id}  {decision.decision:<11} {decision.source:<6} {decision.name}  ({decision.reason})")
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    start = time.perf_counter()
+    file_info = get_directory_info(args[0] if args else ".", recursive="--recursive" in sys.argv)
+    decisions = classify_files(file_info)
+    elapsed = time.perf_counter() - start
+    print_decisions(decisions)
+    ambiguous = sum(1 for decision in decisions if decision.decision == AMBIGUOUS)
+    print(f"\nClassified {len(decisions)} files in {elapsed * 1000:.1f}ms; {ambiguous} left for the LLM")
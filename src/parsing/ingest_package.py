@@ -0,0 +1,153 @@
+"""
+Batch ingestion of a whole disclosure package (a directory of PDFs), with
+no prompts: choose_relevant_files picks the relevant files, then each
+file goes through parse -> chunk -> embed -> upsert. The stages run
+concurrently, connected by bounded queues, so LlamaParse can be working on
+the next file while the previous one is embedded and written. Files already
+in the namespace are skipped, and parsing reuses the parse cache.
+
+Usage: python -m src.parsing.ingest_package <directory> [--namespace NS] [--all] [--recursive]
+"""
+import argparse
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from llama_index.core import Document, Settings
+from llama_index.core.indices.utils import embed_nodes
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode
+
+from src.embeddings.cache import EmbeddingCacheUsage, exclude_document_metadata
+from src.environment import setup_llama_index
+from src.parsing.choose_relevant_files import choose_relevant_files
+from src.parsing.llama_parse_pdf import load_data
+from src.parsing.parse_cache import ParseCache
+from src.utils.files import get_file_hash
+from src.utils.pipeline import Pipeline, Stage
+from src.vector_stores.backends import VectorBackend, get_backend
+from src.vector_stores.pinecone import DEFAULT_NAMESPACE
+
+PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", "4"))
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "2"))
+
+@dataclass
+class PackageFile:
+    path: Path
+    file_hash: str
+    documents: List[Document] = field(default_factory=list)
+    nodes: List[BaseNode] = field(default_factory=list)
+
+    def __str__(self):
+        return self.path.name
+
+def pending_files(paths: List[Path], backend: VectorBackend) -> List[Tuple[Path, str]]:
+    """(path, file hash) for each file the backend hasn't finished ingesting; partial ingestions are deleted"""
+    pending = []
+    for path in paths:
+        file_hash = get_file_hash(str(path))
+        if backend.is_ingested(file_hash):
+            print(f"Skipping {path.name}: already in {backend.name}")
+            continue
+        if backend.exists_by_hash(file_hash):
+            print(f"Deleting {path.name}'s nodes from an unfinished ingestion")
+            backend.delete_by_hash(file_hash)
+        pending.append((path, file_hash))
+    return pending
+
+def build_pipeline(backend: VectorBackend, parse_cache: Optional[ParseCache] = None,
+                   parse_workers: int = PARSE_WORKERS, queue_size: int = QUEUE_SIZE) -> Pipeline:
+    """The parse -> chunk -> embed -> upsert stages for one backend"""
+    parse_cache = parse_cache or ParseCache()
+
+    def parse(item: Tuple[Path, str]) -> PackageFile:
+        path, file_hash = item
+        documents = load_data(str(path), file_hash, parse_cache)
+        for doc in documents:
+            doc.metadata["file_hash"] = file_hash
+            doc.metadata["file_name"] = path.name
+        exclude_document_metadata(documents)
+        return PackageFile(path, file_hash, documents)
+
+    def chunk(package_file: PackageFile) -> PackageFile:
+        package_file.nodes = run_transformations(package_file.documents, Settings.transformations)
+        return package_file
+
+    def embed(package_file: PackageFile) -> PackageFile:
+        embeddings = embed_nodes(package_file.nodes, Settings.embed_model)
+        for node in package_file.nodes:
+            node.embedding = embeddings[node.node_id]
+        return package_file
+
+    def upsert(package_file: PackageFile) -> PackageFile:
+        backend.upsert_nodes(package_file.nodes)
+        backend.record_ingestion(package_file.file_hash, len(package_file.nodes))
+        print(f"Indexed {package_file.path.name}: {len(package_file.nodes)} nodes")
+        return package_file
+
+    return Pipeline([
+        Stage("parse", parse, workers=parse_workers, unit="pages", size=lambda f: len(f.documents)),
+        Stage("chunk", chunk, unit="nodes", size=lambda f: len(f.nodes)),
+        Stage("embed", embed, unit="nodes", size=lambda f: len(f.nodes)),
+        Stage("upsert", upsert, unit="nodes", size=lambda f: len(f.nodes)),
+    ], queue_size=queue_size, describe=lambda item: item[0].name if isinstance(item, tuple) else str(item))
+
+def ingest_files(paths: List[Path], namespace: str = DEFAULT_NAMESPACE,
+                 backend: Optional[VectorBackend] = None, **pipeline_kwargs) -> List[PackageFile]:
+    """
+    Parse, chunk, embed and upsert files into a namespace.
+
+    Args:
+        paths: Files to ingest; ones already in the namespace are skipped
+        namespace: Namespace whose configured backend receives the nodes
+        backend: Backend to use instead of the namespace's configured one
+
+    Returns:
+        List[PackageFile]: The files that were ingested
+    """
+    backend = backend or get_backend(namespace)
+    pending = pending_files(paths, backend)
+    if not pending:
+        print("Nothing to ingest")
+        return []
+
+    print(f"\n=== Ingesting {len(pending)} files into {backend.name}/{namespace} ===")
+    pipeline = build_pipeline(backend, **pipeline_kwargs)
+    cache_usage = EmbeddingCacheUsage()
+    ingested = pipeline.run(pending)
+    backend.persist()
+    pipeline.print_report()
+    print(cache_usage.summary())
+    print(f"Ingested {len(ingested)} of {len(pending)} files")
+    return ingested
+
+def ingest_package(directory: str, namespace: str = DEFAULT_NAMESPACE, select: bool = True,
+                   recursive: bool = False, **kwargs) -> List[PackageFile]:
+    """Ingest the relevant files of a disclosure package (every PDF when select is False)"""
+    if select:
+        paths = choose_relevant_files(directory, recursive)
+        print(f"Selected {len(paths)} files: {', '.join(path.name for path in paths)}")
+    else:
+        files = Path(directory).rglob("*") if recursive else Path(directory).iterdir()
+        paths = sorted(p for p in files if p.suffix.lower() == ".pdf")
+    return ingest_files(paths, namespace, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a disclosure package directory")
+    parser.add_argument("directory")
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE)
+    parser.add_argument("--all", action="store_true", help="ingest every PDF instead of choosing the relevant ones")
+    parser.add_argument("--recursive", action="store_true", help="include nested folders")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_llama_index()
+    ingest_package(args.directory, args.namespace, select=not args.all, recursive=args.recursive,
+                   parse_workers=args.parse_workers, queue_size=args.queue_size)
+
+if __name__ == "__main__":
+    main()
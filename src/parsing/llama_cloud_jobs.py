@@ -0,0 +1,234 @@
+"""
+Bulk import of LlamaCloud parse jobs into a namespace, for backfills of
+hundreds of job IDs. Each job's raw markdown is streamed over a shared
+keep-alive session and split into sections (on PAGE_SEPARATOR) as it
+arrives; every few sections are embedded and upserted straight away, so
+memory stays flat however long the document is. Jobs run in parallel up
+to a fixed number of workers, and a job that fails part way is deleted
+from the namespace and retried from the start. A job only counts as
+imported once it is in the ingestion manifest, so one left half-written
+by a killed run is deleted and imported again on the next.
+
+Jobs are given as job IDs, or "job_id,file_hash" lines in a file (the file
+hash defaults to the job ID, as in load_job_as_query_engine).
+
+Usage: python -m src.parsing.llama_cloud_jobs <job_id ...|jobs.txt> [--namespace NS] [--workers N]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+from llama_index.core import Document
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.embeddings.cache import EmbeddingCacheUsage, exclude_document_metadata
+from src.environment import setup_llama_index
+from src.parsing.parse_cache import PAGE_SEPARATOR
+from src.vector_stores.backends import VectorBackend, get_backend
+from src.vector_stores.pinecone import DEFAULT_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+LLAMA_CLOUD_BASE_URL = "https://api.cloud.llamaindex.ai"
+JOB_IMPORT_WORKERS = int(os.getenv("JOB_IMPORT_WORKERS", "8"))
+# (connect, read) seconds; the read timeout is per chunk of a streamed body, not the whole download
+JOB_REQUEST_TIMEOUT = (10, 60)
+JOB_MAX_ATTEMPTS = 3
+STREAM_CHUNK_SIZE = 64 * 1024
+# Sections embedded and upserted together while a job streams in
+SECTIONS_PER_BATCH = 16
+# Failures of the stream itself, after the session's own retries, that are worth restarting a job for
+STREAM_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def llama_cloud_url(path: str) -> str:
+    """Full URL for an API path, against LLAMA_CLOUD_BASE_URL when set (e.g. a local stand-in)"""
+    return (os.getenv("LLAMA_CLOUD_BASE_URL") or LLAMA_CLOUD_BASE_URL).rstrip("/") + path
+
+def new_llama_cloud_session(pool_size: int = JOB_IMPORT_WORKERS) -> requests.Session:
+    """Keep-alive session with pool_size connections that retries throttling and 5xx responses"""
+    session = requests.Session()
+    retries = Retry(total=4, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Authorization": f"Bearer {os.getenv('LLAMA_CLOUD_API_KEY')}"})
+    return session
+
+def get_llama_cloud_session() -> requests.Session:
+    """The process-wide LlamaCloud session, created on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = new_llama_cloud_session()
+        return _session
+
+def iter_sections(chunks: Iterable[str], separator: str = PAGE_SEPARATOR) -> Iterator[str]:
+    """
+    Split streamed text on separator as it arrives; yields exactly what
+    "".join(chunks).split(separator) would, holding one section at a time.
+    """
+    buffer = ""
+    for chunk in chunks:
+        # A separator may straddle the previous chunk and this one, but nothing earlier can match
+        start = max(0, len(buffer) - len(separator) + 1)
+        buffer += chunk
+        while True:
+            index = buffer.find(separator, start)
+            if index < 0:
+                break
+            yield buffer[:index]
+            buffer = buffer[index + len(separator):]
+            start = 0
+    yield buffer
+
+def stream_job_sections(job_id: str, session: Optional[requests.Session] = None) -> Iterator[str]:
+    """Sections of a job's markdown result, split while the body streams in"""
+    session = session or get_llama_cloud_session()
+    url = llama_cloud_url(f"/api/v1/parsing/job/{job_id}/result/raw/markdown")
+    with session.get(url, stream=True, timeout=JOB_REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        if "charset" not in response.headers.get("Content-Type", ""):
+            response.encoding = "utf-8"
+        yield from iter_sections(response.iter_content(chunk_size=STREAM_CHUNK_SIZE, decode_unicode=True))
+
+class JobImporter:
+    """
+    Imports jobs into one backend with a bounded pool of workers. Chunking
+    and embedding run in the workers; upserts to the backend are serialized,
+    since the local backend's store isn't safe for concurrent writes.
+    """
+
+    def __init__(self, backend: VectorBackend, max_workers: int = JOB_IMPORT_WORKERS,
+                 session: Optional[requests.Session] = None, sections_per_batch: int = SECTIONS_PER_BATCH,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, backoff: float = 1.0):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.session = session or (get_llama_cloud_session() if max_workers <= JOB_IMPORT_WORKERS
+                                   else new_llama_cloud_session(max_workers))
+        self.sections_per_batch = sections_per_batch
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.stats = {"imported": 0, "skipped": 0, "failed": 0, "sections": 0, "nodes": 0, "retries": 0}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _count(self, **amounts) -> None:
+        with self._lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+    def _write(self, documents: List[Document]) -> int:
+        nodes = self.backend.embed_documents(exclude_document_metadata(documents))
+        with self._write_lock:
+            # A line per batch would bury the summary in a backfill of hundreds of jobs
+            self.backend.upsert_nodes(nodes, verbose=False)
+        return len(nodes)
+
+    def import_job(self, job_id: str, file_hash: Optional[str] = None) -> int:
+        """Stream one job into the backend; returns how many nodes were written (0 if already there)"""
+        file_hash = file_hash or job_id
+        if self.backend.is_ingested(file_hash):
+            self._count(skipped=1)
+            return 0
+        if self.backend.exists_by_hash(file_hash):
+            # Left by an import that was killed part way; the job is streamed again from the start
+            logger.warning(f"Job {job_id} was only partly imported; deleting its nodes and importing it again")
+            with self._write_lock:
+                self.backend.delete_by_hash(file_hash)
+
+        for attempt in range(1, self.max_attempts + 1):
+            node_count, section_count, batch = 0, 0, []
+            try:
+                for section in stream_job_sections(job_id, self.session):
+                    if not section.strip():
+                        continue
+                    section_count += 1
+                    batch.append(Document(text=section.strip(), metadata={"file_hash": file_hash, "job_id": job_id}))
+                    if len(batch) >= self.sections_per_batch:
+                        node_count += self._write(batch)
+                        batch = []
+                if batch:
+                    node_count += self._write(batch)
+            except Exception as e:
+                # Partial results would be duplicated by a retry or left behind by a failure
+                if node_count:
+                    with self._write_lock:
+                        self.backend.delete_by_hash(file_hash)
+                if attempt == self.max_attempts or not isinstance(e, STREAM_ERRORS):
+                    raise
+                self._count(retries=1)
+                logger.warning(f"Job {job_id} failed mid-stream ({e}); retrying ({attempt}/{self.max_attempts})")
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            self.backend.record_ingestion(file_hash, node_count)
+            self._count(imported=1, sections=section_count, nodes=node_count)
+            return node_count
+
+    def import_jobs(self, jobs: List[Tuple[str, Optional[str]]]) -> dict:
+        """Import (job_id, file_hash) pairs concurrently; failed jobs are logged and counted"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job-import") as executor:
+            futures = {executor.submit(self.import_job, job_id, file_hash): job_id for job_id, file_hash in jobs}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._count(failed=1)
+                    logger.error(f"Failed to import job {futures[future]}: {e}")
+        self.backend.persist()
+        self.stats["seconds"] = time.perf_counter() - start
+        return self.stats
+
+def read_jobs(args: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """(job_id, file_hash) pairs from job IDs and/or files of "job_id[,file_hash]" lines"""
+    jobs = []
+    for arg in args:
+        if os.path.isfile(arg):
+            with open(arg, 'r') as f:
+                lines = f.read().splitlines()
+        else:
+            lines = [arg]
+        for line in lines:
+            if line.strip() and not line.startswith("#"):
+                job_id, _, file_hash = line.strip().partition(",")
+                jobs.append((job_id.strip(), file_hash.strip() or None))
+    return jobs
+
+def import_llama_cloud_jobs(jobs: List[Tuple[str, Optional[str]]], namespace: str = DEFAULT_NAMESPACE,
+                            max_workers: int = JOB_IMPORT_WORKERS) -> dict:
+    """Import LlamaCloud job results into a namespace's backend and print a summary"""
+    backend = get_backend(namespace)
+    print(f"\n=== Importing {len(jobs)} LlamaCloud jobs into {backend.name}/{namespace} ===")
+    cache_usage = EmbeddingCacheUsage()
+    stats = JobImporter(backend, max_workers=max_workers).import_jobs(jobs)
+    print(f"Imported {stats['imported']} jobs ({stats['sections']} sections, {stats['nodes']} nodes), "
+          f"skipped {stats['skipped']}, failed {stats['failed']}, {stats['retries']} retries "
+          f"in {stats['seconds']:.1f}s")
+    print(cache_usage.summary())
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Import LlamaCloud parse jobs into a vector namespace")
+    parser.add_argument("jobs", nargs="+", help="job IDs or files of job_id[,file_hash] lines")
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE)
+    parser.add_argument("--workers", type=int, default=JOB_IMPORT_WORKERS)
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_llama_index()
+    import_llama_cloud_jobs(read_jobs(args.jobs), args.namespace, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
 import os
-import requests
+from src.chat.answer_cache import cached_query_engine
+from src.embeddings.cache import EmbeddingCacheUsage, exclude_document_metadata
+from src.parsing.llama_cloud_jobs import JOB_REQUEST_TIMEOUT, get_llama_cloud_session, llama_cloud_url
+from src.parsing.parse_cache import PAGE_SEPARATOR, ParseCache
 from src.utils.files import get_file_hash, ask_user_for_file_path
-from src.vector_stores.pinecone import check_file_hash_exists, get_pinecone, get_query_engine_by_file_hash
+from src.vector_stores.backends import get_backend
+from src.vector_stores.pinecone import DEFAULT_NAMESPACE
 from llama_parse import LlamaParse
 from llama_index.core import (
     Settings,
-    VectorStoreIndex, 
     SimpleDirectoryReader,
     Document
 )
 
+# Everything that changes LlamaParse's output; part of the parse cache key
+LLAMA_PARSE_SETTINGS = {"result_type": "markdown"}
+LLAMA_CLOUD_RESULT_SETTINGS = {"source": "llamacloud_job", "result_type": "markdown"}
+
 def get_llama_parser():
     """Get LlamaParse instance with API key"""
     api_key = os.getenv("LLAMA_CLOUD_API_KEY")
@@ -17,80 +24,118 @@ def get_llama_parser():
         raise ValueError("LLAMA_CLOUD_API_KEY environment variable not set")
     return LlamaParse(
         api_key=api_key,
-        result_type="markdown"
+        **LLAMA_PARSE_SETTINGS
     )
 
-def load_pdf_as_query_engine(pdf_path=None):
-    """Get or create index for PDF document"""
+def load_pdf_as_query_engine(pdf_path=None, namespace=DEFAULT_NAMESPACE, streaming=False, answer_cache=True):
+    """
+    Get or create index for PDF document in the namespace's vector backend (Pinecone by default).
+    With streaming=True the engine returns StreamingResponses, for chat_loop to render as they arrive.
+    With answer_cache=True it sits behind the answer cache for this file hash (see src.chat.answer_cache).
+    """
     if pdf_path is None:
         pdf_path = ask_user_for_file_path()
 
     file_hash = get_file_hash(pdf_path)
     print(f"\nDocument hash: {file_hash}")
 
-    storage_context = get_pinecone()
+    backend = get_backend(namespace)
 
-    if check_file_hash_exists(file_hash):
-        print("\n=== Found existing vectors in Pinecone, loading index ===")
-        return get_query_engine_by_file_hash(file_hash)
+    if backend.is_ingested(file_hash):
+        print(f"\n=== Found existing vectors in {backend.name}, loading index ===")
+        query_engine = backend.file_hash_query_engine(file_hash, streaming=streaming)
+        return cached_query_engine(query_engine, file_hash) if answer_cache else query_engine
+    if backend.exists_by_hash(file_hash):
+        print(f"\n=== Deleting vectors left by an unfinished ingestion from {backend.name} ===")
+        backend.delete_by_hash(file_hash)
     
     print(f"\n=== Loading and indexing new PDF Document {pdf_path} ===")
-    documents = load_data(pdf_path)
+    documents = load_data(pdf_path, file_hash)
     
     # Add file hash to document metadata
     for doc in documents:
         doc.metadata["file_hash"] = file_hash
+    exclude_document_metadata(documents)
     
-    index = VectorStoreIndex.from_documents(
-        documents,
-        storage_context=storage_context
-    )
+    index_documents(documents, backend, file_hash)
+    # Filtered to this file like the existing-vectors path, since its answers are cached under file_hash
+    query_engine = backend.file_hash_query_engine(file_hash, streaming=streaming)
+    return cached_query_engine(query_engine, file_hash) if answer_cache else query_engine
+
+def index_documents(documents, backend, file_hash):
+    """Chunk, embed and upsert documents, then record them in the ingestion manifest; returns the nodes"""
+    cache_usage = EmbeddingCacheUsage()
+    nodes = backend.insert_documents(documents)
+    backend.persist()
+    backend.record_ingestion(file_hash, len(nodes))
     
     print(f"\nIndex Stats:")
-    print(f"Number of nodes: {len(index.docstore.docs)}")
+    print(f"Number of nodes: {len(nodes)}")
     print(f"Embedding model: {Settings.embed_model}")
+    print(cache_usage.summary())
     print(f"LLM model: {Settings.llm}")
     
-    return index.as_query_engine()
+    return nodes
+
+def load_data(pdf_path, file_hash=None, parse_cache=None):
+    """Load and parse PDF document, reusing the parse cache for documents seen before"""
+    file_hash = file_hash or get_file_hash(pdf_path)
+    parse_cache = parse_cache or ParseCache()
+    documents = parse_cache.get_documents(file_hash, LLAMA_PARSE_SETTINGS)
+    if documents is not None:
+        print(f"Loaded {len(documents)} parsed pages from the parse cache")
+        return documents
 
-def load_data(pdf_path):
-    """Load and parse PDF document"""
     parser = get_llama_parser()
     file_extractor = {".pdf": parser}
     reader = SimpleDirectoryReader(
         input_files=[pdf_path], 
         file_extractor=file_extractor
     )
-    return reader.load_data()
+    documents = reader.load_data()
+    parse_cache.put_documents(file_hash, LLAMA_PARSE_SETTINGS, documents)
+    return documents
 
-def get_job_results(job_id):
-    """Get parsed results from LlamaCloud job ID"""
-    
-    url = f"https://api.cloud.llamaindex.ai/api/v1/parsing/job/{job_id}/result/markdown"
+def get_job_results(job_id, parse_cache=None):
+    """Get parsed results from LlamaCloud job ID, from the parse cache when fetched before"""
+    parse_cache = parse_cache or ParseCache()
+    cached = parse_cache.get(job_id, LLAMA_CLOUD_RESULT_SETTINGS)
+    if cached is not None:
+        return cached["markdown"]
+
+    url = llama_cloud_url(f"/api/v1/parsing/job/{job_id}/result/markdown")
 
     headers = {
         "Accept": "application/json",
-        "Authorization": f"Bearer {os.getenv('LLAMA_CLOUD_API_KEY')}"
     }
 
-    response = requests.request("GET", url, headers=headers)
-    return response.json().get("markdown")
+    response = get_llama_cloud_session().get(url, headers=headers, timeout=JOB_REQUEST_TIMEOUT)
+    response.raise_for_status()
+    markdown = response.json().get("markdown")
+    if markdown is not None:
+        parse_cache.put(job_id, LLAMA_CLOUD_RESULT_SETTINGS, [
+            {"text": section, "metadata": {"job_id": job_id}} for section in markdown.split(PAGE_SEPARATOR)
+        ])
+    return markdown
 
-def load_job_as_query_engine(job_id, file_hash):
+def load_job_as_query_engine(job_id, file_hash, namespace=DEFAULT_NAMESPACE, streaming=False):
     """Get or create index for LlamaCloud job results"""
     print(f"\nDocument hash/job_id: {file_hash}")
 
-    storage_context, _ = get_pinecone()
+    backend = get_backend(namespace)
 
-    if check_file_hash_exists(file_hash):
-        print("\n=== Vectors already exist in Pinecone ===")
+    if backend.is_ingested(file_hash):
+        print(f"\n=== Vectors already exist in {backend.name} ===")
         return
+    if backend.exists_by_hash(file_hash):
+        print(f"\n=== Deleting vectors left by an unfinished ingestion from {backend.name} ===")
+        backend.delete_by_hash(file_hash)
     
     print(f"\n=== Loading and indexing new content from job {job_id} ===")
     
     # Get markdown content and split on horizontal rules
     markdown_content = get_job_results(job_id)
-    sections = markdown_content.split('\n---\n')
+    sections = markdown_content.split(PAGE_SEPARATOR)
     
     # Create a Document for each section
     documents = []
@@ -103,14 +148,6 @@ def load_job_as_query_engine(job_id, file_hash):
                 }
             ))
     
-    index = VectorStoreIndex.from_documents(
-        documents,
-        storage_context=storage_context
-    )
-    
-    print(f"\nIndex Stats:")
-    print(f"Number of nodes: {len(index.docstore.docs)}")
-    print(f"Embedding model: {Settings.embed_model}")
-    print(f"LLM model: {Settings.llm}")
-    
-    return index.as_query_engine()
\ No newline at end of file
+    exclude_document_metadata(documents)
+    index_documents(documents, backend, file_hash)
+    return backend.file_hash_query_engine(file_hash, streaming=streaming)
\ No newline at end of file
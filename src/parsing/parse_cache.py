@@ -0,0 +1,71 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from llama_index.core import Document
+
+from src.utils.files import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+PAGE_SEPARATOR = "\n---\n"
+
+def settings_key(settings: dict) -> str:
+    """Short stable hash of a parser settings dict"""
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+class ParseCache:
+    """
+    Parsed document output keyed by (content hash, parser settings), so a
+    document is only ever sent to LlamaParse once per settings. Each entry
+    is one JSON file holding the full markdown and the per-page documents
+    (text and metadata) that mark the page boundaries.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else get_cache_dir("llama_parse")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, content_hash: str, settings: dict) -> Path:
+        return self.cache_dir / f"{content_hash}-{settings_key(settings)}.json"
+
+    def get(self, content_hash: str, settings: dict) -> Optional[dict]:
+        """Return the cached entry ({"markdown", "pages", ...}) or None"""
+        path = self._entry_path(content_hash, settings)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable parse cache entry {path.name}: {e}")
+            return None
+
+    def put(self, content_hash: str, settings: dict, pages: List[dict]) -> dict:
+        """Store parsed pages ({"text", "metadata"} dicts, in order) and return the entry"""
+        entry = {
+            "content_hash": content_hash,
+            "settings": settings,
+            "markdown": PAGE_SEPARATOR.join(page["text"] for page in pages),
+            "pages": pages,
+            "parsed_at": time.time(),
+        }
+        path = self._entry_path(content_hash, settings)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        return entry
+
+    def get_documents(self, content_hash: str, settings: dict) -> Optional[List[Document]]:
+        entry = self.get(content_hash, settings)
+        if entry is None:
+            return None
+        return [Document(text=page["text"], metadata=page["metadata"]) for page in entry["pages"]]
+
+    def put_documents(self, content_hash: str, settings: dict, documents: List[Document]) -> dict:
+        return self.put(content_hash, settings, [{"text": doc.text, "metadata": doc.metadata} for doc in documents])
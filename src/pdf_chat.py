@@ -1,10 +1,12 @@
 from .environment import init_environment
 from .parsing.llama_parse_pdf import load_pdf_as_query_engine
-from .chat.chat_engine import chat_loop
+from .chat.chat_engine import CHAT_STREAMING, chat_loop
+from .utils.metrics import measure
 
 def chat_with_pdf():
     init_environment()
-    query_engine = load_pdf_as_query_engine()
+    with measure("load_pdf"):
+        query_engine = load_pdf_as_query_engine(streaming=CHAT_STREAMING)
     chat_loop(query_engine)
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_VIEWPORT = {"width": 1920, "height": 1080}
+
+class BrowserPool:
+    """
+    A single headless Chromium instance with a fixed number of reusable
+    browser contexts. Use it as an async context manager:
+
+        async with BrowserPool(size=4) as pool:
+            page = await pool.fetch(url)
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, headless: bool = True):
+        if size < 1:
+            raise ValueError("BrowserPool size must be at least 1")
+
+        self.size = size
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._contexts: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Launch the browser and open the pool's contexts"""
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._contexts = asyncio.Queue()
+        for _ in range(self.size):
+            context = await self._browser.new_context(viewport=DEFAULT_VIEWPORT)
+            self._contexts.put_nowait(context)
+        logger.debug(f"Started browser pool with {self.size} contexts")
+
+    async def close(self) -> None:
+        """Close every context, the browser and the Playwright driver"""
+        if self._contexts is not None:
+            while not self._contexts.empty():
+                context = self._contexts.get_nowait()
+                await context.close()
+            self._contexts = None
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def fetch(self, url: str, wait_for_selector: Optional[str] = None) -> dict:
+        """
+        Render a page in the next free context.
+
+        Returns:
+            Dict with the raw "html" and the fetch metadata: "final_url",
+            "status", "headers" and "fetched_at" (unix time)
+        """
+        if self._contexts is None:
+            raise RuntimeError("BrowserPool has not been started")
+
+        context = await self._contexts.get()
+        page = None
+        try:
+            page = await context.new_page()
+            response = await page.goto(url, wait_until="networkidle")
+
+            if wait_for_selector:
+                await page.wait_for_selector(wait_for_selector)
+
+            return {
+                "html": await page.content(),
+                "final_url": page.url,
+                "status": response.status if response else None,
+                "headers": dict(response.headers) if response else {},
+                "fetched_at": time.time(),
+            }
+        finally:
+            if page is not None:
+                await page.close()
+            self._contexts.put_nowait(context)
@@ -0,0 +1,23 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+def save_checkpoint(checkpoint_dir: Path, state: dict) -> None:
+    """Atomically write a crawl checkpoint so a killed process never leaves a partial file"""
+    path = Path(checkpoint_dir) / CHECKPOINT_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump({**state, "saved_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(checkpoint_dir: Path) -> Optional[dict]:
+    """Load the last crawl checkpoint, or None if there isn't one"""
+    path = Path(checkpoint_dir) / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
@@ -1,13 +1,22 @@
-from typing import List, Set
-from urllib.parse import urljoin, urlparse
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 from llama_index.core.agent import ReActAgent
 from llama_index.core.tools import FunctionTool
 from llama_index.llms.openai import OpenAI
 from llama_index.core.prompts import PromptTemplate
-from bs4 import BeautifulSoup
+from llama_index.core import Settings
 import logging
 from src.environment import get_open_ai_model
-from src.scrapers.website import scrape_page, scrape_and_index_site
+from src.scrapers.browser_pool import DEFAULT_POOL_SIZE
+from src.scrapers.checkpoint import load_checkpoint, save_checkpoint
+from src.scrapers.frontier import CrawlFrontier, HostRateLimiter, normalize_url
+from src.scrapers.html_parsing import parse_html
+from src.scrapers.http_fetcher import TieredFetcher
+from src.scrapers.link_ranking import LinkRanker, RelevanceCache
+from src.scrapers.page_cache import PageCache
+from src.scrapers.website import fetch_page_async, scrape_and_index_site
+from src.utils.files import get_cache_dir
 
 # Set up detailed logging
 logging.basicConfig(
@@ -18,16 +27,7 @@ logger = logging.getLogger(__name__)
 
 def extract_links(html_content: str, base_url: str) -> List[str]:
     """Extract and normalize all links from HTML content."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = []
-    
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag.get('href')
-        if href and not href.startswith(('#', 'mailto:', 'tel:')):
-            absolute_url = urljoin(base_url, href)
-            links.append(absolute_url)
-    
-    return links
+    return parse_html(html_content, base_url)["links"]
 
 def is_same_domain(url1: str, url2: str) -> bool:
     """Check if two URLs belong to the same domain."""
@@ -41,6 +41,13 @@ class IntelligentCrawler:
             topic: str,
             base_url: str,
             namespace: str = "intelligent_crawl",
+            cache_to_disk: bool = False,
+            max_pages: int = 50,
+            concurrency: int = DEFAULT_POOL_SIZE,
+            requests_per_second: float = 2.0,
+            max_llm_links: int = 20,
+            use_embeddings: bool = False,
+            checkpoint_every: int = 0,
         ):
         if not base_url:
             raise ValueError("Please provide a base URL to start crawling.")
@@ -48,14 +55,75 @@ class IntelligentCrawler:
             raise ValueError("Please provide a topic for the intelligent crawler prompt.")
         
         self.topic = topic
-        self.max_pages = 50
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second  # Per host
+        self.max_llm_links = max_llm_links  # Candidates shown to the LLM per page
+        self.use_embeddings = use_embeddings
+        self.checkpoint_every = checkpoint_every  # Pages between checkpoints, 0 to disable
         self.base_url = base_url
         self.namespace = namespace
         self.llm = get_open_ai_model()
         self.visited_urls: Set[str] = set()
+        self._resume_state: Optional[dict] = None
+        # Checkpoints are only useful if the pages they refer to survive the process too
+        self.cache_dir = get_cache_dir(f"crawls/{namespace}") if cache_to_disk or checkpoint_every else None
+        # Pages fetched while crawling are indexed straight from this cache
+        self.page_cache = PageCache(self.cache_dir / "pages" if self.cache_dir else None)
+        self.link_ranker = LinkRanker(
+            topic,
+            embed_model=Settings.embed_model if use_embeddings else None,
+            cache_dir=self.cache_dir,
+        )
+        self.relevance_cache = RelevanceCache(topic, cache_dir=self.cache_dir)
         
         self.setup_agent()
 
+    @classmethod
+    def resume(cls, namespace: str = "intelligent_crawl", **overrides) -> "IntelligentCrawler":
+        """
+        Rebuild a crawler from the last checkpoint of the namespace's crawl.
+        Calling crawl() on it continues where the checkpoint left off; pages
+        that were already fetched are served from the on-disk page cache.
+        """
+        state = load_checkpoint(get_cache_dir(f"crawls/{namespace}"))
+        if state is None:
+            raise ValueError(f"No crawl checkpoint found for namespace '{namespace}'")
+
+        crawler = cls(**{**state["config"], "cache_to_disk": True, **overrides})
+        crawler.visited_urls = set(state["visited_urls"])
+        crawler.relevance_cache.update(state["relevance_decisions"])
+        crawler._resume_state = state
+        logger.info(f"Resuming crawl of {crawler.base_url}: {len(crawler.visited_urls)} pages visited, "
+                    f"{len(state['frontier']['queued']) + len(state['in_flight'])} queued")
+        return crawler
+
+    def write_checkpoint(self, frontier: CrawlFrontier, in_flight: Dict[str, Tuple[float, int]],
+                         complete: bool = False) -> None:
+        """Persist everything needed to resume the crawl without repeating work."""
+        if not self.cache_dir:
+            return
+        save_checkpoint(self.cache_dir, {
+            "config": {
+                "topic": self.topic,
+                "base_url": self.base_url,
+                "namespace": self.namespace,
+                "max_pages": self.max_pages,
+                "concurrency": self.concurrency,
+                "requests_per_second": self.requests_per_second,
+                "max_llm_links": self.max_llm_links,
+                "use_embeddings": self.use_embeddings,
+                "checkpoint_every": self.checkpoint_every,
+            },
+            "frontier": frontier.to_state(),
+            # Pages being fetched right now go back in the queue on resume
+            "in_flight": [[url, score, depth] for url, (score, depth) in in_flight.items()],
+            "visited_urls": sorted(self.visited_urls),
+            "relevance_decisions": self.relevance_cache.items(),
+            "complete": complete,
+        })
+        logger.info(f"Checkpointed crawl: {len(self.visited_urls)} visited, {len(frontier)} queued")
+
     def setup_agent(self):
         """Set up the ReAct agent with tools for analyzing content relevance."""
         tools = [
@@ -87,21 +155,13 @@ class IntelligentCrawler:
             system_prompt=system_prompt_template.format(topic=self.topic)
         )
 
-    def analyze_page_relevance(self, content: str, links: List[str]) -> List[str]:
-        """
-        Analyze page content and links to determine which links to follow.
-        Returns a list of relevant URLs to crawl next.
-        """
-        # First clean the content using BeautifulSoup
-        soup = BeautifulSoup(content, 'html.parser')
-        cleaned_content = soup.get_text(separator=' ', strip=True)
-        
+    def build_relevance_prompt(self, cleaned_content: str, links: List[str],
+                               anchor_text: Dict[str, str]) -> str:
+        """Build the link selection prompt for a page's cleaned text and candidate links."""
         # Create formatted list of links with their visible text where possible
         link_entries = []
         for i, link in enumerate(links):
-            # Try to find the link in the original HTML to get its text
-            link_tag = soup.find('a', href=lambda x: x and link.endswith(x))
-            link_text = link_tag.get_text(strip=True) if link_tag else "No description"
+            link_text = anchor_text.get(link) or "No description"
             link_entries.append(f"{i}: [{link_text}] {link}")
         
         link_list = "\n".join(link_entries)
@@ -131,70 +191,193 @@ class IntelligentCrawler:
             """
         )
         
-        prompt = analysis_prompt_template.format(
+        return analysis_prompt_template.format(
             topic=self.topic,
             content_snippet=cleaned_content[:500],  # Use less content but cleaned
             link_list=link_list
         )
 
-        response = self.llm.complete(prompt)
-
-        logger.info(f"Agent response: {response.text}")
+    def parse_relevance_response(self, response_text: str, links: List[str]) -> Optional[List[str]]:
+        """
+        Map the LLM's comma-separated link indices back to URLs, most relevant first.
+        Returns None if the response can't be parsed, as opposed to [] for a SKIP.
+        """
+        logger.info(f"Agent response: {response_text}")
 
+        if response_text.strip().upper() == "SKIP":
+            return []
         try:
-            selected_indices = [int(i.strip()) for i in response.text.split(',')]
-            return [links[i] for i in selected_indices if i < len(links)]
+            selected_indices = [int(i.strip()) for i in response_text.split(',')]
+            return [links[i] for i in selected_indices if 0 <= i < len(links)]
         except Exception as e:
             logger.error(f"Error parsing agent response: {e}")
-            return []
+            return None
+
+    def analyze_page_relevance(self, content: str, links: List[str]) -> Optional[List[str]]:
+        """
+        Analyze page content and links to determine which links to follow.
+        Returns a list of relevant URLs to crawl next (None if the LLM's answer couldn't be parsed).
+        """
+        parsed = parse_html(content, self.base_url)
+        candidates = self.link_ranker.rank(links, parsed["anchor_text"], self.max_llm_links)
+        prompt = self.build_relevance_prompt(parsed["text"], candidates, parsed["anchor_text"])
+        response = self.llm.complete(prompt)
+        return self.parse_relevance_response(response.text, candidates)
+
+    async def analyze_page_relevance_async(self, cleaned_content: str, links: List[str],
+                                           anchor_text: Dict[str, str]) -> Optional[List[str]]:
+        """
+        Async version of analyze_page_relevance for already-parsed pages, so
+        crawl workers don't block each other.
+        """
+        prompt = self.build_relevance_prompt(cleaned_content, links, anchor_text)
+        response = await self.llm.acomplete(prompt)
+        return self.parse_relevance_response(response.text, links)
 
     def crawl(self) -> None:
         """
-        Start the intelligent crawling process from the base URL.
+        Start the intelligent crawling process from the base URL, or continue
+        it when the crawler was created with resume().
         """
-        urls_to_visit = [self.base_url]
-        
-        while urls_to_visit and len(self.visited_urls) < self.max_pages:
-            current_url = urls_to_visit.pop(0)
-            
-            if current_url in self.visited_urls:
-                continue
-                
-            try:
-                logger.debug(f"Starting crawl of URL: {current_url}")
-                content = scrape_page(current_url)
-                self.visited_urls.add(current_url)
-                
-                # Extract all links from the page
-                all_links = extract_links(content, current_url)
-                # Filter for same-domain links
-                domain_links = [link for link in all_links if is_same_domain(link, self.base_url)]
-                
-                # Use agent to decide which links to follow
-                relevant_links = self.analyze_page_relevance(content, domain_links)
-                
-                # Add new relevant links to visit
-                new_urls = [url for url in relevant_links if url not in self.visited_urls]
-                urls_to_visit.extend(new_urls)
-                
-                logger.info(f"Page analysis for {current_url}:")
-                logger.info(f"- Found {len(domain_links)} total links")
-                logger.info(f"- Selected {len(relevant_links)} relevant links: {relevant_links}")
-                logger.info(f"- Added {len(new_urls)} new URLs to queue: {new_urls}")
-                logger.info(f"- Current queue size: {len(urls_to_visit)}")
-                logger.info(f"- Visited {len(self.visited_urls)} pages so far")
-                
-            except Exception as e:
-                logger.error(f"Error processing {current_url}: {e}")
-                continue
-        
-        # Index all visited pages
+        asyncio.run(self.crawl_async())
+
+        # Index all visited pages from the page cache, without fetching them again
+        start_url = normalize_url(self.base_url)
         scrape_and_index_site(
-            self.base_url,
+            start_url,
             namespace=self.namespace,
-            additional_urls=list(self.visited_urls)[1:],  # Skip base_url as it's handled by default
+            additional_urls=[url for url in self.visited_urls if url != start_url],
+            page_cache=self.page_cache,
         )
 
+    async def crawl_async(self) -> None:
+        """
+        Crawl from the base URL with concurrent workers. URLs are taken from a
+        relevance-ordered frontier, each host is rate limited, and the
+        max_pages budget is shared by all workers.
+        """
+        if self._resume_state:
+            frontier = CrawlFrontier.from_state(
+                self._resume_state["frontier"], requeue=self._resume_state["in_flight"]
+            )
+        else:
+            frontier = CrawlFrontier()
+            frontier.add(self.base_url, score=1.0)
+        rate_limiter = HostRateLimiter(self.requests_per_second)
+        in_flight: Dict[str, Tuple[float, int]] = {}
+        state = {"reserved": len(self.visited_urls), "since_checkpoint": 0}
+        condition = asyncio.Condition()
+
+        async def next_url() -> Optional[Tuple[str, float, int]]:
+            async with condition:
+                while True:
+                    if state["reserved"] >= self.max_pages:
+                        return None
+                    entry = frontier.pop()
+                    if entry is not None:
+                        url, score, depth = entry
+                        state["reserved"] += 1
+                        in_flight[url] = (score, depth)
+                        return entry
+                    if not in_flight:
+                        # Nothing queued and nobody left to queue more
+                        condition.notify_all()
+                        return None
+                    await condition.wait()
+
+        async def worker(fetcher: TieredFetcher) -> None:
+            while True:
+                entry = await next_url()
+                if entry is None:
+                    return
+
+                current_url, score, depth = entry
+                new_urls = []
+                try:
+                    new_urls = await self.process_url(fetcher, rate_limiter, current_url, score, depth)
+                except Exception as e:
+                    logger.error(f"Error processing {current_url}: {e}")
+
+                async with condition:
+                    del in_flight[current_url]
+                    if current_url not in self.visited_urls:
+                        # Give the budget slot back so another page can use it
+                        state["reserved"] -= 1
+                    for url, url_score in new_urls:
+                        frontier.add(url, score=url_score, depth=depth + 1)
+                    logger.info(f"- Current queue size: {len(frontier)}")
+                    logger.info(f"- Visited {len(self.visited_urls)} pages so far")
+
+                    state["since_checkpoint"] += 1
+                    if self.checkpoint_every and state["since_checkpoint"] >= self.checkpoint_every:
+                        self.write_checkpoint(frontier, in_flight)
+                        state["since_checkpoint"] = 0
+                    condition.notify_all()
+
+        complete = False
+        try:
+            async with TieredFetcher(browser_pool_size=self.concurrency) as fetcher:
+                await asyncio.gather(*(worker(fetcher) for _ in range(self.concurrency)))
+            complete = True
+        finally:
+            # Also runs when the crawl is interrupted, so a rerun can resume()
+            self.write_checkpoint(frontier, in_flight, complete=complete)
+
+    async def process_url(self, fetcher: TieredFetcher, rate_limiter: HostRateLimiter,
+                          current_url: str, score: float, depth: int) -> List[Tuple[str, float]]:
+        """
+        Fetch one page and choose which of its links to follow.
+
+        Returns:
+            The (url, score) pairs to add to the frontier
+        """
+        logger.debug(f"Starting crawl of URL: {current_url} (score {score:.2f}, depth {depth})")
+        if current_url not in self.page_cache:
+            await rate_limiter.wait(current_url)
+        page = await fetch_page_async(fetcher, current_url, page_cache=self.page_cache)
+        if page.get("gone"):
+            # Not visited, so the page doesn't use up crawl budget or get indexed
+            logger.info(f"Skipping {current_url}: gone (HTTP {page['metadata'].get('status')})")
+            return []
+        self.visited_urls.add(current_url)
+
+        # Pages are parsed once at fetch time; older cache entries may predate that
+        parsed = page if "links" in page else parse_html(page["html"], current_url)
+        # Filter for same-domain links
+        domain_links = list(dict.fromkeys(
+            link for link in parsed["links"] if is_same_domain(link, self.base_url)
+        ))
+
+        relevant_links = self.relevance_cache.get(current_url)
+        if relevant_links is not None:
+            logger.info(f"Reusing cached link selection for {current_url}")
+        else:
+            # Rank links locally and only ask the LLM to choose among the best few
+            candidates = await self.link_ranker.arank(domain_links, parsed["anchor_text"], self.max_llm_links)
+            relevant_links = []
+            if candidates:
+                relevant_links = await self.analyze_page_relevance_async(
+                    parsed["text"], candidates, parsed["anchor_text"]
+                )
+            if relevant_links is None:
+                # Not a real decision; leave it uncached so a recrawl asks again
+                relevant_links = []
+            else:
+                self.relevance_cache.put(current_url, relevant_links)
+
+        # Earlier picks are more relevant, and deeper pages slightly less so
+        new_urls = [
+            (url, (len(relevant_links) - rank) / len(relevant_links) / (depth + 2))
+            for rank, url in enumerate(relevant_links)
+            if normalize_url(url) not in self.visited_urls
+        ]
+
+        logger.info(f"Page analysis for {current_url}:")
+        logger.info(f"- Found {len(domain_links)} total links")
+        logger.info(f"- Selected {len(relevant_links)} relevant links: {relevant_links}")
+        logger.info(f"- Queueing {len(new_urls)} URLs: {[url for url, _ in new_urls]}")
+        return new_urls
+
 def intelligent_crawl_and_chat(base_url: str, topic: str, namespace: str = "scrapers") -> None:
     """
     Convenience function to crawl a site intelligently and start chatting.
@@ -0,0 +1,110 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Query parameters that only track where a visitor came from and never change page content
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "_ga", "_hsenc", "_hsmi"}
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different spellings of the same page
+    dedupe to one frontier entry: lowercases the scheme and host, drops
+    default ports, fragments, tracking parameters and trailing slashes, and
+    sorts the remaining query parameters.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+
+    path = parsed.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunparse((scheme, host, path, parsed.params, urlencode(sorted(query)), ""))
+
+class CrawlFrontier:
+    """
+    Priority queue of URLs to crawl, highest relevance score first. URLs
+    are normalized on the way in and each normalized URL is only ever
+    queued once.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seen: Set[str] = set()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def is_seen(self, url: str) -> bool:
+        return normalize_url(url) in self._seen
+
+    def add(self, url: str, score: float = 0.0, depth: int = 0) -> bool:
+        """Queue a URL; returns False if it (or an equivalent URL) was already seen"""
+        normalized = normalize_url(url)
+        if normalized in self._seen:
+            return False
+        self._seen.add(normalized)
+        # The counter keeps equal scores in insertion (breadth-first) order
+        heapq.heappush(self._heap, (-score, next(self._counter), normalized, depth))
+        return True
+
+    def pop(self) -> Optional[Tuple[str, float, int]]:
+        """Return the highest scoring (url, score, depth), or None when empty"""
+        if not self._heap:
+            return None
+        neg_score, _, url, depth = heapq.heappop(self._heap)
+        return url, -neg_score, depth
+
+    def to_state(self) -> dict:
+        """JSON-serializable snapshot of the queue and the seen set"""
+        return {
+            "queued": [[url, -neg_score, depth] for neg_score, _, url, depth in sorted(self._heap)],
+            "seen": sorted(self._seen),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, requeue: Optional[List[Tuple[str, float, int]]] = None) -> "CrawlFrontier":
+        """
+        Rebuild a frontier from to_state output. URLs in requeue (e.g. pages
+        that were mid-fetch when the snapshot was taken) are queued again
+        even though they have already been seen.
+        """
+        frontier = cls()
+        for url, score, depth in list(state.get("queued", [])) + list(requeue or []):
+            frontier.add(url, score=score, depth=depth)
+        frontier._seen.update(state.get("seen", []))
+        return frontier
+
+class HostRateLimiter:
+    """Spaces out requests to the same host so concurrent workers stay polite"""
+
+    def __init__(self, requests_per_second: float = 2.0):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        self.min_interval = 1.0 / requests_per_second
+        self._next_slot: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, url: str) -> None:
+        """Sleep until the URL's host may be requested again"""
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
@@ -0,0 +1,71 @@
+from typing import Dict, List
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Elements whose text is dropped from page content (their links are still collected)
+REMOVED_TAGS = {'nav', 'footer', 'header', 'style', 'meta'}
+SKIPPED_LINK_PREFIXES = ('#', 'mailto:', 'tel:')
+# Only plain text nodes count as content, not scripts, comments or doctypes
+TEXT_TYPES = (NavigableString, CData)
+
+def parse_html(html: str, base_url: str) -> Dict:
+    """
+    Parse a page once and pull everything the scrapers need from a single
+    walk over the DOM.
+
+    Returns:
+        Dict with:
+            "text": cleaned body text, links rendered as [text](href)
+            "links": absolute URLs of every followable link, in page order
+            "anchor_text": absolute URL -> visible text of the first link to it
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    text_parts: List[str] = []
+    links: List[str] = []
+    anchor_text: Dict[str, str] = {}
+
+    # Each entry is (node, inside <body>, inside an element whose text is removed)
+    stack = [(soup, False, False)]
+    while stack:
+        node, in_body, removed = stack.pop()
+
+        if not isinstance(node, Tag):
+            if in_body and not removed and type(node) in TEXT_TYPES:
+                text = node.strip()
+                if text:
+                    text_parts.append(text)
+            continue
+
+        in_body = in_body or node.name == 'body'
+        removed = removed or node.name in REMOVED_TAGS
+
+        href = node.get('href') if node.name == 'a' else None
+        if href:
+            if not href.startswith(SKIPPED_LINK_PREFIXES):
+                absolute_url = urljoin(base_url, href)
+                links.append(absolute_url)
+                if not anchor_text.get(absolute_url):
+                    anchor_text[absolute_url] = node.get_text(strip=True)
+
+            if in_body and not removed and not href.startswith('#'):
+                if href.startswith('//'):
+                    href = f"https://{href}"
+                text = f"[{node.get_text()}]({href})".strip()
+                if text:
+                    text_parts.append(text)
+                continue
+
+        stack.extend((child, in_body, removed) for child in reversed(node.contents))
+
+    return {
+        "text": ' '.join(text_parts),
+        "links": links,
+        "anchor_text": anchor_text,
+    }
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.scrapers.browser_pool import BrowserPool, DEFAULT_POOL_SIZE
+from src.scrapers.html_parsing import parse_html
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT = 15
+HTTP_POOL_SIZE = 16
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/130.0 Safari/537.36"
+)
+# Pages with less visible text than this and scripts to fill them in are assumed to be rendered client-side
+MIN_TEXT_LENGTH = 200
+SCRIPT_TAG = re.compile(r'<(script|noscript)\b', re.I)
+# Send a host's pages straight to the browser once this many have needed it; until then
+# only the pages that look rendered client-side are, since any site has a few short pages
+JS_PAGES_BEFORE_SWITCH = 3
+SPA_MARKERS = [
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I),
+    re.compile(r'<noscript>[^<]*(enable|requires?)\s+javascript', re.I),
+    re.compile(r'\bng-app\b|\bdata-reactroot\b', re.I),
+]
+# Statuses that often mean "bot check" rather than "no such page"; the browser may get through
+BROWSER_RETRY_STATUSES = {401, 403, 429, 503}
+# Statuses that mean the page has been taken down, as opposed to a failure worth trying again later
+GONE_STATUSES = {404, 410}
+
+class PageGoneError(RuntimeError):
+    """The page answered 404 or 410"""
+
+# Which tier worked for each host, shared by every fetcher in the process
+HOST_MODES: Dict[str, str] = {}
+
+_session: Optional[requests.Session] = None
+
+def get_http_session() -> requests.Session:
+    """Shared keep-alive HTTP session with connection pooling and retries"""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 504],
+                        allowed_methods=["GET", "HEAD"])
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+                              max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"})
+        _session = session
+    return _session
+
+def needs_javascript(html: str, text: str) -> bool:
+    """Guess from its raw HTML and extracted text whether a page needs a browser to render"""
+    if any(marker.search(html) for marker in SPA_MARKERS):
+        return True
+    # A short page without scripts is just a short page
+    return len(text) < MIN_TEXT_LENGTH and SCRIPT_TAG.search(html) is not None
+
+class TieredFetcher:
+    """
+    Fetches pages over plain HTTP first and only renders them in the
+    headless browser pool when the response looks like it needs
+    JavaScript. Once JS_PAGES_BEFORE_SWITCH of a host's pages have needed
+    it, the host's pages go straight to the browser; the choice is
+    remembered per host, and the browser is only launched the first time
+    it is needed.
+
+        async with TieredFetcher(browser_pool_size=4) as fetcher:
+            page = await fetcher.fetch(url)
+    """
+
+    def __init__(self, browser_pool_size: int = DEFAULT_POOL_SIZE,
+                 session: Optional[requests.Session] = None,
+                 host_modes: Optional[Dict[str, str]] = None):
+        self.browser_pool_size = browser_pool_size
+        self.session = session or get_http_session()
+        self.host_modes = HOST_MODES if host_modes is None else host_modes
+        self.js_pages: Dict[str, int] = {}
+        self._browser_pool: Optional[BrowserPool] = None
+        self._browser_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "TieredFetcher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._browser_pool is not None:
+            await self._browser_pool.close()
+            self._browser_pool = None
+
+    async def _get_browser_pool(self) -> BrowserPool:
+        async with self._browser_lock:
+            if self._browser_pool is None:
+                pool = BrowserPool(size=self.browser_pool_size)
+                await pool.start()
+                self._browser_pool = pool
+        return self._browser_pool
+
+    async def fetch_with_browser(self, url: str, wait_for_selector: Optional[str] = None) -> dict:
+        pool = await self._get_browser_pool()
+        page = await pool.fetch(url, wait_for_selector)
+        page["fetched_with"] = "browser"
+        if page.get("status") in GONE_STATUSES:
+            page["gone"] = True
+            page.pop("html", None)
+        return page
+
+    def fetch_with_http(self, url: str, validators: Optional[dict] = None) -> requests.Response:
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        return self.session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+
+    async def fetch(self, url: str, wait_for_selector: Optional[str] = None,
+                    validators: Optional[dict] = None) -> dict:
+        """
+        Fetch a page with the cheapest tier that works for its host.
+
+        Args:
+            url: Page to fetch
+            wait_for_selector: CSS selector to wait for; forces the browser tier
+            validators: Optional {"etag", "last_modified"} from an earlier fetch,
+                sent as conditional request headers on the HTTP tier
+
+        Returns:
+            Dict in the same shape as BrowserPool.fetch, plus "fetched_with".
+            Pages fetched over HTTP also carry their parse_html result under
+            "parsed". A conditional request that comes back 304 has
+            "not_modified" set and no "html"; a 404 or 410 has "gone" set
+            and no "html".
+        """
+        host = urlparse(url).netloc
+        if wait_for_selector or self.host_modes.get(host) == "browser":
+            return await self.fetch_with_browser(url, wait_for_selector)
+
+        response = await asyncio.to_thread(self.fetch_with_http, url, validators)
+        metadata = {
+            "final_url": response.url,
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "fetched_at": time.time(),
+            "fetched_with": "http",
+        }
+        if response.status_code == 304:
+            return {**metadata, "not_modified": True}
+        if response.status_code in GONE_STATUSES:
+            return {**metadata, "gone": True}
+
+        if response.status_code in BROWSER_RETRY_STATUSES:
+            logger.info(f"HTTP {response.status_code} for {url}, retrying in the browser")
+            return await self.fetch_with_browser(url)
+        response.raise_for_status()
+
+        content_type = response.headers.get("Content-Type", "")
+        if "html" not in content_type:
+            raise ValueError(f"Unsupported content type for {url}: {content_type}")
+
+        html = response.text
+        parsed = parse_html(html, response.url)
+        if needs_javascript(html, parsed["text"]):
+            self.js_pages[host] = self.js_pages.get(host, 0) + 1
+            if self.js_pages[host] >= JS_PAGES_BEFORE_SWITCH:
+                logger.info(f"{host} needs JavaScript rendering, switching it to the browser")
+                self.host_modes[host] = "browser"
+            else:
+                logger.info(f"{url} looks rendered client-side, fetching it in the browser")
+            return await self.fetch_with_browser(url)
+
+        self.host_modes.setdefault(host, "http")
+        return {**metadata, "html": html, "parsed": parsed}
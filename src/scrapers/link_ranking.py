@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from src.scrapers.frontier import normalize_url
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "my", "of", "on", "or", "own", "the", "to", "what",
+    "when", "where", "which", "who", "why", "with", "you", "your", "much", "required",
+    "hc", "en", "us", "www", "com", "html", "htm", "php", "aspx", "index",
+}
+# Links that are almost never worth a crawl budget slot
+LOW_VALUE_TOKENS = {
+    "login", "signin", "signup", "logout", "register", "account", "privacy", "terms",
+    "cookie", "cookies", "legal", "cart", "checkout", "careers", "press", "subscribe",
+}
+ANCHOR_WEIGHT = 1.0
+URL_WEIGHT = 0.5
+EMBEDDING_WEIGHT = 1.0
+LOW_VALUE_PENALTY = 1.0
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def url_tokens(url: str) -> List[str]:
+    """Tokens from a URL's path and query, e.g. /articles/123-Embed-Flow -> [article, embed, flow]"""
+    parsed = urlparse(url)
+    return tokenize(unquote(f"{parsed.path} {parsed.query}").replace("-", " ").replace("_", " "))
+
+def text_key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}:{text}".encode()).hexdigest()
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class LinkRanker:
+    """
+    Cheap local scoring of candidate links against the crawl topic, so only
+    the most promising few are shown to the LLM. Scores combine topic-token
+    overlap with the anchor text and URL, a penalty for login/policy style
+    links and, when an embedding model is given, the cosine similarity of
+    the link's description to the topic. Link embeddings are cached in
+    memory and optionally on disk.
+    """
+
+    def __init__(self, topic: str, embed_model=None, cache_dir: Optional[Path] = None):
+        self.topic = topic
+        self.topic_tokens = set(tokenize(topic))
+        self.embed_model = embed_model
+        self.cache_path = Path(cache_dir) / "link_embeddings.json" if cache_dir else None
+        self._embeddings: Dict[str, List[float]] = {}
+        self._topic_embedding: Optional[List[float]] = None
+
+        if self.cache_path and self.cache_path.exists():
+            with open(self.cache_path, 'r') as f:
+                self._embeddings = json.load(f)
+
+    def describe(self, url: str, anchor: str) -> str:
+        """The text a link is judged by: its anchor text plus its URL tokens"""
+        return f"{anchor} {' '.join(url_tokens(url))}".strip()
+
+    def lexical_score(self, url: str, anchor: str) -> float:
+        anchor_tokens = set(tokenize(anchor))
+        link_url_tokens = set(url_tokens(url))
+        score = 0.0
+        if self.topic_tokens:
+            score += ANCHOR_WEIGHT * len(anchor_tokens & self.topic_tokens) / len(self.topic_tokens)
+            score += URL_WEIGHT * len(link_url_tokens & self.topic_tokens) / len(self.topic_tokens)
+        if (anchor_tokens | link_url_tokens) & LOW_VALUE_TOKENS:
+            score -= LOW_VALUE_PENALTY
+        return score
+
+    def missing_embeddings(self, descriptions: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """Cache keys for descriptions, and the {key: text} of those not embedded yet"""
+        model_name = getattr(self.embed_model, "model_name", type(self.embed_model).__name__)
+        keys = [text_key(model_name, text) for text in descriptions]
+        return keys, {key: text for key, text in zip(keys, descriptions) if key not in self._embeddings}
+
+    def topic_similarities(self, keys: List[str], fresh: Dict[str, List[float]]) -> List[float]:
+        """Cosine similarity of each key's embedding to the topic, after caching fresh ones"""
+        if fresh:
+            self._embeddings.update(fresh)
+            self.save()
+        return [cosine_similarity(self._embeddings[key], self._topic_embedding) for key in keys]
+
+    def embedding_scores(self, descriptions: List[str]) -> List[float]:
+        """Cosine similarity of each description to the topic, embedding only unseen texts"""
+        if self._topic_embedding is None:
+            self._topic_embedding = self.embed_model.get_query_embedding(self.topic)
+        keys, missing = self.missing_embeddings(descriptions)
+        embeddings = self.embed_model.get_text_embedding_batch(list(missing.values())) if missing else []
+        return self.topic_similarities(keys, dict(zip(missing.keys(), embeddings)))
+
+    async def aembedding_scores(self, descriptions: List[str]) -> List[float]:
+        """embedding_scores with the embedding model's async API"""
+        if self._topic_embedding is None:
+            self._topic_embedding = await self.embed_model.aget_query_embedding(self.topic)
+        keys, missing = self.missing_embeddings(descriptions)
+        embeddings = await self.embed_model.aget_text_embedding_batch(list(missing.values())) if missing else []
+        return self.topic_similarities(keys, dict(zip(missing.keys(), embeddings)))
+
+    def lexical_scores(self, links: List[str], anchor_text: Dict[str, str]) -> Tuple[List[str], List[float]]:
+        """Each link's description and lexical score"""
+        descriptions = [self.describe(link, anchor_text.get(link, "")) for link in links]
+        scores = [self.lexical_score(link, anchor_text.get(link, "")) for link in links]
+        return descriptions, scores
+
+    def top_links(self, links: List[str], scores: List[float], similarities: Optional[List[float]],
+                  top_k: int) -> List[str]:
+        """The top_k links by score plus weighted embedding similarity, best first"""
+        if similarities is not None:
+            scores = [score + EMBEDDING_WEIGHT * similarity for score, similarity in zip(scores, similarities)]
+        # sorted() is stable, so ties keep their page order
+        ranked = sorted(range(len(links)), key=lambda i: scores[i], reverse=True)
+        return [links[i] for i in ranked[:top_k]]
+
+    def rank(self, links: List[str], anchor_text: Dict[str, str], top_k: int) -> List[str]:
+        """Return the top_k links, best first"""
+        if not links:
+            return []
+
+        descriptions, scores = self.lexical_scores(links, anchor_text)
+        similarities = None
+        if self.embed_model is not None:
+            try:
+                similarities = self.embedding_scores(descriptions)
+            except Exception as e:
+                logger.warning(f"Falling back to lexical link ranking: {e}")
+        return self.top_links(links, scores, similarities, top_k)
+
+    async def arank(self, links: List[str], anchor_text: Dict[str, str], top_k: int) -> List[str]:
+        """rank for async callers, so embedding the links doesn't block the event loop"""
+        if not links:
+            return []
+
+        descriptions, scores = self.lexical_scores(links, anchor_text)
+        similarities = None
+        if self.embed_model is not None:
+            try:
+                similarities = await self.aembedding_scores(descriptions)
+            except Exception as e:
+                logger.warning(f"Falling back to lexical link ranking: {e}")
+        return self.top_links(links, scores, similarities, top_k)
+
+    def save(self) -> None:
+        if self.cache_path:
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(self._embeddings, f)
+            os.replace(tmp_path, self.cache_path)
+
+class RelevanceCache:
+    """
+    Link selections keyed by (topic, page URL), so a page that is reached
+    again (a recrawl, or navigation shared by many pages) never pays for
+    the same LLM judgment twice. Optionally persisted as one JSON file per
+    topic.
+    """
+
+    def __init__(self, topic: str, cache_dir: Optional[Path] = None):
+        self.topic = topic
+        topic_hash = hashlib.sha1(topic.strip().lower().encode()).hexdigest()[:16]
+        self.cache_path = Path(cache_dir) / f"relevance_{topic_hash}.json" if cache_dir else None
+        self._decisions: Dict[str, List[str]] = {}
+
+        if self.cache_path and self.cache_path.exists():
+            with open(self.cache_path, 'r') as f:
+                self._decisions = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._decisions)
+
+    def get(self, url: str) -> Optional[List[str]]:
+        return self._decisions.get(normalize_url(url))
+
+    def put(self, url: str, selected_links: List[str]) -> None:
+        self._decisions[normalize_url(url)] = selected_links
+        self.save()
+
+    def update(self, decisions: Dict[str, List[str]]) -> None:
+        self._decisions.update(decisions)
+        self.save()
+
+    def items(self) -> Dict[str, List[str]]:
+        return dict(self._decisions)
+
+    def save(self) -> None:
+        if self.cache_path:
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(self._decisions, f)
+            os.replace(tmp_path, self.cache_path)
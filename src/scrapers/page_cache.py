@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def url_cache_key(url: str) -> str:
+    """Stable filename-safe key for a URL"""
+    return hashlib.sha1(url.encode()).hexdigest()
+
+class PageCache:
+    """
+    Content cache keyed by URL. Each entry is a dict holding the raw HTML,
+    the extracted text and the fetch metadata (status, headers, final URL,
+    fetch time), plus the page's links and anchor text when known. Entries
+    live in memory and, when a cache directory is given, are also written to
+    disk as one JSON file per URL so that later runs can reuse them.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._pages: Dict[str, dict] = {}
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._pages))
+
+    def _entry_path(self, url: str) -> Path:
+        return self.cache_dir / f"{url_cache_key(url)}.json"
+
+    def get(self, url: str) -> Optional[dict]:
+        """Return the cached page for a URL, loading it from disk if needed"""
+        page = self._pages.get(url)
+        if page is not None or not self.cache_dir:
+            return page
+
+        path = self._entry_path(url)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                page = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable page cache entry for {url}: {e}")
+            return None
+
+        self._pages[url] = page
+        return page
+
+    def put(self, url: str, html: str, text: str, metadata: Optional[dict] = None,
+            links: Optional[List[str]] = None, anchor_text: Optional[Dict[str, str]] = None) -> dict:
+        """Store a fetched page and return the cache entry"""
+        page = {
+            "url": url,
+            "html": html,
+            "text": text,
+            "metadata": metadata or {},
+        }
+        if links is not None:
+            page["links"] = links
+            page["anchor_text"] = anchor_text or {}
+        self._pages[url] = page
+
+        if self.cache_dir:
+            path = self._entry_path(url)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(page, f)
+            os.replace(tmp_path, path)
+
+        return page
+
+    def load_all(self) -> int:
+        """Pull every on-disk entry into memory; returns the number of entries"""
+        if self.cache_dir:
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    with open(path, 'r') as f:
+                        page = json.load(f)
+                    self._pages.setdefault(page["url"], page)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Ignoring unreadable page cache entry {path.name}: {e}")
+        return len(self._pages)
@@ -1,96 +1,231 @@
+import asyncio
+import hashlib
 import logging
-from src.chat.chat_engine import chat_loop
+import time
+from src.chat.answer_cache import cached_query_engine, get_answer_cache
+from src.chat.chat_engine import CHAT_STREAMING, chat_loop
+from src.embeddings.cache import EmbeddingCacheUsage, exclude_document_metadata
 
 logger = logging.getLogger(__name__)
 from llama_index.core import VectorStoreIndex, Document
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-from src.vector_stores.local_storage import save_vector_store, load_vector_store
-from typing import List, Optional
+from src.scrapers.browser_pool import DEFAULT_POOL_SIZE
+from src.scrapers.html_parsing import parse_html
+from src.scrapers.http_fetcher import PageGoneError, TieredFetcher
+from src.scrapers.page_cache import PageCache
+from src.vector_stores.backends import get_backend
+from src.vector_stores.local_storage import load_manifest, save_manifest
+from typing import Dict, List, Optional
 
 def extract_content(html: str) -> str:
     """Extract relevant content from HTML, preserving links and main content"""
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Remove unwanted elements
-    for element in soup.find_all(['nav', 'footer', 'header', 'style', 'meta']):
-        element.decompose()
-    
-    # Get body content while preserving links
-    body = soup.find('body')
-    if not body:
-        return ''
-    
-    # Replace links with their text and URL in parentheses
-    for a_tag in body.find_all('a'):
-        href = a_tag.get('href', '')
-        if href and not href.startswith('#'):  # Skip anchor links
-            if not href.startswith(('http://', 'https://')):
-                # Make relative URLs absolute
-                href = f"https://{href}" if href.startswith('//') else href
-            # Preserve link text with URL
-            a_tag.replace_with(f"[{a_tag.get_text()}]({href})")
-    
-    return body.get_text(separator=' ', strip=True)
+    return parse_html(html, "")["text"]
 
 def scrape_page(url: str, wait_for_selector: Optional[str] = None) -> str:
-    """Scrape a single page using Playwright"""
+    """
+    Scrape a single page, over plain HTTP when possible and with Playwright otherwise.
+    Raises PageGoneError if the page answers 404 or 410.
+    """
     logger.debug(f"Scraping page: {url}")
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=False)  # Set to True for production
-        try:
-            context = browser.new_context(viewport={"width": 1920, "height": 1080})
-            page = context.new_page()
-            
-            page.goto(url, wait_until="networkidle")
-            
-            if wait_for_selector:
-                page.wait_for_selector(wait_for_selector)
-            
-            content = page.content()
-            return extract_content(content)
-        finally:
-            browser.close()
+
+    async def scrape() -> str:
+        async with TieredFetcher(browser_pool_size=1) as fetcher:
+            page = await fetch_page_async(fetcher, url, wait_for_selector)
+            if page.get("gone"):
+                raise PageGoneError(f"{url} is gone (HTTP {page['metadata'].get('status')})")
+            return page["text"]
+
+    return asyncio.run(scrape())
+
+async def fetch_page_async(fetcher: TieredFetcher, url: str, wait_for_selector: Optional[str] = None,
+                           page_cache: Optional[PageCache] = None,
+                           validators: Optional[dict] = None) -> dict:
+    """
+    Fetch one page through an open fetcher, reading and filling the page cache.
+    When validators are given and the server answers 304, the returned entry
+    has "not_modified" set and no content; a page that is gone (404/410) has
+    "gone" set, and isn't cached.
+    """
+    if page_cache is not None:
+        cached = page_cache.get(url)
+        if cached is not None:
+            return cached
+
+    fetched = await fetcher.fetch(url, wait_for_selector, validators)
+    if fetched.get("not_modified"):
+        return {"url": url, "not_modified": True, "metadata": fetched}
+    if fetched.get("gone"):
+        return {"url": url, "gone": True, "metadata": fetched}
+
+    html = fetched.pop("html")
+    parsed = fetched.pop("parsed", None) or parse_html(html, fetched.get("final_url") or url)
+    if page_cache is None:
+        page_cache = PageCache()
+    return page_cache.put(url, html, parsed["text"], fetched,
+                          links=parsed["links"], anchor_text=parsed["anchor_text"])
+
+async def fetch_pages_async(urls: List[str], wait_for_selector: Optional[str] = None,
+                            concurrency: int = DEFAULT_POOL_SIZE,
+                            page_cache: Optional[PageCache] = None,
+                            validators: Optional[Dict[str, dict]] = None) -> Dict[str, dict]:
+    """
+    Fetch several pages concurrently, over plain HTTP where that works and
+    through a shared headless browser pool where pages need JavaScript.
+    URLs already in the page cache are served from it; newly fetched pages
+    are added to it. Pages that fail to load are logged and left out.
+    
+    Returns:
+        Dict mapping each available URL to its page cache entry
+    """
+    validators = validators or {}
+    if page_cache is None:
+        page_cache = PageCache()
+
+    results = {url: page_cache.get(url) for url in urls if url in page_cache}
+    missing = [url for url in dict.fromkeys(urls) if url not in results]
+    if not missing:
+        logger.info(f"All {len(results)} pages served from the page cache")
+        return results
+
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    async with TieredFetcher(browser_pool_size=min(concurrency, len(missing))) as fetcher:
+        async def fetch(url: str) -> None:
+            async with semaphore:
+                try:
+                    results[url] = await fetch_page_async(
+                        fetcher, url, wait_for_selector, page_cache, validators.get(url)
+                    )
+                except Exception as e:
+                    logger.error(f"Error scraping {url}: {e}")
+
+        await asyncio.gather(*(fetch(url) for url in missing))
+
+    elapsed = time.perf_counter() - start
+    fetched_count = len(results) - (len(urls) - len(missing))
+    logger.info(f"Scraped {fetched_count}/{len(missing)} pages in {elapsed:.1f}s "
+                f"({fetched_count / elapsed:.2f} pages/sec, concurrency={concurrency}); "
+                f"{len(urls) - len(missing)} served from the page cache")
+    return results
+
+def fetch_pages(urls: List[str], wait_for_selector: Optional[str] = None,
+                concurrency: int = DEFAULT_POOL_SIZE,
+                page_cache: Optional[PageCache] = None,
+                validators: Optional[Dict[str, dict]] = None) -> Dict[str, dict]:
+    """Synchronous wrapper around fetch_pages_async"""
+    return asyncio.run(fetch_pages_async(urls, wait_for_selector, concurrency, page_cache, validators))
+
+def scrape_pages(urls: List[str], wait_for_selector: Optional[str] = None,
+                 concurrency: int = DEFAULT_POOL_SIZE) -> Dict[str, str]:
+    """Scrape several pages concurrently and return their extracted content by URL (gone pages are left out)"""
+    pages = fetch_pages(urls, wait_for_selector, concurrency)
+    return {url: page["text"] for url, page in pages.items() if not page.get("not_modified") and not page.get("gone")}
 
 def scrape_and_index_site(base_url: str, namespace: str = "website_docs", 
                          additional_urls: List[str] = None,
-                         wait_for_selector: Optional[str] = None) -> VectorStoreIndex:
+                         wait_for_selector: Optional[str] = None,
+                         concurrency: int = DEFAULT_POOL_SIZE,
+                         page_cache: Optional[PageCache] = None,
+                         prune_removed: bool = True) -> VectorStoreIndex:
     """
-    Scrape website(s) and save to the local vector store
+    Scrape website(s) and incrementally update the namespace's vector
+    backend (local by default, see backends.py). Only new or changed pages
+    are embedded; unchanged pages are skipped using the namespace's
+    manifest of page content hashes.
     
     Args:
         base_url: Main URL to scrape
         namespace: Namespace for vector store
         additional_urls: Optional list of additional URLs to scrape
         wait_for_selector: Optional CSS selector to wait for before scraping
+        concurrency: Number of pages to fetch at once through the browser pool
+        page_cache: Optional cache of already-fetched pages to index from
+        prune_removed: Delete indexed pages that are no longer in the URL list
+            (pages that answer 404 or 410 are always deleted)
     """
     urls = [base_url]
     if additional_urls:
         urls.extend(additional_urls)
     
     logger.debug(f"Starting scrape of {len(urls)} URLs with namespace: {namespace}")
-    documents = []
-    for url in urls:
-        try:
-            content = scrape_page(url, wait_for_selector)
-            doc = Document(text=content, metadata={"source": url})
-            documents.append(doc)
-        except Exception as e:
-            logger.error(f"Error scraping {url}: {e}")
-
-    index = VectorStoreIndex.from_documents(documents)
-    save_vector_store(index, namespace=namespace)
+    manifest = load_manifest(namespace=namespace)
+    # Pages we've indexed before are fetched conditionally against their stored validators
+    pages = fetch_pages(urls, wait_for_selector, concurrency, page_cache, validators=manifest)
+
+    backend = get_backend(namespace, default="local")
+    cache_usage = EmbeddingCacheUsage()
+    stats = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0, "skipped_chars": 0}
+
+    for url in dict.fromkeys(urls):
+        if url not in pages:
+            continue  # Failed to fetch, maybe only for now; keep whatever is already indexed
+        page = pages[url]
+        if page.get("gone"):
+            # Taken down (404/410), so it counts as removed like a URL dropped from the list
+            if url in manifest:
+                logger.info(f"{url} is gone (HTTP {page['metadata'].get('status')}); removing it from the index")
+                backend.delete({"ref_doc_id": {"$eq": url}})
+                del manifest[url]
+                stats["removed"] += 1
+            continue
+        if page.get("not_modified"):
+            stats["unchanged"] += 1
+            continue
+
+        content_hash = hashlib.sha256(page["text"].encode()).hexdigest()
+        previous = manifest.get(url)
+        changed = not previous or previous["content_hash"] != content_hash
+
+        if not changed:
+            stats["unchanged"] += 1
+            stats["skipped_chars"] += len(page["text"])
+        else:
+            if previous:
+                stats["changed"] += 1
+                backend.delete({"ref_doc_id": {"$eq": url}})
+            else:
+                stats["new"] += 1
+            # The URL is the document ID so its nodes can be replaced or deleted later
+            document = Document(id_=url, text=page["text"], metadata={"source": url})
+            backend.insert_documents(exclude_document_metadata([document]))
+
+        headers = {key.lower(): value for key, value in page["metadata"].get("headers", {}).items()}
+        manifest[url] = {
+            "content_hash": content_hash,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "indexed_at": time.time() if changed else previous["indexed_at"],
+        }
+
+    if prune_removed:
+        for url in [url for url in manifest if url not in urls]:
+            backend.delete({"ref_doc_id": {"$eq": url}})
+            del manifest[url]
+            stats["removed"] += 1
+
+    backend.persist()
+    save_manifest(manifest, namespace=namespace)
+
+    embedded = stats["new"] + stats["changed"]
+    if embedded or stats["removed"]:
+        # Answers about the old pages may no longer hold
+        get_answer_cache().clear_scope(namespace)
+    logger.info(f"Indexed namespace '{namespace}': {stats['new']} new, {stats['changed']} changed, "
+                f"{stats['unchanged']} unchanged, {stats['removed']} removed pages")
+    logger.info(f"Skipped embedding {stats['unchanged']}/{embedded + stats['unchanged']} pages "
+                f"(~{stats['skipped_chars'] // 4} tokens)")
+    logger.info(cache_usage.summary())
     
-    return index
+    return backend.as_index()
 
 def chat_with_saved_site(namespace: str = "website_docs"):
     """Load saved website index and start chat"""
-    index = load_vector_store(namespace=namespace)
+    index = get_backend(namespace, default="local").as_index()
     query_engine = index.as_query_engine(
         similarity_top_k=3,  # Adjust number of similar chunks to consider
-        response_mode="compact"  # For more concise responses
+        response_mode="compact",  # For more concise responses
+        streaming=CHAT_STREAMING,
     )
-    chat_loop(query_engine)
+    chat_loop(cached_query_engine(query_engine, namespace))
 
 if __name__ == "__main__":
     URL = "https://help.docebo.com/hc/en-us/sections/4407577387026-Docebo-Flow"
@@ -104,4 +239,4 @@ if __name__ == "__main__":
         ],
         wait_for_selector="body"  # Wait for body to load
     )
-    chat_loop(index.as_query_engine())
+    chat_loop(index.as_query_engine(streaming=CHAT_STREAMING))
@@ -13,33 +13,49 @@ def generate_file_id(name: str, extension: str, size_mb: float) -> str:
     file_info = f"{name}{extension}{size_mb:.1f}".encode()
     return hashlib.sha1(file_info).hexdigest()[:6]
 
-def get_directory_info(directory_path: str) -> List[Tuple[str, str, str, str]]:
+def scan_files(dir_path: Path, recursive: bool = False) -> List[Tuple[str, int]]:
+    """
+    (name, size in bytes) for each file under dir_path, excluding dotfiles
+    and dot-directories. Names of nested files are paths relative to
+    dir_path, e.g. "Inspections/roof.pdf".
+    """
+    files = []
+    pending = [(str(dir_path), "")]
+    while pending:
+        directory, prefix = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_file():
+                    files.append((prefix + entry.name, entry.stat().st_size))
+                elif recursive and entry.is_dir():
+                    pending.append((entry.path, f"{prefix}{entry.name}/"))
+    return sorted(files)
+
+def get_directory_info(directory_path: str, recursive: bool = False) -> List[Tuple[str, str, str, str]]:
     """
     Collect information about files in the given directory.
     
     Args:
         directory_path (str): Path to the directory to analyze
+        recursive (bool): Include files in nested folders, named by their relative path
         
     Returns:
-        List[tuple]: List of (filename, extension, size_mb) tuples
+        List[tuple]: List of (file_id, filename, extension, size) tuples
     """
     dir_path = Path(directory_path)
     
     if not dir_path.exists() or not dir_path.is_dir():
         raise ValueError(f"Error: {directory_path} is not a valid directory")
 
-    # Get only files in the current directory (no recursion), excluding dotfiles
-    files = [f for f in dir_path.iterdir() if not f.name.startswith('.')]
-    
-    # Collect info for each file
+    # Collect info for each file (only the top level unless recursive), excluding dotfiles
     file_info = []
-    for file_path in sorted(files):
-        if file_path.is_file():  # Only process files, not directories
-            name = file_path.name
-            extension = file_path.suffix if file_path.suffix else "(no ext)"
-            size_mb = os.path.getsize(file_path) / (1024 * 1024)  # Convert to MB
-            file_id = generate_file_id(name, extension, size_mb)
-            file_info.append((file_id, name, extension, f"{size_mb:.1f}MB"))
+    for name, size in scan_files(dir_path, recursive):
+        extension = Path(name).suffix if Path(name).suffix else "(no ext)"
+        size_mb = size / (1024 * 1024)  # Convert to MB
+        file_id = generate_file_id(name, extension, size_mb)
+        file_info.append((file_id, name, extension, f"{size_mb:.1f}MB"))
             
     return file_info
 
@@ -59,13 +75,11 @@ def print_directory_info(file_info: List[tuple]) -> None:
         writer.writerow([])  # Empty row for spacing
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        directory = sys.argv[1]
-    else:
-        directory = "."  # Current directory if no argument provided
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    directory = args[0] if args else "."  # Current directory if no argument provided
         
     try:
-        file_info = get_directory_info(directory)
+        file_info = get_directory_info(directory, recursive="--recursive" in sys.argv)
         print_directory_info(file_info)
     except ValueError as e:
         print(e)
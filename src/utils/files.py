@@ -1,9 +1,19 @@
 import os
+import json
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from src.environment import get_default_pdf_path
 
+DEFAULT_CACHE_DIR = "cache"
+# md5 is the default because existing Pinecone vectors are tagged with md5 file hashes
+DEFAULT_HASH_ALGORITHM = os.getenv("FILE_HASH_ALGORITHM", "md5")
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_CACHE_FILE = "file_hashes.json"
+HASH_WORKERS = 8
+
 def get_project_root():
     """Get the absolute path to the project root directory"""
     # Assuming this file is in src/utils/files.py
@@ -13,10 +23,127 @@ def resolve_path(relative_path):
     """Resolve a path relative to the project root"""
     return os.path.join(get_project_root(), relative_path)
 
-def get_file_hash(file_path):
-    """Generate a hash of the file contents"""
-    with open(file_path, 'rb') as f:
-        return hashlib.md5(f.read()).hexdigest()
+def get_cache_dir(name):
+    """Get (and create) a named directory for local caches under the project root"""
+    cache_dir = Path(get_project_root()) / DEFAULT_CACHE_DIR / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+def new_hasher(algorithm):
+    """hashlib-style hasher for md5, sha256, blake2b (all stdlib) or blake3 (optional package)"""
+    if algorithm == "blake3":
+        try:
+            from blake3 import blake3
+        except ImportError:
+            raise ValueError("The blake3 hash algorithm needs the blake3 package (pip install blake3)")
+        return blake3(max_threads=blake3.AUTO)
+    return hashlib.new(algorithm)
+
+def hash_file_contents(file_path, algorithm=DEFAULT_HASH_ALGORITHM, chunk_size=HASH_CHUNK_SIZE):
+    """Hash a file in fixed-size chunks, so memory use doesn't grow with the file"""
+    hasher = new_hasher(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+    return hasher.hexdigest()
+
+class FileHashCache:
+    """
+    Persistent map of (path, algorithm) -> hash, trusted only while the
+    file's size, mtime and inode are unchanged. Stored as one JSON file in
+    the project cache directory.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = Path(cache_path) if cache_path else get_cache_dir("hashes") / HASH_CACHE_FILE
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if self.cache_path.exists():
+            with open(self.cache_path, 'r') as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def key(file_path, algorithm):
+        return f"{algorithm}:{os.path.realpath(file_path)}"
+
+    @staticmethod
+    def signature(stat):
+        return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+    def get(self, file_path, algorithm, stat):
+        with self._lock:
+            entry = self._entries.get(self.key(file_path, algorithm))
+        if entry and entry["stat"] == self.signature(stat):
+            return entry["hash"]
+        return None
+
+    def put(self, file_path, algorithm, stat, file_hash):
+        with self._lock:
+            self._entries[self.key(file_path, algorithm)] = {"stat": self.signature(stat), "hash": file_hash}
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+
+_hash_cache = None
+_hash_cache_lock = threading.Lock()
+
+def get_hash_cache():
+    """Get the process-wide file hash cache, loading it on first use"""
+    global _hash_cache
+    with _hash_cache_lock:
+        if _hash_cache is None:
+            _hash_cache = FileHashCache()
+        return _hash_cache
+
+def get_file_hash(file_path, algorithm=DEFAULT_HASH_ALGORITHM, use_cache=True, save_cache=True):
+    """
+    Generate a hash of the file contents, streaming the file in chunks.
+    Unchanged files (same size, mtime and inode) are answered from the
+    persistent hash cache without reading them.
+    """
+    if not use_cache:
+        return hash_file_contents(file_path, algorithm)
+
+    cache = get_hash_cache()
+    stat = os.stat(file_path)
+    file_hash = cache.get(file_path, algorithm, stat)
+    if file_hash is None:
+        file_hash = hash_file_contents(file_path, algorithm)
+        cache.put(file_path, algorithm, stat, file_hash)
+        if save_cache:
+            cache.save()
+    return file_hash
+
+def hash_directory(directory, algorithm=DEFAULT_HASH_ALGORITHM, max_workers=HASH_WORKERS, recursive=False):
+    """
+    Hash every (non-hidden) file in a directory across a thread pool;
+    hashlib releases the GIL while hashing, so large files hash in
+    parallel. Returns {path: hash}.
+    """
+    pattern = "**/*" if recursive else "*"
+    paths = sorted(
+        str(path) for path in Path(directory).glob(pattern)
+        if path.is_file() and not any(part.startswith('.') for part in path.relative_to(directory).parts)
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        hashes = pool.map(lambda path: get_file_hash(path, algorithm, save_cache=False), paths)
+        result = dict(zip(paths, hashes))
+    get_hash_cache().save()
+    return result
     
 def ask_user_for_file_path():
     default_path = get_default_pdf_path()
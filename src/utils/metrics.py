@@ -0,0 +1,65 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable
+
+_counts: Counter = Counter()
+_lock = threading.Lock()
+
+def increment(name: str, amount: int = 1) -> None:
+    """Add to a named process-wide counter"""
+    with _lock:
+        _counts[name] += amount
+
+def snapshot(prefix: str = "") -> Dict[str, int]:
+    """Current value of every counter whose name starts with prefix"""
+    with _lock:
+        return {name: count for name, count in _counts.items() if name.startswith(prefix)}
+
+def reset() -> None:
+    with _lock:
+        _counts.clear()
+
+@contextmanager
+def measure(operation: str, prefix: str = "pinecone."):
+    """
+    Print how much each counter under prefix grew while the block ran, e.g.
+
+        with measure("load_pdf"):
+            load_pdf_as_query_engine(path)
+
+    prints "[metrics] load_pdf: 2 pinecone round trips (describe_index=1, query=1)"
+    """
+    before = snapshot(prefix)
+    try:
+        yield
+    finally:
+        after = snapshot(prefix)
+        deltas = {
+            name[len(prefix):]: count - before.get(name, 0)
+            for name, count in sorted(after.items()) if count > before.get(name, 0)
+        }
+        detail = ", ".join(f"{name}={count}" for name, count in deltas.items())
+        print(f"[metrics] {operation}: {sum(deltas.values())} {prefix.rstrip('.')} round trips"
+              + (f" ({detail})" if detail else ""))
+
+class CountedClient:
+    """
+    Transparent proxy that counts calls to the given methods of a client
+    (one call = one network round trip) under "<prefix>.<method>".
+    """
+
+    def __init__(self, client, prefix: str, methods: Iterable[str]):
+        self._client = client
+        self._prefix = prefix
+        self._methods = set(methods)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self._methods or not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            increment(f"{self._prefix}.{name}")
+            return attr(*args, **kwargs)
+        return counted
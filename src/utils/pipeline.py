@@ -0,0 +1,136 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class Stage:
+    """
+    One step of a Pipeline: fn is called on each item from the previous
+    stage by `workers` threads, and its return value is passed on (None
+    drops the item). size(output) says how many units (pages, nodes...) an
+    output counts for in the throughput report.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1,
+                 unit: str = "items", size: Optional[Callable[[Any], int]] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.unit = unit
+        self.size = size or (lambda output: 1)
+        self.processed = 0
+        self.failed = 0
+        self.units = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, output: Any, seconds: float) -> None:
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+            if output is not None:
+                self.units += self.size(output)
+
+    def record_failure(self, seconds: float) -> None:
+        with self._lock:
+            self.failed += 1
+            self.busy_seconds += seconds
+
+    def wall_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+class Pipeline:
+    """
+    Runs items through stages concurrently, each stage in its own worker
+    threads, connected by bounded queues. While stage 2 works on item N,
+    stage 1 can already work on item N+1, and a slow stage applies
+    backpressure instead of letting work pile up in memory. An item that
+    raises is logged and dropped without stopping the others.
+
+        pipeline = Pipeline([Stage("parse", parse, workers=2), Stage("embed", embed)])
+        results = pipeline.run(paths)
+        pipeline.print_report()
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2, describe: Callable[[Any], str] = str):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.describe = describe
+        self.elapsed = 0.0
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """Feed items through every stage; returns the last stage's outputs"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results: List[Any] = []
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+        start = time.perf_counter()
+
+        def work(index: int) -> None:
+            stage = self.stages[index]
+            inbox = queues[index]
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+                if stage.started_at is None:
+                    stage.started_at = time.perf_counter()
+                began = time.perf_counter()
+                try:
+                    output = stage.fn(item)
+                except Exception as e:
+                    stage.record_failure(time.perf_counter() - began)
+                    logger.error(f"{stage.name} failed for {self.describe(item)}: {e}")
+                    continue
+                stage.record(output, time.perf_counter() - began)
+                if output is None:
+                    continue
+                if index + 1 < len(self.stages):
+                    queues[index + 1].put(output)
+                else:
+                    results.append(output)
+
+            # The last worker out tells the next stage's workers to stop
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                stage.finished_at = time.perf_counter()
+                if index + 1 < len(self.stages):
+                    for _ in range(self.stages[index + 1].workers):
+                        queues[index + 1].put(_DONE)
+
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(self.stages) for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for item in items:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+
+        self.elapsed = time.perf_counter() - start
+        return results
+
+    def print_report(self) -> None:
+        """Per-stage throughput: work done, time busy and rate over the stage's active time"""
+        print(f"\n{'stage':<10}{'done':>6}{'failed':>8}{'units':>16}{'busy s':>9}{'active s':>10}{'units/s':>10}")
+        for stage in self.stages:
+            wall = stage.wall_seconds()
+            rate = stage.units / wall if wall else 0.0
+            print(f"{stage.name:<10}{stage.processed:>6}{stage.failed:>8}{stage.units:>10} {stage.unit:<5}"
+                  f"{stage.busy_seconds:>9.1f}{wall:>10.1f}{rate:>10.1f}")
+        print(f"Total: {self.elapsed:.1f}s")
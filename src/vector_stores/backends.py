@@ -0,0 +1,222 @@
+"""
+One interface over the places a namespace's vectors can live:
+
+    pinecone  the hosted index (PINECONE_INDEX_NAME)
+    local     a NumpyVectorStore namespace on disk (local_storage.py)
+    memory    an in-process InMemoryPineconeIndex, for tests and benchmarks
+
+Filters are Pinecone-style dicts, e.g. {"file_hash": {"$eq": "abc"}}, with
+the same semantics on every backend. The backend for a namespace is
+chosen with VECTOR_BACKEND_<NAMESPACE> (e.g. VECTOR_BACKEND_DISCLOSURES=local),
+then VECTOR_BACKEND, then the caller's default.
+"""
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence
+
+from llama_index.core import Document, Settings, VectorStoreIndex
+from llama_index.core.indices.utils import embed_nodes
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode, NodeWithScore
+from llama_index.core.vector_stores.types import ExactMatchFilter, MetadataFilters, VectorStoreQuery
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from llama_index.vector_stores.pinecone import PineconeVectorStore
+
+from src.environment import get_pinecone_index
+from .local_storage import load_vector_store, save_vector_store
+from .ingestion_manifest import get_ingestion_manifest
+from .memory_index import InMemoryPineconeIndex
+from .pinecone import (
+    PineconeUpsertWriter,
+    check_file_hash_exists,
+    delete_docs_by_file_hash,
+    record_ingestion,
+)
+
+def file_hash_filter(file_hash: str) -> dict:
+    return {"file_hash": {"$eq": file_hash}}
+
+class VectorBackend(ABC):
+    """Where one namespace's vectors are stored and searched"""
+
+    name = ""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    @abstractmethod
+    def upsert_nodes(self, nodes: Sequence[BaseNode], verbose: bool = True) -> int:
+        """
+        Write embedded nodes, replacing any with the same IDs; returns how many.
+        verbose=False skips the per-call progress line, for callers writing many small batches.
+        """
+
+    @abstractmethod
+    def query(self, embedding: List[float], top_k: int = 10, filter: Optional[dict] = None) -> List[NodeWithScore]:
+        """Nearest nodes to an embedding among those matching filter"""
+
+    @abstractmethod
+    def delete(self, filter: dict) -> None:
+        """Delete every node matching filter"""
+
+    @abstractmethod
+    def as_index(self) -> VectorStoreIndex:
+        """A VectorStoreIndex over the namespace, for llama_index query engines"""
+
+    @abstractmethod
+    def exists_by_hash(self, file_hash: str) -> bool:
+        """Whether any node was ingested from the file with this hash"""
+
+    def is_ingested(self, file_hash: str) -> bool:
+        """
+        Whether the file's ingestion finished, as opposed to some of its nodes
+        being written before a crash. Here the same as exists_by_hash, since
+        writes only reach storage on persist(), after ingestion.
+        """
+        return self.exists_by_hash(file_hash)
+
+    def embed_documents(self, documents: Sequence[Document]) -> List[BaseNode]:
+        """Chunk and embed documents the way VectorStoreIndex.from_documents does"""
+        nodes = run_transformations(list(documents), Settings.transformations)
+        embeddings = embed_nodes(nodes, Settings.embed_model)
+        for node in nodes:
+            node.embedding = embeddings[node.node_id]
+        return nodes
+
+    def insert_documents(self, documents: Sequence[Document]) -> List[BaseNode]:
+        """Chunk, embed and upsert documents"""
+        nodes = self.embed_documents(documents)
+        self.upsert_nodes(nodes)
+        return nodes
+
+    def record_ingestion(self, file_hash: str, node_count: int) -> None:
+        """Note that a file's nodes were written (only the Pinecone backend keeps a manifest)"""
+
+    def delete_by_hash(self, file_hash: str) -> None:
+        self.delete(file_hash_filter(file_hash))
+
+    def file_hash_query_engine(self, file_hash: str, **kwargs):
+        """Query engine that only searches nodes from the file with this hash"""
+        filters = MetadataFilters(filters=[ExactMatchFilter(key="file_hash", value=file_hash)])
+        return self.as_index().as_query_engine(filters=filters, **kwargs)
+
+    def persist(self) -> None:
+        """Flush writes for backends that buffer them"""
+
+class PineconeBackend(VectorBackend):
+    """Any pinecone.Index-compatible handle, by default the shared hosted index"""
+
+    name = "pinecone"
+
+    def __init__(self, namespace: str, index=None):
+        super().__init__(namespace)
+        self.index = index if index is not None else get_pinecone_index()
+
+    def upsert_nodes(self, nodes: Sequence[BaseNode], verbose: bool = True) -> int:
+        return PineconeUpsertWriter(self.index, namespace=self.namespace, verbose=verbose).upsert_nodes(nodes)
+
+    def query(self, embedding: List[float], top_k: int = 10, filter: Optional[dict] = None) -> List[NodeWithScore]:
+        response = self.index.query(vector=embedding, top_k=top_k, namespace=self.namespace,
+                                    filter=filter, include_metadata=True)
+        return [NodeWithScore(node=metadata_dict_to_node(match.metadata), score=match.score)
+                for match in response.matches]
+
+    def delete(self, filter: dict) -> None:
+        self.index.delete(namespace=self.namespace, filter=filter)
+
+    def exists_by_hash(self, file_hash: str) -> bool:
+        # Answered from the ingestion manifest where possible
+        return check_file_hash_exists(file_hash, self.namespace)
+
+    def is_ingested(self, file_hash: str) -> bool:
+        # Upserts land straight away, so only the manifest (written by record_ingestion) says it finished
+        return get_ingestion_manifest().contains(file_hash, self.namespace)
+
+    def record_ingestion(self, file_hash: str, node_count: int) -> None:
+        record_ingestion(file_hash, node_count, namespace=self.namespace)
+
+    def delete_by_hash(self, file_hash: str) -> None:
+        delete_docs_by_file_hash(file_hash, namespace=self.namespace)
+
+    def as_index(self) -> VectorStoreIndex:
+        return VectorStoreIndex.from_vector_store(PineconeVectorStore(pinecone_index=self.index, namespace=self.namespace))
+
+class MemoryBackend(PineconeBackend):
+    """The Pinecone code path against a process-wide InMemoryPineconeIndex"""
+
+    name = "memory"
+
+    def __init__(self, namespace: str, index: Optional[InMemoryPineconeIndex] = None):
+        super().__init__(namespace, index if index is not None else get_memory_index())
+
+    def exists_by_hash(self, file_hash: str) -> bool:
+        if self.index.dimension is None:
+            return False  # Nothing has been written yet
+        return bool(self.query([0.0] * self.index.dimension, top_k=1, filter=file_hash_filter(file_hash)))
+
+    def is_ingested(self, file_hash: str) -> bool:
+        # Nothing outlives the process, so there are no leftovers from a crash
+        return self.exists_by_hash(file_hash)
+
+    def record_ingestion(self, file_hash: str, node_count: int) -> None:
+        pass
+
+    def delete_by_hash(self, file_hash: str) -> None:
+        self.delete(file_hash_filter(file_hash))
+
+class LocalBackend(VectorBackend):
+    """A NumpyVectorStore namespace under vector_stores/; writes reach disk on persist()"""
+
+    name = "local"
+
+    def __init__(self, namespace: str, **store_kwargs):
+        super().__init__(namespace)
+        self.index = load_vector_store(namespace, **store_kwargs)
+        self.store = self.index.vector_store
+
+    def upsert_nodes(self, nodes: Sequence[BaseNode], verbose: bool = True) -> int:
+        self.index.insert_nodes(list(nodes))
+        return len(nodes)
+
+    def query(self, embedding: List[float], top_k: int = 10, filter: Optional[dict] = None) -> List[NodeWithScore]:
+        result = self.store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k), where=filter)
+        return [NodeWithScore(node=node, score=score) for node, score in zip(result.nodes, result.similarities)]
+
+    def delete(self, filter: dict) -> None:
+        self.store.delete_where(filter)
+
+    def exists_by_hash(self, file_hash: str) -> bool:
+        return bool(self.store.rows_where(file_hash_filter(file_hash)))
+
+    def as_index(self) -> VectorStoreIndex:
+        return self.index
+
+    def persist(self) -> None:
+        save_vector_store(self.index, namespace=self.namespace)
+
+_memory_index: Optional[InMemoryPineconeIndex] = None
+_memory_index_lock = threading.Lock()
+
+def get_memory_index() -> InMemoryPineconeIndex:
+    """The in-process stand-in index shared by every memory backend"""
+    global _memory_index
+    with _memory_index_lock:
+        if _memory_index is None:
+            _memory_index = InMemoryPineconeIndex()
+        return _memory_index
+
+BACKENDS: Dict[str, type] = {"pinecone": PineconeBackend, "local": LocalBackend, "memory": MemoryBackend}
+
+def backend_name(namespace: str, default: str = "pinecone") -> str:
+    env_key = "VECTOR_BACKEND_" + re.sub(r"[^A-Z0-9]", "_", namespace.upper())
+    name = (os.getenv(env_key) or os.getenv("VECTOR_BACKEND") or default).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector backend {name!r} for namespace {namespace!r}, "
+                         f"expected one of {list(BACKENDS)}")
+    return name
+
+def get_backend(namespace: str, default: str = "pinecone") -> VectorBackend:
+    """The configured backend for a namespace (see the module docstring)"""
+    return BACKENDS[backend_name(namespace, default)](namespace)
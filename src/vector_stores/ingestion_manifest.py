@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from ..utils.files import get_project_root
+
+DEFAULT_MANIFEST_PATH = "vector_stores/ingestion_manifest.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    file_hash TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    node_count INTEGER,
+    embed_model TEXT,
+    ingested_at REAL NOT NULL,
+    PRIMARY KEY (file_hash, namespace)
+)
+"""
+
+class IngestionManifest:
+    """
+    Local SQLite record of which documents (by file hash) have been
+    ingested into which Pinecone namespace, so "is this PDF indexed yet?"
+    is answered without a network round trip. Each write is its own
+    transaction, so an entry exists only once ingestion has succeeded.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv("INGESTION_MANIFEST_PATH")
+                         or Path(get_project_root()) / DEFAULT_MANIFEST_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+
+    def get(self, file_hash: str, namespace: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE file_hash = ? AND namespace = ?", (file_hash, namespace)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def contains(self, file_hash: str, namespace: str) -> bool:
+        return self.get(file_hash, namespace) is not None
+
+    def record(self, file_hash: str, namespace: str, node_count: Optional[int] = None,
+               embed_model: Optional[str] = None) -> None:
+        """Insert or replace the entry for a successfully ingested document"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                (file_hash, namespace, node_count, embed_model, time.time()),
+            )
+
+    def remove(self, file_hash: str, namespace: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE file_hash = ? AND namespace = ?", (file_hash, namespace))
+
+    def entries(self, namespace: Optional[str] = None) -> List[dict]:
+        query, params = "SELECT * FROM documents", ()
+        if namespace is not None:
+            query, params = query + " WHERE namespace = ?", (namespace,)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query + " ORDER BY ingested_at", params)]
+
+_manifest: Optional[IngestionManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_ingestion_manifest() -> IngestionManifest:
+    """Get the process-wide ingestion manifest, opening it on first use"""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = IngestionManifest()
+        return _manifest
@@ -0,0 +1,143 @@
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+ASSIGNMENTS_FILE = "ivf_assignments.npy"
+# How many rows the centroids were trained on, so needs_rebuild() counts growth across processes
+META_FILE = "ivf_meta.json"
+DEFAULT_N_PROBE = 16
+KMEANS_ITERATIONS = 10
+# k-means is trained on a sample of at most this many rows per list
+TRAINING_ROWS_PER_LIST = 64
+# Rebuild once the index holds this many times the rows it was trained on
+REBUILD_GROWTH_FACTOR = 2.0
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+def spherical_kmeans(data: np.ndarray, n_lists: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> np.ndarray:
+    """Cluster L2-normalized rows by cosine similarity; returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = np.array(data[rng.choice(len(data), n_lists, replace=False)], dtype=np.float32)
+
+    for _ in range(iterations):
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums = np.add.reduceat(np.asarray(data)[order], starts[nonempty], axis=0)
+        centroids[nonempty] = sums
+        # Re-seed empty lists from random rows so no centroid is wasted
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        centroids = normalize_rows(centroids)
+
+    return centroids
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over the rows of a
+    NumpyVectorStore. Rows are clustered into n_lists cells by spherical
+    k-means; a query only scores the rows in its n_probe closest cells.
+    Raising n_probe trades latency for recall (n_probe == n_lists is an
+    exact scan). New rows are assigned to their closest existing cell, and
+    needs_rebuild() reports when the index has outgrown its training.
+    """
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, trained_rows: Optional[int] = None):
+        self.centroids = centroids
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        self.trained_rows = trained_rows if trained_rows is not None else len(assignments)
+        self._lists: List[np.ndarray] = []
+        self._pending: List[List[int]] = []
+        self._rebuild_lists()
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, n_lists: Optional[int] = None, seed: int = 0) -> "IVFIndex":
+        """Train centroids on a sample of the (normalized) embeddings and assign every row"""
+        n_rows = len(embeddings)
+        n_lists = n_lists or max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(n_rows, n_lists * TRAINING_ROWS_PER_LIST)
+        sample = np.asarray(embeddings[np.sort(rng.choice(n_rows, sample_size, replace=False))])
+        centroids = spherical_kmeans(sample, n_lists, seed=seed)
+        return cls(centroids, cls.assign(centroids, embeddings))
+
+    @staticmethod
+    def assign(centroids: np.ndarray, embeddings: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        """Closest centroid for each row, in batches to bound memory"""
+        assignments = np.empty(len(embeddings), dtype=np.int32)
+        for start in range(0, len(embeddings), batch_size):
+            batch = np.asarray(embeddings[start:start + batch_size])
+            assignments[start:start + batch_size] = np.argmax(batch @ centroids.T, axis=1)
+        return assignments
+
+    def _rebuild_lists(self) -> None:
+        order = np.argsort(self.assignments, kind='stable')
+        counts = np.bincount(self.assignments, minlength=self.n_lists)
+        self._lists = np.split(order, np.cumsum(counts)[:-1])
+        self._pending = [[] for _ in range(self.n_lists)]
+
+    def add(self, embeddings: np.ndarray) -> None:
+        """Assign rows appended to the store (in order) to their closest cells"""
+        if not len(embeddings):
+            return
+        first_row = len(self.assignments)
+        new_assignments = self.assign(self.centroids, embeddings)
+        self.assignments = np.concatenate([self.assignments, new_assignments])
+        for offset, cell in enumerate(new_assignments):
+            self._pending[cell].append(first_row + offset)
+
+    def compact(self, live_rows: List[int]) -> None:
+        """Follow the store dropping dead rows and renumbering the rest"""
+        self.assignments = self.assignments[np.asarray(live_rows, dtype=np.int64)]
+        self._rebuild_lists()
+
+    def needs_rebuild(self) -> bool:
+        return len(self.assignments) > self.trained_rows * REBUILD_GROWTH_FACTOR
+
+    def candidates(self, query_vector: np.ndarray, n_probe: int) -> np.ndarray:
+        """Rows in the n_probe cells closest to the (normalized) query"""
+        n_probe = min(n_probe, self.n_lists)
+        cells = np.argpartition(-(self.centroids @ query_vector), n_probe - 1)[:n_probe]
+        parts = [self._lists[cell] for cell in cells]
+        parts += [np.asarray(self._pending[cell], dtype=np.int64) for cell in cells if self._pending[cell]]
+        return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+    def persist(self, persist_dir: Path) -> None:
+        np.save(Path(persist_dir) / CENTROIDS_FILE, self.centroids)
+        np.save(Path(persist_dir) / ASSIGNMENTS_FILE, self.assignments)
+        with open(Path(persist_dir) / META_FILE, 'w') as f:
+            json.dump({"trained_rows": int(self.trained_rows)}, f)
+
+    @classmethod
+    def load(cls, persist_dir: Path) -> Optional["IVFIndex"]:
+        centroids_path = Path(persist_dir) / CENTROIDS_FILE
+        assignments_path = Path(persist_dir) / ASSIGNMENTS_FILE
+        if not centroids_path.exists() or not assignments_path.exists():
+            return None
+        meta_path = Path(persist_dir) / META_FILE
+        # Indexes saved before the meta file existed count from their current size
+        trained_rows = json.loads(meta_path.read_text())["trained_rows"] if meta_path.exists() else None
+        return cls(np.load(centroids_path), np.load(assignments_path), trained_rows)
+
+    @staticmethod
+    def remove(persist_dir: Path) -> None:
+        for name in (CENTROIDS_FILE, ASSIGNMENTS_FILE, META_FILE):
+            path = Path(persist_dir) / name
+            if path.exists():
+                path.unlink()
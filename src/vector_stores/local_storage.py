@@ -1,9 +1,16 @@
+import json
+import os
 from pathlib import Path
-from llama_index.core import StorageContext, VectorStoreIndex
+from typing import Optional
+from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
 from llama_index.core.vector_stores import SimpleVectorStore
 from ..utils.files import get_project_root
+from .numpy_store import NumpyVectorStore
 
 DEFAULT_VECTOR_DIR = "vector_stores"
+MANIFEST_FILE = "manifest.json"
+# Written by SimpleVectorStore, which namespaces used before NumpyVectorStore
+LEGACY_VECTOR_STORE_FILE = "default__vector_store.json"
 
 def get_storage_path(namespace: str = "default") -> Path:
     """Get the storage directory path for vector stores"""
@@ -12,17 +19,83 @@ def get_storage_path(namespace: str = "default") -> Path:
     vector_dir.mkdir(parents=True, exist_ok=True)
     return vector_dir
 
+def has_vector_store(namespace: str = "default") -> bool:
+    """Check whether an index has been persisted for the namespace"""
+    return (get_storage_path(namespace) / "docstore.json").exists()
+
 def save_vector_store(index: VectorStoreIndex, namespace: str = "default") -> None:
     """Save a VectorStoreIndex to the local filesystem"""
     storage_path = get_storage_path(namespace)
     index.storage_context.persist(persist_dir=str(storage_path))
 
-def load_vector_store(namespace: str = "default") -> VectorStoreIndex:
-    """Load a VectorStoreIndex from the local filesystem"""
+def load_vector_store(namespace: str = "default", **store_kwargs) -> VectorStoreIndex:
+    """
+    Load a VectorStoreIndex from the local filesystem
+
+    Args:
+        namespace: Namespace to load
+        store_kwargs: NumpyVectorStore settings, e.g. ann=True or ann_n_probe=16
+    """
     storage_path = get_storage_path(namespace)
-    if not storage_path.exists():
+    if not has_vector_store(namespace):
         # Return empty index if no stored data exists
-        return VectorStoreIndex([], storage_context=StorageContext.from_defaults(vector_store=SimpleVectorStore()))
-    
-    storage_context = StorageContext.from_defaults(persist_dir=str(storage_path))
-    return VectorStoreIndex([], storage_context=storage_context)
+        vector_store = NumpyVectorStore(**store_kwargs)
+        return VectorStoreIndex([], storage_context=StorageContext.from_defaults(vector_store=vector_store))
+
+    if is_legacy_namespace(namespace):
+        migrate_namespace(namespace)
+
+    vector_store = NumpyVectorStore.from_persist_dir(str(storage_path), **store_kwargs)
+    storage_context = StorageContext.from_defaults(persist_dir=str(storage_path), vector_store=vector_store)
+    return load_index_from_storage(storage_context)
+
+def build_ann_index(namespace: str = "default", n_lists: Optional[int] = None) -> None:
+    """Build (or rebuild) the IVF index for a namespace, whatever its size"""
+    index = load_vector_store(namespace, ann_n_lists=n_lists)
+    index.vector_store.build_ann()
+    save_vector_store(index, namespace=namespace)
+
+def quantize_namespace(namespace: str = "default", quantization: str = "int8", rescore: bool = False) -> None:
+    """Rewrite a namespace's embeddings in another storage mode (see quantization.py)"""
+    index = load_vector_store(namespace, quantization=quantization, rescore=rescore)
+    save_vector_store(index, namespace=namespace)
+
+def is_legacy_namespace(namespace: str = "default") -> bool:
+    """Check whether a namespace was saved by SimpleVectorStore and not yet migrated"""
+    storage_path = get_storage_path(namespace)
+    return (storage_path / LEGACY_VECTOR_STORE_FILE).exists() and not NumpyVectorStore.exists(str(storage_path))
+
+def migrate_namespace(namespace: str = "default") -> None:
+    """Convert a SimpleVectorStore namespace to NumpyVectorStore files, without re-embedding"""
+    storage_path = get_storage_path(namespace)
+    legacy_index = load_index_from_storage(StorageContext.from_defaults(persist_dir=str(storage_path)))
+    embedding_dict = legacy_index.vector_store.data.embedding_dict
+
+    nodes = []
+    for node_id, node in legacy_index.docstore.docs.items():
+        if node_id in embedding_dict:
+            node.embedding = embedding_dict[node_id]
+            nodes.append(node)
+
+    index = VectorStoreIndex(nodes, storage_context=StorageContext.from_defaults(vector_store=NumpyVectorStore()))
+    save_vector_store(index, namespace=namespace)
+    os.remove(storage_path / LEGACY_VECTOR_STORE_FILE)
+
+def load_manifest(namespace: str = "default") -> dict:
+    """
+    Load the namespace's page manifest: URL -> {"content_hash", "etag",
+    "last_modified", "indexed_at"} for every page currently in the index
+    """
+    manifest_path = get_storage_path(namespace) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest: dict, namespace: str = "default") -> None:
+    """Atomically write the namespace's page manifest"""
+    manifest_path = get_storage_path(namespace) / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
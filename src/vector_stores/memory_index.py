@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+RANGE_OPERATORS = {
+    "$gt": lambda value, target: value > target,
+    "$gte": lambda value, target: value >= target,
+    "$lt": lambda value, target: value < target,
+    "$lte": lambda value, target: value <= target,
+}
+
+class SimulatedPineconeError(Exception):
+    """Raised by InMemoryPineconeIndex to simulate a throttled or failed request"""
+
+    def __init__(self, status: int = 503):
+        super().__init__(f"Simulated Pinecone error (HTTP {status})")
+        self.status = status
+
+@dataclass
+class QueryMatch:
+    id: str
+    score: float
+    values: List[float] = field(default_factory=list)
+    metadata: Optional[dict] = None
+
+@dataclass
+class QueryResponse:
+    matches: List[QueryMatch]
+    namespace: str = ""
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Evaluate a Pinecone metadata filter ($eq, $ne, $in, $nin, $gt(e), $lt(e), $and, $or)"""
+    if not filter:
+        return True
+
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        value = metadata.get(key)
+        # List-valued metadata matches when any element does
+        values = value if isinstance(value, list) else [value]
+        for operator, target in condition.items():
+            if operator == "$eq":
+                ok = target in values
+            elif operator == "$ne":
+                ok = target not in values
+            elif operator == "$in":
+                ok = any(v in target for v in values)
+            elif operator == "$nin":
+                ok = not any(v in target for v in values)
+            elif operator in RANGE_OPERATORS:
+                ok = value is not None and RANGE_OPERATORS[operator](value, target)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not ok:
+                return False
+    return True
+
+class InMemoryPineconeIndex:
+    """
+    Local stand-in for a pinecone.Index with the same upsert / query /
+    fetch / delete / describe_index_stats signatures and filter semantics,
+    for exercising ingestion and query code without the network. latency
+    adds a sleep per call and failure_rate makes that fraction of calls
+    raise SimulatedPineconeError, to exercise concurrency and retries.
+    """
+
+    def __init__(self, dimension: Optional[int] = None, latency: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0):
+        self.dimension = dimension
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._namespaces: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def _simulate_request(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+        if failed:
+            raise SimulatedPineconeError()
+
+    def upsert(self, vectors: List[Any], namespace: str = "", **kwargs: Any) -> dict:
+        self._simulate_request()
+        with self._lock:
+            records = self._namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                if not isinstance(vector, dict):
+                    vector = {"id": vector[0], "values": vector[1], "metadata": vector[2] if len(vector) > 2 else {}}
+                self.dimension = self.dimension or len(vector["values"])
+                records[vector["id"]] = {
+                    "values": list(vector["values"]),
+                    "metadata": dict(vector.get("metadata") or {}),
+                }
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector: Optional[List[float]] = None, top_k: int = 10, namespace: str = "",
+              filter: Optional[dict] = None, include_values: bool = False,
+              include_metadata: bool = False, id: Optional[str] = None, **kwargs: Any) -> QueryResponse:
+        self._simulate_request()
+        with self._lock:
+            records = self._namespaces.get(namespace, {})
+            if id is not None:
+                vector = records[id]["values"]
+            candidates = [(vid, record) for vid, record in records.items() if matches_filter(record["metadata"], filter)]
+        if not candidates:
+            return QueryResponse(matches=[], namespace=namespace)
+
+        matrix = np.array([record["values"] for _, record in candidates], dtype=np.float32)
+        query_vector = np.array(vector, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        scores = np.divide(matrix @ query_vector, norms, out=np.zeros(len(candidates), dtype=np.float32),
+                           where=norms > 0)
+        best = np.argsort(-scores, kind='stable')[:top_k]
+        return QueryResponse(namespace=namespace, matches=[
+            QueryMatch(
+                id=candidates[i][0],
+                score=float(scores[i]),
+                values=candidates[i][1]["values"] if include_values else [],
+                metadata=candidates[i][1]["metadata"] if include_metadata else None,
+            )
+            for i in best
+        ])
+
+    def fetch(self, ids: List[str], namespace: str = "", **kwargs: Any) -> dict:
+        self._simulate_request()
+        with self._lock:
+            records = self._namespaces.get(namespace, {})
+            return {"namespace": namespace, "vectors": {
+                vid: {"id": vid, **records[vid]} for vid in ids if vid in records
+            }}
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: Optional[bool] = None,
+               namespace: str = "", filter: Optional[dict] = None, **kwargs: Any) -> dict:
+        self._simulate_request()
+        delete_all = delete_all or kwargs.get("deleteAll")
+        with self._lock:
+            records = self._namespaces.get(namespace, {})
+            if delete_all:
+                records.clear()
+            elif ids is not None:
+                for vid in ids:
+                    records.pop(vid, None)
+            elif filter:
+                for vid in [vid for vid, record in records.items() if matches_filter(record["metadata"], filter)]:
+                    del records[vid]
+        return {}
+
+    def describe_index_stats(self, **kwargs: Any) -> dict:
+        with self._lock:
+            return {
+                "dimension": self.dimension,
+                "namespaces": {name: {"vector_count": len(records)} for name, records in self._namespaces.items()},
+                "total_vector_count": sum(len(records) for records in self._namespaces.values()),
+            }
@@ -0,0 +1,424 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+from .ivf_index import DEFAULT_N_PROBE, IVFIndex, normalize_rows
+from .memory_index import matches_filter
+from .quantization import QUANTIZATION_MODES, dequantize, mode_of, quantize, quantized_scores
+
+EMBEDDINGS_FILE = "embeddings.npy"
+NODES_FILE = "nodes.jsonl"
+# Per-row scale factors for int8 embeddings
+SCALES_FILE = "embedding_scales.npy"
+# Full-precision copy of quantized embeddings, only read to re-score top candidates
+FULL_EMBEDDINGS_FILE = "embeddings_float32.npy"
+
+FILTER_OPERATORS: Dict[FilterOperator, Callable[[Any, Any], bool]] = {
+    FilterOperator.EQ: lambda value, target: value == target,
+    FilterOperator.NE: lambda value, target: value != target,
+    FilterOperator.GT: lambda value, target: value is not None and value > target,
+    FilterOperator.GTE: lambda value, target: value is not None and value >= target,
+    FilterOperator.LT: lambda value, target: value is not None and value < target,
+    FilterOperator.LTE: lambda value, target: value is not None and value <= target,
+    FilterOperator.IN: lambda value, target: value in target,
+    FilterOperator.NIN: lambda value, target: value not in target,
+}
+
+def matches_metadata_filters(metadata: dict, filters: Optional[MetadataFilters]) -> bool:
+    """Evaluate llama_index MetadataFilters against a node's metadata"""
+    if filters is None or not filters.filters:
+        return True
+
+    results = []
+    for metadata_filter in filters.filters:
+        if isinstance(metadata_filter, MetadataFilters):
+            results.append(matches_metadata_filters(metadata, metadata_filter))
+            continue
+        operator = FILTER_OPERATORS.get(metadata_filter.operator)
+        if operator is None:
+            raise ValueError(f"Unsupported filter operator: {metadata_filter.operator}")
+        results.append(operator(metadata.get(metadata_filter.key), metadata_filter.value))
+
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    return all(results)
+
+def matches_rows(matches: Callable[[int], bool], rows: np.ndarray) -> np.ndarray:
+    """Boolean mask of which rows pass a row_matcher predicate"""
+    return np.fromiter((matches(row) for row in rows), dtype=bool, count=len(rows))
+
+def append_rows(matrix: Optional[np.ndarray], rows: np.ndarray) -> np.ndarray:
+    return rows if matrix is None else np.concatenate([matrix, rows], axis=0)
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    Local vector store that keeps embeddings as one contiguous float32
+    matrix. Persisted namespaces are opened with np.load(mmap_mode='r'), so
+    loading is near-instant and the pages are shared between processes
+    serving the same namespace. Node text and metadata live in a JSON-lines
+    side file. Embeddings are L2-normalized on insert, so top-k is a single
+    matrix-vector product (cosine similarity) plus argpartition.
+
+    Deletes only mark rows as dead; persist() compacts them away.
+
+    With ann=True, persist() also builds an IVF index once the namespace
+    has ann_min_rows rows, and queries only score the ann_n_probe closest
+    cells (pass n_probe= to a query to override). Namespaces saved with an
+    IVF index load with ann enabled. Queries also accept where=, a
+    Pinecone-style metadata filter dict.
+
+    quantization="float16" or "int8" stores embeddings at 2 or ~1 bytes
+    per dimension (see quantization.py). With rescore=True a float32 copy
+    is also kept on disk, and the best k * rescore_candidates quantized
+    hits are re-scored from it, so recall matches float32 while only the
+    quantized matrix is paged into memory. Loading a namespace with a
+    different quantization converts it on the next persist.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+    ann: bool = False
+    ann_n_lists: Optional[int] = None  # Defaults to sqrt(rows)
+    ann_n_probe: int = DEFAULT_N_PROBE
+    ann_min_rows: int = 10000
+    quantization: str = "float32"
+    rescore: bool = False
+    rescore_candidates: int = 4
+
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _scales: Optional[np.ndarray] = PrivateAttr(default=None)
+    _full: Optional[np.ndarray] = PrivateAttr(default=None)
+    _pending: List[np.ndarray] = PrivateAttr(default_factory=list)
+    _records: List[dict] = PrivateAttr(default_factory=list)
+    _alive: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros(0, dtype=bool))
+    _id_to_row: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _ivf: Optional[IVFIndex] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, **kwargs: Any) -> "NumpyVectorStore":
+        """Open a persisted store; returns an empty store if nothing has been saved yet"""
+        store = cls(**kwargs)
+        persist_dir = Path(persist_dir)
+        embeddings_path = persist_dir / EMBEDDINGS_FILE
+        nodes_path = persist_dir / NODES_FILE
+        if embeddings_path.exists() and nodes_path.exists():
+            matrix = np.load(embeddings_path, mmap_mode='r')
+            scales = np.load(persist_dir / SCALES_FILE, mmap_mode='r') \
+                if (persist_dir / SCALES_FILE).exists() else None
+            full = np.load(persist_dir / FULL_EMBEDDINGS_FILE, mmap_mode='r') \
+                if (persist_dir / FULL_EMBEDDINGS_FILE).exists() else None
+            stored_mode = mode_of(matrix)
+            if "quantization" not in kwargs:
+                store.quantization = stored_mode
+            if "rescore" not in kwargs:
+                store.rescore = full is not None
+
+            if matrix.shape[0] and store.quantization != stored_mode:
+                # Convert in memory; the next persist writes the new format
+                dense = full if full is not None else dequantize(matrix, scales)
+                if full is None and stored_mode == "float32":
+                    full = matrix
+                matrix, scales = quantize(dense, store.quantization)
+            if matrix.shape[0] and store.rescoring and full is None:
+                # Already quantized without a float32 copy; there is nothing to re-score from
+                store.rescore = False
+            store._matrix = matrix if matrix.shape[0] else None
+            store._scales = scales if matrix.shape[0] else None
+            store._full = full if matrix.shape[0] and store.rescoring else None
+            with open(nodes_path, 'r') as f:
+                store._records = [json.loads(line) for line in f]
+            store._alive = np.ones(len(store._records), dtype=bool)
+            store._id_to_row = {record["id"]: row for row, record in enumerate(store._records)}
+            store._ivf = IVFIndex.load(persist_dir)
+            if store._ivf is not None:
+                store.ann = True
+        return store
+
+    @classmethod
+    def exists(cls, persist_dir: str) -> bool:
+        return (Path(persist_dir) / EMBEDDINGS_FILE).exists()
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def rescoring(self) -> bool:
+        return self.rescore and self.quantization != "float32"
+
+    def count(self) -> int:
+        """Number of live rows (not __len__: llama_index tests stores for truthiness)"""
+        return int(self._alive.sum())
+
+    def _embeddings(self) -> np.ndarray:
+        """Every row's stored embedding, folding rows added since the last call into one matrix"""
+        if self._pending:
+            pending = np.concatenate(self._pending, axis=0)
+            data, scales = quantize(pending, self.quantization)
+            self._matrix = append_rows(self._matrix, data)
+            if scales is not None:
+                self._scales = append_rows(self._scales, scales)
+            if self.rescoring:
+                self._full = append_rows(self._full, pending)
+            self._pending = []
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=QUANTIZATION_MODES[self.quantization])
+        return self._matrix
+
+    def full_precision(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """float32 embeddings for rows (default all): the kept copy if rescoring, else dequantized"""
+        data = self._embeddings()
+        if self._full is not None:
+            return np.asarray(self._full if rows is None else self._full[rows])
+        if rows is None:
+            return dequantize(data, self._scales)
+        return dequantize(data[rows], self._scales[rows] if self._scales is not None else None)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+
+        # Replace any existing copies of these nodes
+        for node in nodes:
+            row = self._id_to_row.get(node.node_id)
+            if row is not None:
+                self._alive[row] = False
+
+        embeddings = normalize_rows(np.array([node.get_embedding() for node in nodes], dtype=np.float32))
+        self._pending.append(embeddings)
+        if self._ivf is not None:
+            self._ivf.add(embeddings)
+        for node in nodes:
+            self._id_to_row[node.node_id] = len(self._records)
+            self._records.append({
+                "id": node.node_id,
+                "ref_doc_id": node.ref_doc_id,
+                "metadata": node_to_metadata_dict(node, remove_text=False, flat_metadata=self.flat_metadata),
+            })
+        self._alive = np.concatenate([self._alive, np.ones(len(nodes), dtype=bool)])
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        for row, record in enumerate(self._records):
+            if record["ref_doc_id"] == ref_doc_id and self._alive[row]:
+                self._alive[row] = False
+                self._id_to_row.pop(record["id"], None)
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None,
+                     filters: Optional[MetadataFilters] = None, **delete_kwargs: Any) -> None:
+        node_ids = set(node_ids) if node_ids is not None else None
+        for row, record in enumerate(self._records):
+            if not self._alive[row]:
+                continue
+            if node_ids is not None and record["id"] not in node_ids:
+                continue
+            if not matches_metadata_filters(record["metadata"], filters):
+                continue
+            self._alive[row] = False
+            self._id_to_row.pop(record["id"], None)
+
+    def rows_where(self, where: dict) -> List[int]:
+        """Live rows whose metadata matches a Pinecone-style filter dict"""
+        return [
+            row for row, record in enumerate(self._records)
+            if self._alive[row] and matches_filter(record["metadata"], where)
+        ]
+
+    def delete_where(self, where: dict) -> int:
+        """Delete the rows matching a Pinecone-style filter dict; returns how many"""
+        rows = self.rows_where(where)
+        for row in rows:
+            self._alive[row] = False
+            self._id_to_row.pop(self._records[row]["id"], None)
+        return len(rows)
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._scales = None
+        self._full = None
+        self._pending = []
+        self._records = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._id_to_row = {}
+        self._ivf = None
+
+    def get_nodes(self, node_ids: Optional[List[str]] = None,
+                  filters: Optional[MetadataFilters] = None) -> List[BaseNode]:
+        rows = (
+            [self._id_to_row[node_id] for node_id in node_ids if node_id in self._id_to_row]
+            if node_ids is not None
+            else np.flatnonzero(self._alive)
+        )
+        return [
+            metadata_dict_to_node(self._records[row]["metadata"])
+            for row in rows if matches_metadata_filters(self._records[row]["metadata"], filters)
+        ]
+
+    def row_matcher(self, query: VectorStoreQuery, where: Optional[dict] = None) -> Optional[Callable[[int], bool]]:
+        """Predicate for rows passing the query's filters and id restrictions, or None if there are none"""
+        # VectorStoreIndex passes an empty node_ids list for stores that keep text; it means "any"
+        if query.filters is None and not query.node_ids and not query.doc_ids and not where:
+            return None
+
+        node_ids = set(query.node_ids) if query.node_ids else None
+        doc_ids = set(query.doc_ids) if query.doc_ids else None
+
+        def matches(row: int) -> bool:
+            record = self._records[row]
+            if node_ids is not None and record["id"] not in node_ids:
+                return False
+            if doc_ids is not None and record["ref_doc_id"] not in doc_ids:
+                return False
+            if where and not matches_filter(record["metadata"], where):
+                return False
+            return matches_metadata_filters(record["metadata"], query.filters)
+
+        return matches
+
+    def candidate_mask(self, query: VectorStoreQuery, where: Optional[dict] = None) -> np.ndarray:
+        """Rows that are alive and pass the query's filters and id restrictions"""
+        mask = self._alive.copy()
+        matches = self.row_matcher(query, where)
+        if matches is not None:
+            rows = np.flatnonzero(mask)
+            mask[rows] = matches_rows(matches, rows)
+        return mask
+
+    def score(self, query_vector: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the (normalized) query to every row; masked-out rows score -inf"""
+        scores = quantized_scores(self._embeddings(), self._scales, query_vector)
+        scores[~mask] = -np.inf
+        return scores
+
+    def row_scores(self, query_vector: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the (normalized) query to the given rows"""
+        scales = self._scales[rows] if self._scales is not None else None
+        return quantized_scores(self._embeddings()[rows], scales, query_vector)
+
+    def top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the k best finite scores, best first"""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        rows = np.argpartition(-scores, k - 1)[:k]
+        return rows[np.argsort(-scores[rows])]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.query_embedding is None:
+            raise ValueError("NumpyVectorStore only supports embedding queries")
+        if not self._records:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        query_vector = normalize_rows(np.array([query.query_embedding], dtype=np.float32))[0]
+        k = query.similarity_top_k
+        n_candidates = k * self.rescore_candidates if self.rescoring else k
+        if self.ann and self._ivf is not None:
+            rows, similarities = self.ann_query(query, query_vector, n_candidates,
+                                                kwargs.get("n_probe", self.ann_n_probe), kwargs.get("where"))
+        else:
+            scores = self.score(query_vector, self.candidate_mask(query, kwargs.get("where")))
+            rows = self.top_k(scores, n_candidates)
+            similarities = scores[rows]
+
+        if self.rescoring and len(rows):
+            rows = np.sort(rows)  # Sequential reads from the memory-mapped float32 copy
+            similarities = self.full_precision(rows) @ query_vector
+            best = self.top_k(similarities, k)
+            rows, similarities = rows[best], similarities[best]
+
+        return VectorStoreQueryResult(
+            nodes=[metadata_dict_to_node(self._records[row]["metadata"]) for row in rows],
+            similarities=[float(similarity) for similarity in similarities],
+            ids=[self._records[row]["id"] for row in rows],
+        )
+
+    def ann_query(self, query: VectorStoreQuery, query_vector: np.ndarray, k: int, n_probe: int,
+                  where: Optional[dict] = None):
+        """Top-k over only the rows in the IVF cells closest to the query"""
+        alive = self._alive
+        rows = self._ivf.candidates(query_vector, n_probe)
+        rows = rows[alive[rows]]
+        matches = self.row_matcher(query, where)
+        if matches is not None:
+            rows = rows[matches_rows(matches, rows)]
+        if not len(rows):
+            return rows, np.array([], dtype=np.float32)
+
+        rows = np.sort(rows)  # Sequential reads from the memory-mapped matrix
+        scores = self.row_scores(query_vector, rows)
+        best = self.top_k(scores, k)
+        return rows[best], scores[best]
+
+    def build_ann(self) -> None:
+        """(Re)train the IVF index over the current rows and enable ANN queries"""
+        self.ann = True
+        self._ivf = IVFIndex.build(self.full_precision(), n_lists=self.ann_n_lists) if self._records else None
+
+    def persist(self, persist_path: str, fs: Optional[Any] = None) -> None:
+        """
+        Write the live rows to the directory containing persist_path (the
+        storage context passes a per-store file name; this store uses its
+        own files next to it) and re-open them memory-mapped.
+        """
+        persist_dir = Path(persist_path).parent
+        persist_dir.mkdir(parents=True, exist_ok=True)
+        live_rows = np.flatnonzero(self._alive).tolist()
+        data = self._embeddings()
+        arrays = {
+            EMBEDDINGS_FILE: np.ascontiguousarray(data[live_rows]) if live_rows
+                else np.zeros((0, 0), dtype=QUANTIZATION_MODES[self.quantization]),
+            SCALES_FILE: self._scales[live_rows] if self._scales is not None and live_rows else None,
+            FULL_EMBEDDINGS_FILE: self._full[live_rows] if self._full is not None and live_rows else None,
+        }
+
+        # Write to temp files and swap them in, so readers mapping the old files are unaffected
+        for name, array in arrays.items():
+            if array is not None:
+                with open(persist_dir / f"{name}.tmp", 'wb') as f:
+                    np.save(f, array)
+        nodes_path = persist_dir / NODES_FILE
+        with open(f"{nodes_path}.tmp", 'w') as f:
+            for row in live_rows:
+                f.write(json.dumps(self._records[row]) + "\n")
+        for name, array in arrays.items():
+            if array is not None:
+                os.replace(persist_dir / f"{name}.tmp", persist_dir / name)
+            elif (persist_dir / name).exists():
+                os.remove(persist_dir / name)
+        os.replace(f"{nodes_path}.tmp", nodes_path)
+
+        if self._ivf is not None:
+            self._ivf.compact(live_rows)
+        if not self.ann or not live_rows or (self._ivf is None and len(live_rows) < self.ann_min_rows):
+            self._ivf = None
+        elif self._ivf is None or self._ivf.needs_rebuild():
+            full = arrays[FULL_EMBEDDINGS_FILE]
+            embeddings = full if full is not None else dequantize(arrays[EMBEDDINGS_FILE], arrays[SCALES_FILE])
+            self._ivf = IVFIndex.build(embeddings, n_lists=self.ann_n_lists)
+        if self._ivf is not None:
+            self._ivf.persist(persist_dir)
+        else:
+            IVFIndex.remove(persist_dir)
+
+        reopened = NumpyVectorStore.from_persist_dir(str(persist_dir))
+        self._matrix = reopened._matrix
+        self._scales = reopened._scales
+        self._full = reopened._full
+        self._pending = []
+        self._records = reopened._records
+        self._alive = reopened._alive
+        self._id_to_row = reopened._id_to_row
@@ -1,10 +1,23 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import urllib3
+from src.chat.answer_cache import cached_query_engine
 from src.environment import get_pinecone_index
-from llama_index.core import StorageContext, VectorStoreIndex
+from src.vector_stores.ingestion_manifest import get_ingestion_manifest
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
 from llama_index.vector_stores.pinecone import PineconeVectorStore
 from llama_index.core.vector_stores.types import MetadataFilters, ExactMatchFilter
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
 
 DEFAULT_NAMESPACE = "disclosures"
 EMBEDDING_DIM = 1536
+UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
+UPSERT_WORKERS = int(os.getenv("PINECONE_UPSERT_WORKERS", "4"))
+UPSERT_MAX_RETRIES = 4
+UPSERT_BACKOFF = 0.5
 
 def get_pinecone(namespace=DEFAULT_NAMESPACE):
     """Get Pinecone vector store and storage context"""
@@ -16,6 +29,81 @@ def get_pinecone(namespace=DEFAULT_NAMESPACE):
     storage_context = StorageContext.from_defaults(vector_store=vector_store)
     return storage_context, vector_store
 
+def nodes_to_vectors(nodes):
+    """Pinecone upsert records for embedded nodes, in the layout PineconeVectorStore reads back"""
+    return [
+        {
+            "id": node.node_id,
+            "values": node.get_embedding(),
+            "metadata": node_to_metadata_dict(node, remove_text=False, flat_metadata=False),
+        }
+        for node in nodes
+    ]
+
+# Failures to reach Pinecone at all, which carry no HTTP status
+CONNECTION_ERRORS = (ConnectionError, TimeoutError, urllib3.exceptions.HTTPError)
+
+def is_retryable(error):
+    """
+    Throttling, server errors and connection failures are worth retrying; other
+    4xx are not, and neither are errors like ValueError from bad vectors or metadata
+    """
+    status = getattr(error, "status", None)
+    if status is None:
+        return isinstance(error, CONNECTION_ERRORS)
+    return status == 429 or status >= 500
+
+class PineconeUpsertWriter:
+    """
+    Upserts vectors in fixed-size batches through a bounded pool of worker
+    threads, retrying throttled or failed batches with exponential backoff
+    and jitter. Works with any object that has pinecone.Index's upsert
+    signature, e.g. InMemoryPineconeIndex in tests and benchmarks.
+    """
+
+    def __init__(self, index=None, namespace=DEFAULT_NAMESPACE, batch_size=UPSERT_BATCH_SIZE,
+                 max_workers=UPSERT_WORKERS, max_retries=UPSERT_MAX_RETRIES, backoff=UPSERT_BACKOFF,
+                 verbose=True):
+        self.index = index if index is not None else get_pinecone_index()
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.verbose = verbose
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+    def upsert_batch(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.index.upsert(vectors=batch, namespace=self.namespace)
+                return len(batch)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                with self._retries_lock:
+                    self.retries += 1
+                time.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+
+    def upsert(self, vectors):
+        """Upsert vector records; returns how many were written"""
+        if not vectors:
+            return 0
+        start = time.time()
+        batches = [vectors[i:i + self.batch_size] for i in range(0, len(vectors), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            written = sum(pool.map(self.upsert_batch, batches))
+
+        elapsed = time.time() - start
+        if self.verbose:
+            print(f"Upserted {written} vectors in {len(batches)} batches to '{self.namespace}' "
+                  f"in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f} vectors/sec, {self.retries} retries)")
+        return written
+
+    def upsert_nodes(self, nodes):
+        return self.upsert(nodes_to_vectors(nodes))
+
 def delete_docs_by_file_hash(file_hash, namespace=DEFAULT_NAMESPACE):
     index = get_pinecone_index()
     result = index.delete(
@@ -24,10 +112,16 @@ def delete_docs_by_file_hash(file_hash, namespace=DEFAULT_NAMESPACE):
             "file_hash": {"$eq": file_hash}
         }
     )
+    get_ingestion_manifest().remove(file_hash, namespace)
     print(result)
 
-def check_file_hash_exists(file_hash, namespace=DEFAULT_NAMESPACE):
-    """Check if document with given hash exists in Pinecone"""
+def record_ingestion(file_hash, node_count, namespace=DEFAULT_NAMESPACE):
+    """Record a successfully ingested document in the local manifest"""
+    embed_model = getattr(Settings.embed_model, "model_name", type(Settings.embed_model).__name__)
+    get_ingestion_manifest().record(file_hash, namespace, node_count=node_count, embed_model=embed_model)
+
+def probe_file_hash(file_hash, namespace=DEFAULT_NAMESPACE):
+    """Ask Pinecone directly whether any vector carries the file hash"""
     index = get_pinecone_index()
     
     # Query with zero vector since we only care about metadata
@@ -43,8 +137,39 @@ def check_file_hash_exists(file_hash, namespace=DEFAULT_NAMESPACE):
     
     return len(existing_vectors.matches) > 0
 
-def get_query_engine_by_file_hash(file_hash, namespace=DEFAULT_NAMESPACE):
-    """Get query engine that only searches documents with matching file_hash"""
+def check_file_hash_exists(file_hash, namespace=DEFAULT_NAMESPACE, reconcile=False):
+    """
+    Check if document with given hash exists in Pinecone. The local
+    ingestion manifest answers first; Pinecone is only probed for hashes
+    the manifest doesn't know or when reconcile=True. A probe hit is not
+    recorded: vectors alone don't mean the ingestion finished, so only
+    record_ingestion (after a successful upsert) adds manifest entries.
+    """
+    manifest = get_ingestion_manifest()
+    if not reconcile and manifest.contains(file_hash, namespace):
+        return True
+
+    exists = probe_file_hash(file_hash, namespace)
+    if not exists:
+        manifest.remove(file_hash, namespace)
+    return exists
+
+def reconcile_manifest(namespace=DEFAULT_NAMESPACE):
+    """Drop manifest entries whose vectors are no longer in Pinecone; returns the stale hashes"""
+    stale = [
+        entry["file_hash"] for entry in get_ingestion_manifest().entries(namespace)
+        if not check_file_hash_exists(entry["file_hash"], namespace, reconcile=True)
+    ]
+    if stale:
+        print(f"Removed {len(stale)} stale manifest entries from {namespace}")
+    return stale
+
+def get_query_engine_by_file_hash(file_hash, namespace=DEFAULT_NAMESPACE, answer_cache=True, **kwargs):
+    """
+    Get query engine that only searches documents with matching file_hash, behind the
+    answer cache for that hash unless answer_cache=False. Extra kwargs (e.g. streaming=True)
+    go to as_query_engine.
+    """
     storage_context, vector_store = get_pinecone(namespace)
     
     # Create index from vector store
@@ -55,4 +180,5 @@ def get_query_engine_by_file_hash(file_hash, namespace=DEFAULT_NAMESPACE):
 
     filters = MetadataFilters(filters=[ExactMatchFilter(key="file_hash", value=file_hash)])
     
-    return index.as_query_engine(filters=filters)
+    query_engine = index.as_query_engine(filters=filters, **kwargs)
+    return cached_query_engine(query_engine, file_hash) if answer_cache else query_engine
@@ -0,0 +1,131 @@
+"""
+Scalar-quantized storage modes for NumpyVectorStore embeddings.
+
+    float32  4 bytes per dimension (the default)
+    float16  2 bytes per dimension
+    int8     1 byte per dimension plus one float32 scale per vector
+
+Run as a module to see what each mode would cost and lose for the local
+namespaces:
+
+    python -m src.vector_stores.quantization [namespace ...]
+"""
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+SCORE_BATCH_ROWS = 65536
+REPORT_K = 10
+REPORT_QUERIES = 200
+
+def mode_of(data: np.ndarray) -> str:
+    """Storage mode of a stored embedding matrix, from its dtype"""
+    for mode, dtype in QUANTIZATION_MODES.items():
+        if data.dtype == dtype:
+            return mode
+    raise ValueError(f"Unsupported embedding dtype: {data.dtype}")
+
+def quantize(embeddings: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert float32 rows to a storage mode.
+
+    Returns:
+        (data, scales): scales holds one float32 per row for int8 and is None otherwise
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode {mode!r}, expected one of {list(QUANTIZATION_MODES)}")
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if mode != "int8":
+        return embeddings.astype(QUANTIZATION_MODES[mode]), None
+
+    scales = np.abs(embeddings).max(axis=1) / 127.0 if len(embeddings) else np.zeros(0, dtype=np.float32)
+    scales[scales == 0] = 1.0
+    data = np.rint(embeddings / scales[:, None]).astype(np.int8)
+    return data, scales.astype(np.float32)
+
+def dequantize(data: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    embeddings = np.asarray(data, dtype=np.float32)
+    if scales is not None:
+        embeddings = embeddings * np.asarray(scales)[:, None]
+    return embeddings
+
+def quantized_scores(data: np.ndarray, scales: Optional[np.ndarray], query_vector: np.ndarray) -> np.ndarray:
+    """Dot product of the query with every stored row, upcasting in batches to bound memory"""
+    if data.dtype == np.float32:
+        return np.asarray(data) @ query_vector
+
+    scores = np.empty(len(data), dtype=np.float32)
+    for start in range(0, len(data), SCORE_BATCH_ROWS):
+        batch = np.asarray(data[start:start + SCORE_BATCH_ROWS], dtype=np.float32)
+        scores[start:start + SCORE_BATCH_ROWS] = batch @ query_vector
+    if scales is not None:
+        scores *= np.asarray(scales)
+    return scores
+
+def bytes_per_vector(mode: str, dim: int) -> int:
+    return dim * np.dtype(QUANTIZATION_MODES[mode]).itemsize + (4 if mode == "int8" else 0)
+
+def recall_at_k(embeddings: np.ndarray, mode: str, rescore_candidates: int = 0,
+                k: int = REPORT_K, n_queries: int = REPORT_QUERIES, seed: int = 0) -> float:
+    """
+    Recall@k of top-k over the quantized rows against the float32 top-k,
+    using sampled rows (with a little noise) as queries. With
+    rescore_candidates, the best k * rescore_candidates quantized hits are
+    re-scored at full precision, as NumpyVectorStore(rescore=True) does.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(embeddings))
+    queries = embeddings[rng.choice(len(embeddings), min(n_queries, len(embeddings)), replace=False)]
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * 0.05
+    data, scales = quantize(embeddings, mode)
+
+    hits = 0
+    for query_vector in queries:
+        exact = embeddings @ query_vector
+        truth = set(np.argpartition(-exact, k - 1)[:k])
+        scores = quantized_scores(data, scales, query_vector)
+        n_candidates = min(len(scores), k * rescore_candidates) if rescore_candidates else k
+        rows = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        if rescore_candidates:
+            rows = rows[np.argpartition(-exact[rows], k - 1)[:k]]
+        hits += len(truth & set(rows))
+    return hits / (k * len(queries))
+
+def report(namespaces=None) -> None:
+    """Print bytes per vector and recall@10 per storage mode for local namespaces"""
+    from .local_storage import DEFAULT_VECTOR_DIR
+    from .numpy_store import EMBEDDINGS_FILE, FULL_EMBEDDINGS_FILE, SCALES_FILE
+    from ..utils.files import resolve_path
+
+    vector_dir = Path(resolve_path(DEFAULT_VECTOR_DIR))
+    namespace_dirs = [vector_dir / namespace for namespace in namespaces] if namespaces \
+        else sorted(path for path in vector_dir.glob("*") if (path / EMBEDDINGS_FILE).exists())
+    if not namespace_dirs:
+        print(f"No NumpyVectorStore namespaces under {vector_dir}")
+        return
+
+    for namespace_dir in namespace_dirs:
+        data = np.load(namespace_dir / EMBEDDINGS_FILE, mmap_mode='r')
+        scales_path = namespace_dir / SCALES_FILE
+        scales = np.load(scales_path) if scales_path.exists() else None
+        if not data.shape[0]:
+            print(f"\n{namespace_dir.name}: empty")
+            continue
+
+        # Recall is measured against the float32 copy when one was kept, else the stored values
+        full_path = namespace_dir / FULL_EMBEDDINGS_FILE
+        embeddings = np.load(full_path) if full_path.exists() else dequantize(data, scales)
+        rows, dim = embeddings.shape
+        print(f"\n{namespace_dir.name}: {rows} vectors x {dim} dims, stored as {mode_of(data)}")
+        print(f"{'mode':<10}{'bytes/vec':>11}{'total MB':>10}{'recall@10':>11}{'rescored':>10}")
+        for mode in QUANTIZATION_MODES:
+            size = bytes_per_vector(mode, dim)
+            recall = recall_at_k(embeddings, mode)
+            rescored = recall_at_k(embeddings, mode, rescore_candidates=4)
+            print(f"{mode:<10}{size:>11}{size * rows / 1e6:>10.2f}{recall:>11.3f}{rescored:>10.3f}")
+
+if __name__ == "__main__":
+    report(sys.argv[1:])
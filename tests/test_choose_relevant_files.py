@@ -0,0 +1,44 @@
+"""Model decisions for ambiguous files, and what gets cached from them"""
+from pathlib import Path
+
+import pytest
+
+from src.parsing import choose_relevant_files as chooser
+from src.parsing.file_classifier import DecisionCache
+from src.utils.directory_info import get_directory_info
+
+@pytest.fixture
+def package_dir(tmp_path):
+    directory = tmp_path / "package"
+    directory.mkdir()
+    # Big enough that the rules settle the inspection report by name; they can't tell about the others
+    for name in ["roof_inspection.pdf", "scan_0001.pdf", "document.pdf"]:
+        (directory / name).write_bytes(b"%PDF-1.4" + b"\0" * 200 * 1024)
+    return directory
+
+def file_id(directory: Path, name: str) -> str:
+    return next(row[0] for row in get_directory_info(str(directory)) if row[1] == name)
+
+def test_model_choices_are_cached(package_dir, tmp_path, monkeypatch):
+    chosen_id = file_id(package_dir, "scan_0001.pdf")
+    monkeypatch.setattr(chooser, "analyze_directory",
+                        lambda directory, files: f"<important_files>\n- {chosen_id}\n</important_files>")
+    cache = DecisionCache(tmp_path)
+
+    chosen = chooser.choose_relevant_files(str(package_dir), cache=cache)
+
+    assert sorted(path.name for path in chosen) == ["roof_inspection.pdf", "scan_0001.pdf"]
+    assert cache.get(chosen_id).source == "llm"
+    assert cache.get(file_id(package_dir, "document.pdf")).decision == "irrelevant"
+
+def test_reply_without_tag_keeps_ambiguous_files_and_caches_nothing(package_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(chooser, "analyze_directory", lambda directory, files: "Sorry, I can't tell from the names.")
+    cache = DecisionCache(tmp_path)
+
+    chosen = chooser.choose_relevant_files(str(package_dir), cache=cache)
+
+    assert sorted(path.name for path in chosen) == ["document.pdf", "roof_inspection.pdf", "scan_0001.pdf"]
+    assert cache.get(file_id(package_dir, "scan_0001.pdf")) is None
+    assert cache.get(file_id(package_dir, "document.pdf")) is None
+    # The next run asks the model again
+    assert len(DecisionCache(tmp_path)._decisions) == 1
@@ -0,0 +1,58 @@
+"""Pages that answer 404/410 ("gone") through every scraping entry point"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.scrapers import website
+from src.scrapers.crawler import IntelligentCrawler
+from src.scrapers.http_fetcher import PageGoneError
+
+TEXT = "Disclosure packages, inspection reports and what buyers should read first. " * 10
+PAGES = {
+    "/": f'<html><body><main><p>{TEXT}</p><a href="/ok">ok</a> <a href="/gone">gone</a></main></body></html>',
+    "/ok": f"<html><body><main><p>{TEXT}</p></main></body></html>",
+}
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = PAGES.get(self.path)
+        status = 200 if body is not None else 404
+        encoded = (body or "Not found").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def test_scrape_pages_leaves_out_gone_pages(base_url):
+    pages = website.scrape_pages([f"{base_url}/ok", f"{base_url}/gone"])
+    assert list(pages) == [f"{base_url}/ok"]
+
+def test_scrape_page_raises_for_gone_page(base_url):
+    with pytest.raises(PageGoneError):
+        website.scrape_page(f"{base_url}/gone")
+
+def test_crawl_skips_gone_page_without_using_budget(base_url, monkeypatch):
+    crawler = IntelligentCrawler("disclosures", f"{base_url}/", max_pages=10, requests_per_second=100)
+
+    async def follow_every_link(text, links, anchor_text):
+        return links
+    monkeypatch.setattr(crawler, "analyze_page_relevance_async", follow_every_link)
+    errors = []
+    monkeypatch.setattr("src.scrapers.crawler.logger.error", lambda message, *args: errors.append(message))
+
+    asyncio.run(crawler.crawl_async())
+    assert crawler.visited_urls == {f"{base_url}/", f"{base_url}/ok"}
+    assert errors == []